@@ -2,15 +2,19 @@
 Admin API endpoints for managing redemption codes, users, and jobs.
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from database import get_db
+from sqlalchemy import select, func, case
+from database import get_db, dialect_insert, engine
+from db_metrics import metrics as db_metrics, pool_status
 from models import User, Job, JobStatus, RedemptionCode, CreditPack
 from auth import get_current_user, get_current_user_info, UserInfo
+from pagination import fetch_page, cached_count
+from stats import get_daily, get_totals, rebuild_stats, record_stats
 import uuid
 import secrets
 import string
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
 from typing import Optional
 
@@ -45,6 +49,17 @@ class StatsResponse(BaseModel):
     redeemed_codes: int
 
 
+class DailyStatsResponse(BaseModel):
+    day: date
+    new_users: int
+    deleted_users: int
+    jobs_created: int
+    jobs_completed: int
+    jobs_failed: int
+    codes_generated: int
+    codes_redeemed: int
+
+
 # ============ Helper Functions ============
 
 def verify_admin_role(user_info: UserInfo) -> None:
@@ -53,6 +68,12 @@ def verify_admin_role(user_info: UserInfo) -> None:
         raise HTTPException(status_code=403, detail="Admin access required")
 
 
+# Bulk code generation limits
+MAX_CODES_PER_REQUEST = 100000
+CODE_INSERT_BATCH_SIZE = 5000  # Rows per INSERT, keeps bind parameters under driver limits
+CODE_INSERT_MAX_ROUNDS = 10
+
+
 def generate_code(prefix: str = "", length: int = 8) -> str:
     """Generate a random redemption code."""
     chars = string.ascii_uppercase + string.digits
@@ -62,46 +83,83 @@ def generate_code(prefix: str = "", length: int = 8) -> str:
 
 # ============ Code Management ============
 
+async def insert_unique_codes(db: AsyncSession, count: int, credits: int, prefix: str = "") -> list:
+    """Insert `count` new codes, returning their (code, created_at) rows.
+
+    Candidates are generated in memory and inserted with multi-row
+    INSERT ... ON CONFLICT DO NOTHING RETURNING, so only the codes that
+    collided with existing ones are regenerated on the next round.
+    """
+    inserted = []
+    for _ in range(CODE_INSERT_MAX_ROUNDS):
+        remaining = count - len(inserted)
+        if remaining <= 0:
+            break
+        
+        candidates = set()
+        while len(candidates) < remaining:
+            candidates.add(generate_code(prefix=prefix))
+        candidates = list(candidates)
+        
+        for i in range(0, len(candidates), CODE_INSERT_BATCH_SIZE):
+            batch = candidates[i:i + CODE_INSERT_BATCH_SIZE]
+            stmt = (
+                dialect_insert(RedemptionCode)
+                .values([{"code": code, "credits": credits} for code in batch])
+                .on_conflict_do_nothing(index_elements=[RedemptionCode.code])
+                .returning(RedemptionCode.code, RedemptionCode.created_at)
+            )
+            result = await db.execute(stmt)
+            inserted.extend(result.all())
+    
+    if len(inserted) < count:
+        raise HTTPException(status_code=500, detail="Could not generate enough unique codes")
+    return inserted
+
+
 @router.post("/codes", response_model=list[CodeResponse])
 async def generate_codes(
     request: CodeGenerateRequest,
+    format: str = "json",  # "json" or "csv"
     db: AsyncSession = Depends(get_db),
     user_info: UserInfo = Depends(get_current_user_info)
 ):
-    """Generate redemption codes (admin only)."""
+    """Generate redemption codes (admin only).
+
+    Pass `format=csv` to stream the codes as a CSV file for reseller batches.
+    """
     verify_admin_role(user_info)
     
-    codes = []
-    for _ in range(request.count):
-        code_str = generate_code(prefix=request.prefix)
-        
-        # Ensure uniqueness
-        while True:
-            existing = await db.execute(
-                select(RedemptionCode).where(RedemptionCode.code == code_str)
-            )
-            if not existing.scalar_one_or_none():
-                break
-            code_str = generate_code(prefix=request.prefix)
-        
-        new_code = RedemptionCode(
-            code=code_str,
-            credits=request.credits
+    if not 1 <= request.count <= MAX_CODES_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"count must be between 1 and {MAX_CODES_PER_REQUEST}"
         )
-        db.add(new_code)
-        codes.append(new_code)
     
+    codes = await insert_unique_codes(db, request.count, request.credits, request.prefix)
+    
+    await record_stats(db, codes_generated=len(codes))
     await db.commit()
     
+    if format == "csv":
+        def rows():
+            yield "code,credits,created_at\n"
+            for code, created_at in codes:
+                yield f"{code},{request.credits},{created_at.isoformat() if created_at else ''}\n"
+        
+        return StreamingResponse(
+            rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="codes.csv"'}
+        )
+    
     return [
         CodeResponse(
-            code=c.code,
-            credits=c.credits,
-            created_at=c.created_at,
-            redeemed_by=c.redeemed_by,
-            redeemed_at=c.redeemed_at
+            code=code,
+            credits=request.credits,
+            created_at=created_at
         )
-        for c in codes
+        for code, created_at in codes
     ]
 
 
@@ -120,6 +178,7 @@ async def list_codes(
     status: Optional[str] = None,  # "pending", "redeemed", or None for all
     credits: Optional[int] = None,  # Filter by credit amount
     search: Optional[str] = None,  # Search by code
+    cursor: Optional[str] = None,  # next_cursor from the previous page
     db: AsyncSession = Depends(get_db),
     user_info: UserInfo = Depends(get_current_user_info)
 ):
@@ -146,16 +205,14 @@ async def list_codes(
         query = query.where(RedemptionCode.code.ilike(f"%{search}%"))
         count_query = count_query.where(RedemptionCode.code.ilike(f"%{search}%"))
     
-    # Get total count
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    # Get total count (cached, only used for the page counter)
+    total = await cached_count(db, count_query)
     
     # Apply pagination
-    offset = (page - 1) * page_size
-    query = query.order_by(RedemptionCode.created_at.desc()).offset(offset).limit(page_size)
-    
-    result = await db.execute(query)
-    codes = result.scalars().all()
+    codes, next_cursor = await fetch_page(
+        db, query, RedemptionCode.created_at, RedemptionCode.code, page_size,
+        cursor=cursor, page=page
+    )
     
     total_pages = (total + page_size - 1) // page_size  # Ceiling division
     
@@ -173,7 +230,8 @@ async def list_codes(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
     }
 
 
@@ -203,6 +261,7 @@ async def list_users(
     page_size: int = 20,
     search: Optional[str] = None,  # Search by email
     role: Optional[str] = None,  # "admin" or "user"
+    cursor: Optional[str] = None,  # next_cursor from the previous page
     db: AsyncSession = Depends(get_db),
     user_info: UserInfo = Depends(get_current_user_info)
 ):
@@ -220,39 +279,38 @@ async def list_users(
     elif role == "user":
         base_query = base_query.where((User.is_admin == 0) | (User.is_admin == None))
     
-    # Get total count
+    # Get total count (cached, only used for the page counter)
     count_query = select(func.count()).select_from(base_query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    total = await cached_count(db, count_query)
     
     # Calculate pagination
     total_pages = (total + page_size - 1) // page_size if total > 0 else 1
-    offset = (page - 1) * page_size
     
     # Get paginated results
-    result = await db.execute(
-        base_query.order_by(User.created_at.desc())
-        .offset(offset)
-        .limit(page_size)
+    users, next_cursor = await fetch_page(
+        db, base_query, User.created_at, User.id, page_size, cursor=cursor, page=page
     )
-    users = result.scalars().all()
     
-    # Get job stats for each user
-    user_stats = []
-    for u in users:
-        total_jobs_result = await db.execute(
-            select(func.count(Job.id)).where(Job.user_id == u.id)
-        )
-        total_jobs = total_jobs_result.scalar() or 0
-        
-        completed_jobs_result = await db.execute(
-            select(func.count(Job.id)).where(
-                Job.user_id == u.id,
-                Job.status == JobStatus.COMPLETED
+    # Get job stats for the whole page in one grouped query
+    stats_by_user = {}
+    if users:
+        stats_result = await db.execute(
+            select(
+                Job.user_id,
+                func.count(Job.id),
+                func.sum(case((Job.status == JobStatus.COMPLETED, 1), else_=0))
             )
+            .where(Job.user_id.in_([u.id for u in users]))
+            .group_by(Job.user_id)
         )
-        completed_jobs = completed_jobs_result.scalar() or 0
-        
+        stats_by_user = {
+            row_user_id: (total_jobs, completed_jobs or 0)
+            for row_user_id, total_jobs, completed_jobs in stats_result.all()
+        }
+    
+    user_stats = []
+    for u in users:
+        total_jobs, completed_jobs = stats_by_user.get(u.id, (0, 0))
         user_stats.append({
             "id": u.id,
             "email": u.email or "",
@@ -268,7 +326,8 @@ async def list_users(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
     }
 
 
@@ -301,6 +360,7 @@ async def list_all_jobs(
     page: int = 1,
     page_size: int = 20,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,  # next_cursor from the previous page
     db: AsyncSession = Depends(get_db),
     user_info: UserInfo = Depends(get_current_user_info)
 ):
@@ -313,22 +373,17 @@ async def list_all_jobs(
     if status:
         base_query = base_query.where(Job.status == status)
     
-    # Get total count
+    # Get total count (cached, only used for the page counter)
     count_query = select(func.count()).select_from(base_query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    total = await cached_count(db, count_query)
     
     # Calculate pagination
     total_pages = (total + page_size - 1) // page_size if total > 0 else 1
-    offset = (page - 1) * page_size
     
     # Get paginated results
-    result = await db.execute(
-        base_query.order_by(Job.created_at.desc())
-        .offset(offset)
-        .limit(page_size)
+    jobs, next_cursor = await fetch_page(
+        db, base_query, Job.created_at, Job.id, page_size, cursor=cursor, page=page
     )
-    jobs = result.scalars().all()
     
     return {
         "jobs": [
@@ -345,7 +400,8 @@ async def list_all_jobs(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": total_pages
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
     }
 
 
@@ -356,39 +412,74 @@ async def get_stats(
     db: AsyncSession = Depends(get_db),
     user_info: UserInfo = Depends(get_current_user_info)
 ):
-    """Get dashboard statistics (admin only)."""
+    """Get dashboard statistics (admin only).
+
+    Served from the daily_stats rollup rather than counting the raw tables.
+    """
     verify_admin_role(user_info)
     
-    # Total users
-    total_users = await db.execute(select(func.count(User.id)))
-    total_users = total_users.scalar() or 0
-    
-    # Total jobs
-    total_jobs = await db.execute(select(func.count(Job.id)))
-    total_jobs = total_jobs.scalar() or 0
+    totals = await get_totals(db)
     
-    # Completed jobs
-    completed_jobs = await db.execute(
-        select(func.count(Job.id)).where(Job.status == JobStatus.COMPLETED)
+    return StatsResponse(
+        total_users=totals["new_users"] - totals["deleted_users"],
+        total_jobs=totals["jobs_created"],
+        completed_jobs=totals["jobs_completed"],
+        pending_codes=totals["codes_generated"] - totals["codes_redeemed"],
+        redeemed_codes=totals["codes_redeemed"]
     )
-    completed_jobs = completed_jobs.scalar() or 0
+
+
+@router.get("/stats/daily", response_model=list[DailyStatsResponse])
+async def get_daily_stats(
+    days: int = 30,
+    db: AsyncSession = Depends(get_db),
+    user_info: UserInfo = Depends(get_current_user_info)
+):
+    """Get per-day counters for dashboard trends (admin only)."""
+    verify_admin_role(user_info)
     
-    # Pending codes (not redeemed)
-    pending_codes = await db.execute(
-        select(func.count(RedemptionCode.code)).where(RedemptionCode.redeemed_by == None)
-    )
-    pending_codes = pending_codes.scalar() or 0
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
     
-    # Redeemed codes
-    redeemed_codes = await db.execute(
-        select(func.count(RedemptionCode.code)).where(RedemptionCode.redeemed_by != None)
-    )
-    redeemed_codes = redeemed_codes.scalar() or 0
+    return await get_daily(db, days)
+
+
+@router.post("/stats/rebuild")
+async def rebuild_dashboard_stats(
+    db: AsyncSession = Depends(get_db),
+    user_info: UserInfo = Depends(get_current_user_info)
+):
+    """Recompute the stats rollup from the raw tables (admin only)."""
+    verify_admin_role(user_info)
     
-    return StatsResponse(
-        total_users=total_users,
-        total_jobs=total_jobs,
-        completed_jobs=completed_jobs,
-        pending_codes=pending_codes,
-        redeemed_codes=redeemed_codes
-    )
+    await rebuild_stats(db)
+    await db.commit()
+    
+    return {"message": "Stats rebuilt"}
+
+
+# ============ Metrics ============
+
+@router.get("/metrics/db")
+async def get_db_metrics(
+    top: int = 20,
+    user_info: UserInfo = Depends(get_current_user_info)
+):
+    """Query latency histograms, slow queries and pool checkout waits (admin only)."""
+    verify_admin_role(user_info)
+    
+    return {
+        "pool": pool_status(engine),
+        **db_metrics.snapshot(top=top)
+    }
+
+
+@router.post("/metrics/db/reset")
+async def reset_db_metrics(
+    user_info: UserInfo = Depends(get_current_user_info)
+):
+    """Clear the collected query metrics (admin only)."""
+    verify_admin_role(user_info)
+    
+    db_metrics.reset()
+    return {"message": "Metrics reset"}
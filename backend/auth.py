@@ -4,17 +4,27 @@ Clerk JWT Authentication for FastAPI
 This module provides a dependency for verifying Clerk JWT tokens.
 """
 import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 import httpx
 from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
-from jwt import PyJWKClient
-from functools import lru_cache
 from pydantic import BaseModel
 
 security = HTTPBearer()
 
+# Clerk's JWKS endpoint lives under the issuer URL
+CLERK_ISSUER = os.getenv("CLERK_ISSUER", "").rstrip("/")
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "3600"))
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+JWT_LEEWAY_SECONDS = 5
+
 
 class UserInfo(BaseModel):
     """User information extracted from JWT."""
@@ -22,24 +32,136 @@ class UserInfo(BaseModel):
     role: Optional[str] = None
 
 
-# Cache the JWKS client to avoid fetching keys on every request
-@lru_cache()
-def get_jwks_client():
-    """Get the JWKS client for Clerk token verification."""
-    # Clerk's JWKS endpoint follows this pattern
-    clerk_issuer = os.getenv("CLERK_ISSUER", "")
-    if not clerk_issuer:
-        # Fallback: construct from frontend URL or use a default pattern
-        clerk_publishable_key = os.getenv("NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "")
-        if clerk_publishable_key:
-            # Extract instance ID from publishable key (pk_test_xxx or pk_live_xxx)
-            # The JWKS URL is typically: https://{instance}.clerk.accounts.dev/.well-known/jwks.json
-            pass
-    
-    jwks_url = f"{clerk_issuer}/.well-known/jwks.json" if clerk_issuer else None
-    if jwks_url:
-        return PyJWKClient(jwks_url)
-    return None
+class JWKSCache:
+    """Process-wide cache of the issuer's signing keys.
+
+    Keys are served from memory. Once they are older than the refresh
+    interval a background thread refetches them while the old set keeps
+    serving requests. An unknown `kid` (key rotation) triggers an immediate
+    refetch, rate limited so bogus tokens cannot hammer the JWKS endpoint.
+    """
+
+    def __init__(self, url: str, refresh_interval: float, min_refetch_interval: float):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.keys: dict = {}
+        self.fetched_at = 0.0
+        self.last_attempt_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self) -> None:
+        """Fetch the key set and swap it in (blocking)."""
+        with self._lock:
+            self.last_attempt_at = time.monotonic()
+        try:
+            response = httpx.get(self.url, timeout=10)
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+            self.keys = {key.key_id: key for key in key_set.keys}
+            self.fetched_at = time.monotonic()
+        except Exception as e:
+            print(f"[Auth] Failed to refresh JWKS from {self.url}: {e}")
+        finally:
+            self._refreshing = False
+
+    def refresh_if_allowed(self) -> None:
+        """Refetch on a kid miss unless we just tried."""
+        if time.monotonic() - self.last_attempt_at >= self.min_refetch_interval:
+            self.refresh()
+
+    def get_key(self, kid: Optional[str]):
+        """Return the cached key for `kid`, scheduling a refresh if the set is stale."""
+        if (
+            self.keys
+            and not self._refreshing
+            and time.monotonic() - self.fetched_at > self.refresh_interval
+        ):
+            self._refreshing = True
+            threading.Thread(target=self.refresh, daemon=True).start()
+        return self.keys.get(kid)
+
+
+class VerifiedTokenCache:
+    """LRU of already verified token payloads, keyed by token hash until `exp`."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, token_hash: bytes) -> Optional[dict]:
+        entry = self._entries.get(token_hash)
+        if entry is None:
+            return None
+        payload, exp = entry
+        if exp <= time.time():
+            del self._entries[token_hash]
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        self._entries.move_to_end(token_hash)
+        return payload
+
+    def put(self, token_hash: bytes, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return  # Never cache tokens that do not expire
+        self._entries[token_hash] = (payload, exp)
+        self._entries.move_to_end(token_hash)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+jwks_cache = JWKSCache(
+    f"{CLERK_ISSUER}/.well-known/jwks.json",
+    JWKS_REFRESH_INTERVAL,
+    JWKS_MIN_REFETCH_INTERVAL,
+) if CLERK_ISSUER else None
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE)
+
+if not CLERK_ISSUER:
+    print("Warning: CLERK_ISSUER not set, JWT signatures will NOT be verified")
+
+
+async def verify_token(token: str) -> dict:
+    """Verify a Clerk session token and return its claims.
+
+    Cache hits cost one sha256 and a dict lookup; a miss verifies the RS256
+    signature against the cached JWKS key and remembers the result until the
+    token expires. Raises jwt.InvalidTokenError subclasses on failure.
+    """
+    token_hash = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(token_hash)
+    if payload is not None:
+        return payload
+
+    if jwks_cache is None:
+        # Development fallback: no issuer configured, trust the claims as-is
+        payload = jwt.decode(token, options={"verify_signature": False})
+    else:
+        kid = jwt.get_unverified_header(token).get("kid")
+        signing_key = jwks_cache.get_key(kid)
+        if signing_key is None:
+            # Unknown kid, the issuer may have rotated its keys
+            await asyncio.to_thread(jwks_cache.refresh_if_allowed)
+            signing_key = jwks_cache.get_key(kid)
+        if signing_key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+
+        payload = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=["RS256"],
+            issuer=CLERK_ISSUER,
+            leeway=JWT_LEEWAY_SECONDS,
+            options={"verify_aud": False, "require": ["exp", "sub"]}
+        )
+
+    token_cache.put(token_hash, payload)
+    return payload
 
 
 def _extract_role_from_payload(payload: dict) -> Optional[str]:
@@ -86,14 +208,10 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        # For development/testing, we can decode without verification
-        # In production, you should verify the token signature
-        
-        # First, try to decode without verification to get claims
-        unverified_payload = jwt.decode(token, options={"verify_signature": False})
+        payload = await verify_token(token)
         
         # The 'sub' claim contains the Clerk user ID
-        user_id = unverified_payload.get("sub")
+        user_id = payload.get("sub")
         
         if not user_id:
             raise HTTPException(
@@ -102,17 +220,6 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # TODO: For production, verify the token signature using JWKS
-        # jwks_client = get_jwks_client()
-        # if jwks_client:
-        #     signing_key = jwks_client.get_signing_key_from_jwt(token)
-        #     payload = jwt.decode(
-        #         token,
-        #         signing_key.key,
-        #         algorithms=["RS256"],
-        #         options={"verify_aud": False}
-        #     )
-        
         return user_id
         
     except jwt.ExpiredSignatureError:
@@ -140,9 +247,9 @@ async def get_current_user_info(
     token = credentials.credentials
     
     try:
-        unverified_payload = jwt.decode(token, options={"verify_signature": False})
+        payload = await verify_token(token)
         
-        user_id = unverified_payload.get("sub")
+        user_id = payload.get("sub")
         
         if not user_id:
             raise HTTPException(
@@ -151,7 +258,7 @@ async def get_current_user_info(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        role = _extract_role_from_payload(unverified_payload)
+        role = _extract_role_from_payload(payload)
         
         return UserInfo(user_id=user_id, role=role)
         
@@ -0,0 +1,60 @@
+"""
+Microbenchmark request auth overhead: verified-token cache hit vs full RS256 verify.
+
+Usage:
+    python bench_auth.py --iterations 100000
+
+Runs offline with a locally generated key, no Clerk instance needed.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import auth
+
+ISSUER = "https://clerk.bench"
+
+
+def setup() -> str:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": "bench", "use": "sig", "alg": "RS256"})
+
+    cache = auth.JWKSCache(f"{ISSUER}/.well-known/jwks.json", 3600, 30)
+    cache.keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict({"keys": [jwk]}).keys}
+    cache.fetched_at = time.monotonic()
+    auth.jwks_cache = cache
+    auth.CLERK_ISSUER = ISSUER
+
+    claims = {"sub": "user_bench", "iss": ISSUER, "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "bench"})
+
+
+async def bench(token: str, iterations: int) -> None:
+    # Full verification: clear the token cache before every call
+    began = time.perf_counter()
+    for _ in range(iterations // 100):
+        auth.token_cache.clear()
+        await auth.verify_token(token)
+    full_us = (time.perf_counter() - began) / (iterations // 100) * 1e6
+
+    # Cache hits
+    await auth.verify_token(token)
+    began = time.perf_counter()
+    for _ in range(iterations):
+        await auth.verify_token(token)
+    hit_us = (time.perf_counter() - began) / iterations * 1e6
+
+    print(f"full RS256 verify: {full_us:8.2f} us/request")
+    print(f"token cache hit:   {hit_us:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(bench(setup(), args.iterations))
@@ -0,0 +1,100 @@
+"""
+Benchmark OFFSET vs keyset pagination on a seeded jobs table.
+
+Usage:
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python bench_pagination.py --rows 200000
+
+Point DATABASE_URL at a scratch Postgres database to get production-like numbers.
+The script drops and recreates all tables, never run it against a real database.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from database import AsyncSessionLocal, Base, engine
+from models import Job, JobStatus
+from pagination import fetch_page
+
+USER_ID = "user_bench"
+PAGE_SIZE = 20
+
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.PROCESSING]
+    batch = []
+    async with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "user_id": USER_ID,
+                "status": statuses[i % len(statuses)],
+                "input_key": f"uploads/{USER_ID}/{i}.mp4",
+                "quality": "lama",
+                "cost": 1,
+                # Several jobs share a timestamp so the id tie-breaker is exercised
+                "created_at": start + timedelta(seconds=i // 3),
+            })
+            if len(batch) == 5000:
+                await conn.execute(insert(Job), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(Job), batch)
+
+
+async def time_offset_page(page: int) -> float:
+    query = select(Job).where(Job.user_id == USER_ID).order_by(Job.created_at.desc(), Job.id.desc())
+    async with AsyncSessionLocal() as db:
+        began = time.perf_counter()
+        result = await db.execute(query.offset((page - 1) * PAGE_SIZE).limit(PAGE_SIZE))
+        result.scalars().all()
+        return time.perf_counter() - began
+
+
+async def cursor_at_page(page: int) -> str:
+    """Find the cursor that starts `page` (not timed, uses OFFSET once)."""
+    query = select(Job).where(Job.user_id == USER_ID)
+    async with AsyncSessionLocal() as db:
+        _, cursor = await fetch_page(db, query, Job.created_at, Job.id, PAGE_SIZE, page=page - 1)
+        return cursor
+
+
+async def time_cursor_page(cursor: str) -> float:
+    query = select(Job).where(Job.user_id == USER_ID)
+    async with AsyncSessionLocal() as db:
+        began = time.perf_counter()
+        await fetch_page(db, query, Job.created_at, Job.id, PAGE_SIZE, cursor=cursor)
+        return time.perf_counter() - began
+
+
+async def main(rows: int, repeats: int):
+    engine.echo = False
+    print(f"Seeding {rows} jobs...")
+    await seed(rows)
+
+    last_page = rows // PAGE_SIZE
+    pages = sorted({2, max(2, last_page // 100), max(2, last_page // 10), max(2, last_page // 2), max(2, last_page)})
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    for page in pages:
+        cursor = await cursor_at_page(page)
+        offset_ms = min([await time_offset_page(page) for _ in range(repeats)]) * 1000
+        keyset_ms = min([await time_cursor_page(cursor) for _ in range(repeats)]) * 1000
+        print(f"{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeats))
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from database import get_db
 from models import User, RedemptionCode
 from auth import get_current_user
+from stats import record_stats
 from datetime import datetime
 from pydantic import BaseModel
 import clerk_api
@@ -62,12 +63,14 @@ async def redeem_code(
         user = User(id=user_id, email=email, credits=3)  # Default 3 credits
         db.add(user)
         await db.flush()
+        await record_stats(db, new_users=1)
     
     # Add credits and mark code as redeemed
     old_balance = user.credits
     user.credits += code.credits
     code.redeemed_by = user_id
     code.redeemed_at = datetime.utcnow()
+    await record_stats(db, codes_redeemed=1)
     
     await db.commit()
     
@@ -104,6 +107,7 @@ async def get_credits(
         
         new_user = User(id=user_id, email=email, credits=3)
         db.add(new_user)
+        await record_stats(db, new_users=1)
         await db.commit()
         print(f"[DEBUG] Created new user {user_id}")
         return CreditsResponse(credits=3)
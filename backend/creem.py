@@ -19,6 +19,7 @@ from typing import Optional
 import uuid
 from datetime import datetime
 import clerk_api
+from stats import record_stats
 
 router = APIRouter(prefix="/api/checkout", tags=["checkout"])
 
@@ -248,6 +249,7 @@ async def handle_checkout_completed(event: dict, db: AsyncSession):
         
         user = User(id=user_id, email=email, credits=int(credits_to_add))
         db.add(user)
+        await record_stats(db, new_users=1)
         print(f"[Creem Webhook] Created user {user_id} with {credits_to_add} credits")
     
     await db.commit()
@@ -0,0 +1,150 @@
+"""
+Database query instrumentation.
+
+SQLAlchemy event hooks record per-statement latency histograms and keep a
+ring buffer of slow queries; InstrumentedPool times how long requests wait to
+check a connection out of the pool. Everything stays in process memory and is
+exposed through the admin metrics endpoint.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLES = 50
+MAX_TRACKED_STATEMENTS = 500  # Further distinct statements are folded into "other"
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): n
+                for bound, n in zip(BUCKETS_MS, self.buckets)
+            },
+        }
+
+
+class QueryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements: dict = {}
+            self.slow_queries = deque(maxlen=SLOW_QUERY_SAMPLES)
+            self.checkout_wait = Histogram()
+            self.checkout_timeouts = 0
+
+    def record_query(self, statement: str, ms: float) -> None:
+        # Statements carry bind placeholders, so the text already groups by shape
+        with self._lock:
+            key = statement
+            if key not in self.statements and len(self.statements) >= MAX_TRACKED_STATEMENTS:
+                key = "other"
+            self.statements.setdefault(key, Histogram()).observe(ms)
+            if ms >= SLOW_QUERY_MS:
+                self.slow_queries.append({
+                    "statement": statement,
+                    "duration_ms": round(ms, 3),
+                    "at": time.time(),
+                })
+
+    def record_checkout(self, ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkout_wait.observe(ms)
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def snapshot(self, top: int = 20) -> dict:
+        with self._lock:
+            statements = sorted(
+                self.statements.items(), key=lambda item: item[1].total_ms, reverse=True
+            )[:top]
+            return {
+                "slow_query_ms": SLOW_QUERY_MS,
+                "statements": [
+                    {"statement": statement, **histogram.to_dict()}
+                    for statement, histogram in statements
+                ],
+                "slow_queries": list(self.slow_queries),
+                "checkout_wait": self.checkout_wait.to_dict(),
+                "checkout_timeouts": self.checkout_timeouts,
+            }
+
+
+metrics = QueryMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        began = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            metrics.record_checkout((time.perf_counter() - began) * 1000, timed_out)
+
+
+def instrument_engine(engine) -> None:
+    """Attach the query timing hooks to an (async) engine."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        began = conn.info["query_start"].pop()
+        metrics.record_query(statement, (time.perf_counter() - began) * 1000)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # Failed statements never reach after_cursor_execute
+        stack = context.connection.info.get("query_start") if context.connection else None
+        if stack:
+            stack.pop()
+
+
+def pool_status(engine) -> dict:
+    """Current pool occupancy, for pools that expose it."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, name, None)
+        if callable(getter):
+            status[name] = getter()
+    return status
@@ -0,0 +1,84 @@
+"""
+Batched dispatch of jobs to the RunPod serverless endpoint.
+
+Every RunPod invocation pays a cold/warm start and a model load, which
+dominates short clips. JobDispatcher holds jobs of the same quality for a
+short window and sends them as a single invocation carrying a list of jobs;
+the handler processes them against one warm model set.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List
+
+import runpod
+
+# How long to wait for more jobs of the same quality before dispatching
+DISPATCH_BATCH_WINDOW = float(os.getenv("DISPATCH_BATCH_WINDOW", "2.0"))
+DISPATCH_MAX_BATCH_SIZE = int(os.getenv("DISPATCH_MAX_BATCH_SIZE", "8"))
+
+
+class JobDispatcher:
+    def __init__(
+        self,
+        endpoint_id: str,
+        on_dispatched: Callable[[List[str]], Awaitable[None]],
+        window_seconds: float = DISPATCH_BATCH_WINDOW,
+        max_batch_size: int = DISPATCH_MAX_BATCH_SIZE,
+    ):
+        self.endpoint_id = endpoint_id
+        self.on_dispatched = on_dispatched
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[dict]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, job_input: dict, batchable: bool = True) -> None:
+        """Queue a job input (job_id, input_key, output_key, quality, ...).
+
+        Non-batchable jobs (e.g. long videos) are dispatched on their own right away.
+        """
+        if not batchable or self.window_seconds <= 0 or self.max_batch_size <= 1:
+            await self._dispatch([job_input])
+            return
+
+        quality = job_input.get("quality", "lama")
+        batch = self._pending.setdefault(quality, [])
+        batch.append(job_input)
+
+        if len(batch) >= self.max_batch_size:
+            await self.flush(quality)
+        elif quality not in self._timers:
+            self._timers[quality] = asyncio.create_task(self._flush_later(quality))
+
+    async def _flush_later(self, quality: str) -> None:
+        await asyncio.sleep(self.window_seconds)
+        self._timers.pop(quality, None)
+        await self.flush(quality)
+
+    async def flush(self, quality: str) -> None:
+        """Dispatch whatever is queued for `quality` now."""
+        timer = self._timers.pop(quality, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+        batch = self._pending.pop(quality, [])
+        if batch:
+            await self._dispatch(batch)
+
+    async def flush_all(self) -> None:
+        for quality in list(self._pending):
+            await self.flush(quality)
+
+    async def _dispatch(self, batch: List[dict]) -> None:
+        # A single job keeps the original input shape so older workers still work
+        payload = batch[0] if len(batch) == 1 else {"jobs": batch}
+        job_ids = [job["job_id"] for job in batch]
+        try:
+            endpoint = runpod.Endpoint(self.endpoint_id)
+            run_request = await asyncio.to_thread(endpoint.run, {"input": payload})
+            print(f"RunPod job started for {len(batch)} job(s): {run_request.job_id}")
+        except Exception as e:
+            print(f"Error starting RunPod job for {job_ids}: {e}")
+            # Jobs stay in PENDING status - can be retried later
+            return
+
+        await self.on_dispatched(job_ids)
@@ -1,17 +1,26 @@
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from database import get_db, engine, Base
+from sqlalchemy import select, update
+from database import get_db, engine, Base, AsyncSessionLocal
 from models import Job, JobStatus, User
-from schemas import JobCreate, JobResponse
+from schemas import (
+    JobCreate, JobResponse,
+    MultipartUploadCreate, MultipartUploadResponse, UploadPartURL,
+    MultipartUploadComplete, MultipartUploadAbort,
+)
 from auth import get_current_user
+from pagination import fetch_page, cached_count
+from stats import record_stats
+from dispatcher import JobDispatcher
 import uuid
 import os
+import asyncio
 import boto3
 import runpod
 from dotenv import load_dotenv
 
+import auth
 import models
 import webhooks
 import admin
@@ -24,6 +33,9 @@ app = FastAPI()
 @app.on_event("startup")
 async def startup_event():
     print("Backend Application Starting...")
+    # Warm the JWKS cache so the first request does not pay for the fetch
+    if auth.jwks_cache:
+        await asyncio.to_thread(auth.jwks_cache.refresh)
 
 # Include routers
 app.include_router(webhooks.router)
@@ -61,6 +73,9 @@ async def fix_jobs_db():
             await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS output_key VARCHAR"))
             await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS quality VARCHAR DEFAULT 'lama'"))
             await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cost INTEGER DEFAULT 1"))
+            await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS progress INTEGER DEFAULT 0"))
+            await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS eta_seconds INTEGER"))
+            await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS error VARCHAR"))
             
             # Create index on user_id if possible (Postgres syntax)
             # await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_user_id ON jobs (user_id)"))
@@ -98,10 +113,15 @@ app.add_middleware(
 # RunPod Serverless Setup
 RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY")
 RUNPOD_ENDPOINT_ID = os.getenv("RUNPOD_ENDPOINT_ID")
+# Where the worker posts progress/completion (e.g. https://api.example.com/api/webhooks/worker)
+WORKER_CALLBACK_URL = os.getenv("WORKER_CALLBACK_URL")
 
 if RUNPOD_API_KEY:
     runpod.api_key = RUNPOD_API_KEY
 
+# Inputs up to this size may share a RunPod invocation with other jobs (0 = no limit)
+DISPATCH_BATCH_MAX_BYTES = int(os.getenv("DISPATCH_BATCH_MAX_BYTES", str(50 * 1024 * 1024)))
+
 # S3/R2 Setup
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -116,10 +136,48 @@ s3_client = boto3.client(
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY
 )
 
+# Multipart upload settings (S3 requires parts >= 5 MiB except the last one)
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024)))
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+MULTIPART_MAX_PARTS = 10000
+PRESIGNED_URL_EXPIRES = int(os.getenv("PRESIGNED_URL_EXPIRES", "3600"))
+
+async def mark_jobs_processing(job_ids):
+    """Move dispatched jobs to PROCESSING unless the worker already reported on them."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids), Job.status == JobStatus.PENDING)
+            .values(status=JobStatus.PROCESSING)
+        )
+        await db.commit()
+
+job_dispatcher = JobDispatcher(RUNPOD_ENDPOINT_ID, mark_jobs_processing) if RUNPOD_ENDPOINT_ID else None
+
+async def is_short_job(input_key: str) -> bool:
+    """Whether the input is small enough to be batched with other jobs."""
+    if not DISPATCH_BATCH_MAX_BYTES:
+        return True
+    try:
+        head = await asyncio.to_thread(s3_client.head_object, Bucket=BUCKET_NAME, Key=input_key)
+        size = head["ContentLength"]
+    except Exception:
+        return False
+    return size <= DISPATCH_BATCH_MAX_BYTES
+
 @app.on_event("startup")
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    if job_dispatcher and not WORKER_CALLBACK_URL:
+        # Workers then report nothing, and dispatched jobs stay PROCESSING forever
+        print("[ERROR] WORKER_CALLBACK_URL is not set: jobs get no progress or completion callbacks")
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Do not strand jobs still waiting in a batch window
+    if job_dispatcher:
+        await job_dispatcher.flush_all()
 
 @app.post("/api/upload")
 async def upload_file(
@@ -146,6 +204,119 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def verify_upload_key(key: str, user_id: str) -> None:
+    """Make sure the upload key lives under the caller's own prefix."""
+    if not key.startswith(f"uploads/{user_id}/"):
+        raise HTTPException(status_code=403, detail="Upload does not belong to user")
+
+
+@app.post("/api/uploads/multipart", response_model=MultipartUploadResponse)
+async def create_multipart_upload(
+    request: MultipartUploadCreate,
+    user_id: str = Depends(get_current_user)
+):
+    """Start a multipart upload and hand out presigned part URLs (requires auth).
+
+    The client PUTs each part straight to R2/S3, so video bytes never pass
+    through the backend.
+    """
+    if request.size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be positive")
+
+    part_size = max(MULTIPART_PART_SIZE, MULTIPART_MIN_PART_SIZE)
+    # Grow the part size for very large files so we stay under the part limit
+    if request.size > part_size * MULTIPART_MAX_PARTS:
+        part_size = -(-request.size // MULTIPART_MAX_PARTS)
+    part_count = -(-request.size // part_size)
+
+    filename = os.path.basename(request.filename) or "video.mp4"
+    key = f"uploads/{user_id}/{uuid.uuid4()}/{filename}"
+    try:
+        upload = s3_client.create_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=key,
+            ContentType=request.content_type
+        )
+        upload_id = upload["UploadId"]
+
+        parts = [
+            UploadPartURL(
+                part_number=part_number,
+                url=s3_client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": BUCKET_NAME,
+                        "Key": key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=PRESIGNED_URL_EXPIRES
+                )
+            )
+            for part_number in range(1, part_count + 1)
+        ]
+    except Exception as e:
+        print(f"[ERROR] Create multipart upload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return MultipartUploadResponse(
+        key=key,
+        upload_id=upload_id,
+        part_size=part_size,
+        parts=parts
+    )
+
+
+@app.post("/api/uploads/multipart/complete")
+async def complete_multipart_upload(
+    request: MultipartUploadComplete,
+    user_id: str = Depends(get_current_user)
+):
+    """Assemble the uploaded parts into the final object (requires auth)."""
+    verify_upload_key(request.key, user_id)
+    if not request.parts:
+        raise HTTPException(status_code=400, detail="No parts uploaded")
+
+    parts = sorted(request.parts, key=lambda p: p.part_number)
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=request.key,
+            UploadId=request.upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": p.part_number, "ETag": p.etag}
+                    for p in parts
+                ]
+            }
+        )
+    except Exception as e:
+        print(f"[ERROR] Complete multipart upload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"key": request.key}
+
+
+@app.post("/api/uploads/multipart/abort")
+async def abort_multipart_upload(
+    request: MultipartUploadAbort,
+    user_id: str = Depends(get_current_user)
+):
+    """Abort a multipart upload and discard its parts (requires auth)."""
+    verify_upload_key(request.key, user_id)
+    try:
+        s3_client.abort_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=request.key,
+            UploadId=request.upload_id
+        )
+    except Exception as e:
+        print(f"[ERROR] Abort multipart upload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"status": "aborted"}
+
+
 
 @app.post("/api/jobs", response_model=JobResponse)
 async def create_job(
@@ -168,6 +339,7 @@ async def create_job(
         
         user = User(id=user_id, email=email, credits=3)
         db.add(user)
+        await record_stats(db, new_users=1)
         await db.commit()
         await db.refresh(user)
     
@@ -198,30 +370,21 @@ async def create_job(
     )
     
     db.add(new_job)
+    await record_stats(db, jobs_created=1)
     await db.commit()
     await db.refresh(new_job)
     
-    # Trigger RunPod Serverless Job
-    if RUNPOD_ENDPOINT_ID:
-        try:
-            runpod_job = runpod.Endpoint(RUNPOD_ENDPOINT_ID).run({
-                "input": {
-                    "job_id": job_id,
-                    "input_key": input_key,
-                    "output_key": output_key,
-                    "quality": job_data.quality
-                }
-            })
-            print(f"RunPod job started: {runpod_job()}")
-            
-            # Mark as PROCESSING immediately so frontend shows progress
-            new_job.status = JobStatus.PROCESSING
-            db.add(new_job)
-            await db.commit()
-            
-        except Exception as e:
-            print(f"Error starting RunPod job: {e}")
-            # Job will stay in PENDING status - can be retried later
+    # Trigger RunPod Serverless Job (short clips are coalesced into one invocation)
+    if job_dispatcher:
+        await job_dispatcher.submit({
+            "job_id": job_id,
+            "input_key": input_key,
+            "output_key": output_key,
+            "quality": job_data.quality,
+            "callback_url": WORKER_CALLBACK_URL
+        }, batchable=await is_short_job(input_key))
+        # Dispatched right away when not batched, pick up the PROCESSING status
+        await db.refresh(new_job)
     
     return JobResponse(
         id=new_job.id,
@@ -237,7 +400,11 @@ async def get_job_status(
     db: AsyncSession = Depends(get_db),
     user_id: str = Depends(get_current_user)
 ):
-    """Get job status (requires auth, only returns user's own jobs)"""
+    """Get job status (requires auth, only returns user's own jobs).
+
+    Progress and completion are pushed by the worker callback
+    (see webhooks.worker_callback), so this is a plain DB read.
+    """
     result = await db.execute(
         select(Job).where(Job.id == job_id, Job.user_id == user_id)
     )
@@ -246,26 +413,6 @@ async def get_job_status(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # If job is still pending, check RunPod for updates
-    if job.status == JobStatus.PENDING and RUNPOD_ENDPOINT_ID:
-        try:
-            endpoint = runpod.Endpoint(RUNPOD_ENDPOINT_ID)
-            # RunPod stores job ID as the UUID we passed
-            runpod_status = endpoint.health()  # This will get all jobs
-            # Since we don't store the RunPod job ID, we check if output_key exists in R2
-            # If the file exists, the job completed successfully
-            try:
-                s3_client.head_object(Bucket=BUCKET_NAME, Key=job.output_key)
-                # File exists! Job is complete
-                job.status = JobStatus.COMPLETED
-                await db.commit()
-                await db.refresh(job)
-            except:
-                # File doesn't exist yet, job still processing
-                pass
-        except Exception as e:
-            print(f"Error checking RunPod status: {e}")
-        
     # Construct public URLs
     input_url = f"{PUBLIC_URL_BASE}/{job.input_key}" if job.input_key else None
     output_url = f"{PUBLIC_URL_BASE}/{job.output_key}" if job.output_key and job.status == JobStatus.COMPLETED else None
@@ -277,7 +424,10 @@ async def get_job_status(
         output_url=output_url,
         created_at=job.created_at,
         quality=job.quality or "lama",
-        cost=job.cost or 1
+        cost=job.cost or 1,
+        progress=job.progress or 0,
+        eta_seconds=job.eta_seconds,
+        error=job.error
     )
 
 @app.get("/api/jobs")
@@ -285,10 +435,17 @@ async def list_user_jobs(
     page: int = 1,
     page_size: int = 20,
     status: str = None,
+    cursor: str = None,
     db: AsyncSession = Depends(get_db),
     user_id: str = Depends(get_current_user)
 ):
-    """List all jobs for the authenticated user with pagination"""
+    """List all jobs for the authenticated user with pagination.
+
+    Pass `next_cursor` from the previous response as `cursor` for constant-time
+    page fetches; `page` still works for page-number navigation. `page` and
+    `total_pages` describe page-number navigation only, `page` is null when a
+    cursor is given.
+    """
     from sqlalchemy import func
     try:
         print(f"[DEBUG] list_jobs called for user {user_id}")
@@ -299,22 +456,20 @@ async def list_user_jobs(
         if status and status != 'all':
             base_query = base_query.where(Job.status == status)
         
-        # Get total count
+        # Get total count (cached, only used for the page counter)
         count_query = select(func.count()).select_from(base_query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        total = await cached_count(db, count_query)
         
         # Calculate pagination
         total_pages = (total + page_size - 1) // page_size if total > 0 else 1
-        offset = (page - 1) * page_size
         
         # Get paginated results
-        result = await db.execute(
-            base_query.order_by(Job.created_at.desc())
-            .offset(offset)
-            .limit(page_size)
+        jobs, next_cursor = await fetch_page(
+            db, base_query, Job.created_at, Job.id, page_size, cursor=cursor, page=page
         )
-        jobs = result.scalars().all()
+        if cursor:
+            # The rows follow the cursor, not the page number
+            page = None
         print(f"[DEBUG] Found {len(jobs)} jobs (page {page}/{total_pages})")
         
         response_data = [
@@ -325,7 +480,8 @@ async def list_user_jobs(
                 "output_url": f"{PUBLIC_URL_BASE}/{job.output_key}" if job.output_key and job.status == JobStatus.COMPLETED else None,
                 "created_at": job.created_at.isoformat(),
                 "quality": job.quality or "lama",
-                "cost": job.cost or 1
+                "cost": job.cost or 1,
+                "progress": job.progress or 0
             }
             for job in jobs
         ]
@@ -334,8 +490,11 @@ async def list_user_jobs(
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] list_jobs failed: {e}")
         import traceback
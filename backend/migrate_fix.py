@@ -1,6 +1,8 @@
 import asyncio
-from sqlalchemy import text
-from database import engine
+from sqlalchemy import select, text
+from database import engine, AsyncSessionLocal
+from models import DailyStats
+from stats import rebuild_stats
 
 async def migrate_users():
     async with engine.begin() as conn:
@@ -18,7 +20,33 @@ async def migrate_users():
         print("Checking transactions.stripe_payment_id...")
         await conn.execute(text("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS stripe_payment_id VARCHAR"))
         
-        print("Migration complete!")
+        # Add worker progress reporting to jobs
+        print("Checking jobs progress columns...")
+        await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS progress INTEGER DEFAULT 0"))
+        await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS eta_seconds INTEGER"))
+        await conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS error VARCHAR"))
+        
+        # Composite indexes for keyset pagination (create_all skips existing tables)
+        print("Checking pagination indexes...")
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at, id)"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_user_id_created_at_id ON jobs (user_id, created_at, id)"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at_id ON jobs (status, created_at, id)"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_created_at_id ON jobs (created_at, id)"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_redemption_codes_created_at_code ON redemption_codes (created_at, code)"))
+        
+        # Dashboard stats rollup table
+        print("Checking daily_stats table...")
+        await conn.run_sync(DailyStats.__table__.create, checkfirst=True)
+        
+    # Backfill the rollup once from the existing rows
+    async with AsyncSessionLocal() as db:
+        has_stats = await db.execute(select(DailyStats.day).limit(1))
+        if has_stats.first() is None:
+            print("Backfilling daily_stats...")
+            await rebuild_stats(db)
+            await db.commit()
+        
+    print("Migration complete!")
 
 if __name__ == "__main__":
     asyncio.run(migrate_users())
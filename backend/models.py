@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, Index
 from sqlalchemy.sql import func
 import enum
 from database import Base
@@ -14,6 +14,11 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Keyset pagination for the admin user listing
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 class TransactionStatus(str, enum.Enum):
     PENDING = "pending"
     SUCCEEDED = "succeeded"
@@ -46,9 +51,19 @@ class Job(Base):
     output_key = Column(String, nullable=True)
     quality = Column(String, default="lama")
     cost = Column(Integer, default=1)
+    progress = Column(Integer, default=0)  # 0-100, reported by the worker callback
+    eta_seconds = Column(Integer, nullable=True)  # Worker's estimate of remaining time
+    error = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # Keyset pagination: per-user history, admin status filter, admin all jobs
+        Index("ix_jobs_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+    )
+
 
 # Credit cost by quality mode
 CREDIT_COSTS = {
@@ -76,3 +91,22 @@ class RedemptionCode(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     redeemed_by = Column(String, nullable=True)  # User ID who redeemed
     redeemed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination for the admin code listing
+        Index("ix_redemption_codes_created_at_code", "created_at", "code"),
+    )
+
+
+class DailyStats(Base):
+    """Per-day counters for the admin dashboard, updated alongside the raw rows (see stats.py)."""
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)  # UTC day
+    new_users = Column(Integer, default=0, nullable=False)
+    deleted_users = Column(Integer, default=0, nullable=False)
+    jobs_created = Column(Integer, default=0, nullable=False)
+    jobs_completed = Column(Integer, default=0, nullable=False)
+    jobs_failed = Column(Integer, default=0, nullable=False)
+    codes_generated = Column(Integer, default=0, nullable=False)
+    codes_redeemed = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination and cached counts for list endpoints.
+
+Pages are ordered by (created_at, id) descending. The cursor encodes the last
+row of the previous page, so fetching any page is an index range scan instead
+of an OFFSET that walks every skipped row.
+"""
+import base64
+import os
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# How long a total count may be served from memory before recounting
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+_count_cache: dict = {}
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encode the (created_at, id) of the last row on a page."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor from encode_cursor, raise 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query,
+    created_col,
+    id_col,
+    page_size: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+):
+    """Fetch one page of `query` ordered by (created_col, id_col) descending.
+
+    With a cursor the page starts right after the cursor row. Without one we
+    fall back to OFFSET on `page` so existing page-number clients keep working.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = query.order_by(created_col.desc(), id_col.desc())
+    if cursor:
+        query = query.where(tuple_(created_col, id_col) < tuple_(*decode_cursor(cursor)))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+
+    # Fetch one extra row to know whether there is a next page
+    result = await db.execute(query.limit(page_size + 1))
+    rows = result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+    return rows, next_cursor
+
+
+async def cached_count(db: AsyncSession, count_query) -> int:
+    """Run a count query, reusing the result for COUNT_CACHE_TTL seconds.
+
+    Totals only drive the page counter in the UI, so a slightly stale value
+    is fine and saves a full count on every page request.
+    """
+    compiled = count_query.compile()
+    key = (str(compiled), tuple(sorted(compiled.params.items())))
+
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit and now - hit[1] < COUNT_CACHE_TTL:
+        return hit[0]
+
+    result = await db.execute(count_query)
+    total = result.scalar() or 0
+
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[key] = (total, now)
+    return total
+
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from models import JobStatus
 
@@ -27,7 +27,46 @@ class JobResponse(BaseModel):
     output_url: Optional[str] = None
     quality: str
     cost: int
+    progress: int = 0
+    eta_seconds: Optional[int] = None
+    error: Optional[str] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+class MultipartUploadCreate(BaseModel):
+    filename: str
+    content_type: str = "video/mp4"
+    size: int  # Total file size in bytes, used to compute the part count
+
+class UploadPartURL(BaseModel):
+    part_number: int
+    url: str
+
+class MultipartUploadResponse(BaseModel):
+    key: str
+    upload_id: str
+    part_size: int
+    parts: List[UploadPartURL]
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class MultipartUploadComplete(BaseModel):
+    key: str
+    upload_id: str
+    parts: List[CompletedPart]
+
+class MultipartUploadAbort(BaseModel):
+    key: str
+    upload_id: str
+
+class WorkerCallback(BaseModel):
+    job_id: str
+    # A worker never moves a job back to pending
+    status: Literal[JobStatus.PROCESSING, JobStatus.COMPLETED, JobStatus.FAILED]
+    progress: Optional[int] = None
+    eta_seconds: Optional[int] = None
+    error: Optional[str] = None
@@ -0,0 +1,109 @@
+"""
+Incrementally maintained dashboard counters.
+
+Every place that creates a user, moves a job to a terminal state or
+generates/redeems codes calls record_stats() on the same session before
+committing, so the counters change in the same transaction as the rows they
+count. The admin dashboard then reads a handful of small per-day rows instead
+of counting the raw tables.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import dialect_insert
+from models import DailyStats, Job, JobStatus, RedemptionCode, User
+
+STAT_FIELDS = (
+    "new_users",
+    "deleted_users",
+    "jobs_created",
+    "jobs_completed",
+    "jobs_failed",
+    "codes_generated",
+    "codes_redeemed",
+)
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+async def record_stats(db: AsyncSession, **deltas: int) -> None:
+    """Add `deltas` (e.g. jobs_created=1) to today's counters.
+
+    Runs in the caller's transaction; nothing is written until it commits.
+    """
+    unknown = set(deltas) - set(STAT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown stats fields: {sorted(unknown)}")
+
+    stmt = dialect_insert(DailyStats).values(day=_today(), **{f: deltas.get(f, 0) for f in STAT_FIELDS})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyStats.day],
+        set_={
+            f: getattr(DailyStats, f) + stmt.excluded[f]
+            for f in deltas
+        }
+    )
+    await db.execute(stmt)
+
+
+async def get_totals(db: AsyncSession) -> dict:
+    """All-time totals summed over the daily rows."""
+    result = await db.execute(
+        select(*[func.coalesce(func.sum(getattr(DailyStats, f)), 0) for f in STAT_FIELDS])
+    )
+    return dict(zip(STAT_FIELDS, (int(v) for v in result.one())))
+
+
+async def get_daily(db: AsyncSession, days: int) -> list[dict]:
+    """Counters for the last `days` days, oldest first, with empty days filled in."""
+    first_day = _today() - timedelta(days=days - 1)
+    result = await db.execute(
+        select(DailyStats).where(DailyStats.day >= first_day).order_by(DailyStats.day)
+    )
+    rows = {row.day: row for row in result.scalars().all()}
+
+    daily = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = rows.get(day)
+        daily.append({
+            "day": day,
+            **{f: (getattr(row, f) or 0) if row else 0 for f in STAT_FIELDS}
+        })
+    return daily
+
+
+async def rebuild_stats(db: AsyncSession) -> None:
+    """Recompute every daily row from the raw tables (backfill or repair).
+
+    Deleted users leave no rows behind, so deleted_users restarts at zero and
+    new_users only counts users that still exist. Jobs are bucketed by the day
+    they reached their terminal state (updated_at), falling back to created_at.
+    """
+    buckets: dict = {}
+
+    async def add(field, day_expr, model, *where):
+        day_col = func.date(day_expr)
+        result = await db.execute(
+            select(day_col, func.count()).select_from(model).where(*where).group_by(day_col)
+        )
+        for day, count in result.all():
+            if isinstance(day, str):  # SQLite returns date() as text
+                day = date.fromisoformat(day)
+            buckets.setdefault(day, dict.fromkeys(STAT_FIELDS, 0))[field] += count
+
+    finished_at = func.coalesce(Job.updated_at, Job.created_at)
+    await add("new_users", User.created_at, User, User.created_at != None)
+    await add("jobs_created", Job.created_at, Job, Job.created_at != None)
+    await add("jobs_completed", finished_at, Job, Job.status == JobStatus.COMPLETED, finished_at != None)
+    await add("jobs_failed", finished_at, Job, Job.status == JobStatus.FAILED, finished_at != None)
+    await add("codes_generated", RedemptionCode.created_at, RedemptionCode, RedemptionCode.created_at != None)
+    await add("codes_redeemed", RedemptionCode.redeemed_at, RedemptionCode, RedemptionCode.redeemed_at != None)
+
+    await db.execute(delete(DailyStats))
+    for day, counters in buckets.items():
+        db.add(DailyStats(day=day, **counters))
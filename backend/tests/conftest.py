@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules (see Dockerfile WORKDIR)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+)
+os.environ.setdefault("BUCKET_NAME", "test-bucket")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("PUBLIC_URL_BASE", "https://pub.test")
+os.environ.setdefault("WORKER_CALLBACK_SECRET", "test-secret")
+
+USER_ID = "user_test"
+
+
+@pytest.fixture
+def app_client():
+    """TestClient on a fresh SQLite schema, authenticated as USER_ID."""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("aiosqlite")
+    from fastapi.testclient import TestClient
+
+    import main
+    import pagination
+    from auth import get_current_user
+    from database import Base, engine
+
+    async def reset_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(reset_schema())
+    pagination._count_cache.clear()
+    main.app.dependency_overrides[get_current_user] = lambda: USER_ID
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def admin_client(app_client):
+    import main
+    from auth import UserInfo, get_current_user_info
+
+    main.app.dependency_overrides[get_current_user_info] = lambda: UserInfo(
+        user_id="admin", role="admin"
+    )
+    return app_client
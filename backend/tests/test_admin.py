@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+
+def seed_users(count, jobs_per_user):
+    from database import AsyncSessionLocal
+    from models import Job, JobStatus, User
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    async def _seed():
+        async with AsyncSessionLocal() as db:
+            for i in range(count):
+                user_id = f"user-{i:03d}"
+                db.add(User(id=user_id, email=f"{user_id}@test", created_at=start + timedelta(minutes=i)))
+                for j in range(jobs_per_user):
+                    status = JobStatus.COMPLETED if j % 2 == 0 else JobStatus.FAILED
+                    db.add(Job(id=f"{user_id}-job-{j}", user_id=user_id, status=status))
+            await db.commit()
+
+    asyncio.run(_seed())
+
+
+def count_queries(fn):
+    from sqlalchemy import event
+
+    from database import engine
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+    return result, len(statements)
+
+
+def test_list_users_uses_constant_queries(admin_client):
+    seed_users(30, jobs_per_user=3)
+
+    small, small_queries = count_queries(
+        lambda: admin_client.get("/api/admin/users", params={"page_size": 5}).json()
+    )
+    large, large_queries = count_queries(
+        lambda: admin_client.get("/api/admin/users", params={"page_size": 30}).json()
+    )
+
+    assert len(small["users"]) == 5
+    assert len(large["users"]) == 30
+    # Total + page of users + grouped job stats, whatever the page size
+    assert small_queries == 3
+    # Same filters, so the total now comes from the count cache
+    assert large_queries == 2
+
+    first = large["users"][0]
+    assert (first["total_jobs"], first["completed_jobs"]) == (3, 2)
+
+
+def test_generate_codes_retries_only_collisions(admin_client, monkeypatch):
+    import itertools
+
+    import admin
+
+    candidates = iter(["DUP1", "DUP2"])
+    monkeypatch.setattr(admin, "generate_code", lambda prefix="": next(candidates))
+    admin_client.post("/api/admin/codes", json={"credits": 5, "count": 2})
+
+    # The first two candidates now collide, the rest are fresh
+    candidates = itertools.chain(["DUP1", "DUP2", "NEW3"], (f"NEW{i}" for i in itertools.count(4)))
+    codes, queries = count_queries(
+        lambda: admin_client.post("/api/admin/codes", json={"credits": 5, "count": 3}).json()
+    )
+    assert sorted(c["code"] for c in codes) == ["NEW3", "NEW4", "NEW5"]
+    # Two INSERT rounds plus the stats upsert, no per-code SELECT
+    assert queries == 3
+
+
+def test_generate_codes_bulk_csv(admin_client):
+    res, queries = count_queries(
+        lambda: admin_client.post(
+            "/api/admin/codes", params={"format": "csv"}, json={"credits": 10, "count": 12000}
+        )
+    )
+    lines = res.text.strip().split("\n")
+    assert res.headers["content-type"].startswith("text/csv")
+    assert lines[0] == "code,credits,created_at"
+    assert len(set(lines[1:])) == 12000
+    # Three batched INSERTs plus the stats upsert
+    assert queries == 4
+
+
+def test_db_metrics_report_queries_and_pool(admin_client, monkeypatch):
+    import db_metrics
+
+    admin_client.post("/api/admin/metrics/db/reset")
+    monkeypatch.setattr(db_metrics, "SLOW_QUERY_MS", 0)
+    seed_users(3, jobs_per_user=1)
+    admin_client.get("/api/admin/users")
+
+    body = admin_client.get("/api/admin/metrics/db").json()
+    assert body["pool"]["class"] == "InstrumentedPool"
+    assert body["checkout_wait"]["count"] > 0
+    assert any("GROUP BY jobs.user_id" in s["statement"] for s in body["statements"])
+    assert body["slow_queries"]
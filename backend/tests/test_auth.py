@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+pytest.importorskip("cryptography")
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import auth
+
+ISSUER = "https://clerk.test"
+
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": "key-1", "use": "sig", "alg": "RS256"})
+
+    cache = auth.JWKSCache(f"{ISSUER}/.well-known/jwks.json", 3600, 30)
+    fetches = []
+
+    def fake_refresh():
+        fetches.append(time.monotonic())
+        cache.keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict({"keys": [jwk]}).keys}
+        cache.fetched_at = cache.last_attempt_at = time.monotonic()
+
+    monkeypatch.setattr(cache, "refresh", fake_refresh)
+    monkeypatch.setattr(auth, "jwks_cache", cache)
+    monkeypatch.setattr(auth, "CLERK_ISSUER", ISSUER)
+    monkeypatch.setattr(auth, "token_cache", auth.VerifiedTokenCache(100))
+    return private_key, fetches
+
+
+def make_token(private_key, kid="key-1", exp_in=60, **claims):
+    claims = {"sub": "user_1", "iss": ISSUER, "exp": int(time.time()) + exp_in, **claims}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def test_verify_fetches_keys_once_and_caches_tokens(signing_key):
+    private_key, fetches = signing_key
+    token = make_token(private_key, metadata={"role": "admin"})
+
+    payload = asyncio.run(auth.verify_token(token))
+    assert payload["sub"] == "user_1"
+    assert asyncio.run(auth.verify_token(token)) is payload
+    asyncio.run(auth.verify_token(make_token(private_key, sub="user_2")))
+    assert len(fetches) == 1
+
+
+def test_verify_rejects_foreign_signature(signing_key):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(jwt.InvalidSignatureError):
+        asyncio.run(auth.verify_token(make_token(other_key)))
+
+
+def test_unknown_kid_refetch_is_rate_limited(signing_key):
+    private_key, fetches = signing_key
+    asyncio.run(auth.verify_token(make_token(private_key)))
+
+    for _ in range(3):
+        with pytest.raises(jwt.InvalidTokenError):
+            asyncio.run(auth.verify_token(make_token(private_key, kid="rotated")))
+    assert len(fetches) == 1
+
+
+def test_cached_token_expires(signing_key, monkeypatch):
+    private_key, _ = signing_key
+    token = make_token(private_key, exp_in=30)
+    asyncio.run(auth.verify_token(token))
+
+    monkeypatch.setattr(time, "time", lambda: 10**11)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(auth.verify_token(token))
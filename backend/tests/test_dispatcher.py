@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+
+class FakeEndpoint:
+    """Local stand-in for runpod.Endpoint that records every run() input."""
+
+    calls = []
+
+    def __init__(self, endpoint_id):
+        self.endpoint_id = endpoint_id
+
+    def run(self, request):
+        FakeEndpoint.calls.append(request["input"])
+
+        class RunRequest:
+            job_id = f"run-{len(FakeEndpoint.calls)}"
+
+        return RunRequest()
+
+
+@pytest.fixture
+def fake_runpod(monkeypatch):
+    pytest.importorskip("runpod")
+    import dispatcher
+
+    FakeEndpoint.calls = []
+    monkeypatch.setattr(dispatcher.runpod, "Endpoint", FakeEndpoint)
+    return FakeEndpoint
+
+
+def job(job_id, quality="lama"):
+    return {"job_id": job_id, "input_key": f"uploads/{job_id}.mp4", "quality": quality}
+
+
+def test_jobs_of_same_quality_share_one_invocation(fake_runpod):
+    from dispatcher import JobDispatcher
+
+    dispatched = []
+
+    async def on_dispatched(job_ids):
+        dispatched.append(job_ids)
+
+    async def scenario():
+        d = JobDispatcher("endpoint", on_dispatched, window_seconds=0.05, max_batch_size=8)
+        await d.submit(job("a"))
+        await d.submit(job("b"))
+        await d.submit(job("c", quality="e2fgvi_hq"))
+        assert fake_runpod.calls == []  # still inside the window
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+
+    by_quality = sorted(fake_runpod.calls, key=lambda payload: "jobs" not in payload)
+    assert [j["job_id"] for j in by_quality[0]["jobs"]] == ["a", "b"]
+    # A lone job keeps the single-job input shape
+    assert by_quality[1]["job_id"] == "c"
+    assert sorted(dispatched) == [["a", "b"], ["c"]]
+
+
+def test_full_batch_and_unbatchable_jobs_dispatch_immediately(fake_runpod):
+    from dispatcher import JobDispatcher
+
+    async def on_dispatched(job_ids):
+        pass
+
+    async def scenario():
+        d = JobDispatcher("endpoint", on_dispatched, window_seconds=60, max_batch_size=2)
+        await d.submit(job("a"))
+        await d.submit(job("b"))
+        await d.submit(job("long"), batchable=False)
+        await d.submit(job("c"))
+        await d.flush_all()
+
+    asyncio.run(scenario())
+
+    assert fake_runpod.calls == [
+        {"jobs": [job("a"), job("b")]},
+        job("long"),
+        job("c"),
+    ]
+
+
+def test_create_job_dispatches_through_dispatcher(app_client, fake_runpod, monkeypatch):
+    import main
+    from dispatcher import JobDispatcher
+
+    monkeypatch.setattr(
+        main, "job_dispatcher",
+        JobDispatcher("endpoint", main.mark_jobs_processing, window_seconds=60),
+    )
+    # No object in storage, so the input size is unknown and the job is sent alone
+    res = app_client.post("/api/jobs?input_key=uploads/user_test/in.mp4", json={"quality": "lama"})
+    assert res.status_code == 200
+    assert res.json()["status"] == "processing"
+    assert fake_runpod.calls[0]["job_id"] == res.json()["id"]
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from conftest import USER_ID
+
+
+def add_jobs(count):
+    from database import AsyncSessionLocal
+    from models import Job
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    async def _add():
+        async with AsyncSessionLocal() as db:
+            for i in range(count):
+                # Pairs of jobs share a timestamp to exercise the id tie-breaker
+                db.add(Job(id=f"job-{i:03d}", user_id=USER_ID, created_at=start + timedelta(seconds=i // 2)))
+            db.add(Job(id="other-job", user_id="someone_else", created_at=start))
+            await db.commit()
+
+    asyncio.run(_add())
+
+
+def test_cursor_walk_returns_every_job_once(app_client):
+    add_jobs(45)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"page_size": 10}
+        if cursor:
+            params["cursor"] = cursor
+        body = app_client.get("/api/jobs", params=params).json()
+        seen.extend(job["id"] for job in body["jobs"])
+        assert body["page"] == (None if cursor else 1)
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [f"job-{i:03d}" for i in reversed(range(45))]
+    assert body["total"] == 45
+
+
+def test_invalid_cursor_is_rejected(app_client):
+    assert app_client.get("/api/jobs", params={"cursor": "not-a-cursor"}).status_code == 400
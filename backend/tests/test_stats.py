@@ -0,0 +1,77 @@
+import asyncio
+
+from test_worker_callback import add_job, post_callback
+
+
+def run(coro_fn):
+    from database import AsyncSessionLocal
+
+    async def _run():
+        async with AsyncSessionLocal() as db:
+            result = await coro_fn(db)
+            await db.commit()
+            return result
+
+    return asyncio.run(_run())
+
+
+def test_stats_follow_state_changes(admin_client):
+    add_job("job-1")
+    add_job("job-2")
+    # add_job inserts rows directly, so count them the way create_job would
+    from stats import record_stats
+    run(lambda db: record_stats(db, jobs_created=2))
+
+    post_callback(admin_client, {"job_id": "job-1", "status": "completed"})
+    post_callback(admin_client, {"job_id": "job-2", "status": "failed", "error": "boom"})
+    # A retried completion must not be counted twice
+    post_callback(admin_client, {"job_id": "job-1", "status": "completed"})
+
+    codes = admin_client.post("/api/admin/codes", json={"credits": 5, "count": 3}).json()
+    admin_client.post("/api/codes/redeem", json={"code": codes[0]["code"]})
+
+    stats = admin_client.get("/api/admin/stats").json()
+    assert stats == {
+        "total_users": 1,
+        "total_jobs": 2,
+        "completed_jobs": 1,
+        "pending_codes": 2,
+        "redeemed_codes": 1,
+    }
+
+    today = admin_client.get("/api/admin/stats/daily", params={"days": 7}).json()[-1]
+    assert (today["jobs_completed"], today["jobs_failed"]) == (1, 1)
+
+
+def test_rebuild_matches_incremental_counters(admin_client):
+    add_job("job-1")
+    post_callback(admin_client, {"job_id": "job-1", "status": "completed"})
+    admin_client.post("/api/admin/codes", json={"credits": 5, "count": 2})
+
+    # The directly inserted job was never counted as created
+    assert admin_client.get("/api/admin/stats").json()["total_jobs"] == 0
+
+    assert admin_client.post("/api/admin/stats/rebuild").status_code == 200
+    stats = admin_client.get("/api/admin/stats").json()
+    assert (stats["total_jobs"], stats["completed_jobs"], stats["pending_codes"]) == (1, 1, 2)
+
+
+def test_concurrent_completions_count_once(admin_client):
+    import httpx
+
+    import main
+
+    add_job("job-1")
+
+    async def post_twice():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # A retried completion racing the original post
+            body = {"job_id": "job-1", "status": "completed"}
+            return await asyncio.gather(post_callback(client, body), post_callback(client, body))
+
+    responses = asyncio.run(post_twice())
+    assert sorted(r.json()["status"] for r in responses) == ["ignored", "success"]
+
+    today = admin_client.get("/api/admin/stats/daily", params={"days": 7}).json()[-1]
+    assert today["jobs_completed"] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+moto = pytest.importorskip("moto")
+
+import boto3
+
+from conftest import USER_ID
+
+PART_SIZE = 5 * 1024 * 1024
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def client(app_client, monkeypatch):
+    import main
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=main.BUCKET_NAME)
+        monkeypatch.setattr(main, "s3_client", s3)
+        monkeypatch.setattr(main, "MULTIPART_PART_SIZE", PART_SIZE)
+        yield app_client, s3
+
+
+def test_multipart_upload_round_trip(client):
+    client, s3 = client
+    size = PART_SIZE * 2 + 123
+
+    res = client.post(
+        "/api/uploads/multipart",
+        json={"filename": "../clip.mp4", "content_type": "video/mp4", "size": size},
+    )
+    assert res.status_code == 200
+    upload = res.json()
+    assert upload["key"].startswith(f"uploads/{USER_ID}/")
+    assert upload["key"].endswith("/clip.mp4")
+    assert [p["part_number"] for p in upload["parts"]] == [1, 2, 3]
+    assert all(upload["upload_id"] in p["url"] for p in upload["parts"])
+
+    # Act as the browser: push each part with the same upload id
+    data = b"x" * size
+    parts = []
+    for p in upload["parts"]:
+        start = (p["part_number"] - 1) * upload["part_size"]
+        out = s3.upload_part(
+            Bucket=BUCKET,
+            Key=upload["key"],
+            UploadId=upload["upload_id"],
+            PartNumber=p["part_number"],
+            Body=data[start:start + upload["part_size"]],
+        )
+        parts.append({"part_number": p["part_number"], "etag": out["ETag"]})
+
+    res = client.post(
+        "/api/uploads/multipart/complete",
+        json={"key": upload["key"], "upload_id": upload["upload_id"], "parts": parts[::-1]},
+    )
+    assert res.status_code == 200
+    head = s3.head_object(Bucket=BUCKET, Key=upload["key"])
+    assert head["ContentLength"] == size
+
+
+def test_multipart_upload_rejects_foreign_key(client):
+    client, s3 = client
+    res = client.post(
+        "/api/uploads/multipart/abort",
+        json={"key": "uploads/someone_else/x/clip.mp4", "upload_id": "abc"},
+    )
+    assert res.status_code == 403
+
+
+def test_multipart_upload_abort(client):
+    client, s3 = client
+    upload = client.post(
+        "/api/uploads/multipart",
+        json={"filename": "clip.mp4", "size": 10},
+    ).json()
+    res = client.post(
+        "/api/uploads/multipart/abort",
+        json={"key": upload["key"], "upload_id": upload["upload_id"]},
+    )
+    assert res.status_code == 200
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
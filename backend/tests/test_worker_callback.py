@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+
+from conftest import USER_ID
+
+
+def add_job(job_id="job-1"):
+    from database import AsyncSessionLocal
+    from models import Job, JobStatus
+
+    async def _add():
+        async with AsyncSessionLocal() as db:
+            db.add(Job(
+                id=job_id,
+                user_id=USER_ID,
+                input_key="uploads/in.mp4",
+                output_key="outputs/out.mp4",
+                status=JobStatus.PROCESSING,
+            ))
+            await db.commit()
+
+    asyncio.run(_add())
+
+
+def post_callback(client, payload, secret=None):
+    body = json.dumps(payload).encode()
+    secret = secret or os.environ["WORKER_CALLBACK_SECRET"]
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        "/api/webhooks/worker",
+        content=body,
+        headers={"x-worker-signature": signature},
+    )
+
+
+def test_worker_callback_updates_progress_and_completion(app_client):
+    add_job()
+
+    res = post_callback(
+        app_client, {"job_id": "job-1", "status": "processing", "progress": 40, "eta_seconds": 30}
+    )
+    assert res.status_code == 200
+    job = app_client.get("/api/jobs/job-1").json()
+    assert (job["status"], job["progress"], job["eta_seconds"]) == ("processing", 40, 30)
+
+    post_callback(app_client, {"job_id": "job-1", "status": "completed"})
+    # A late progress post must not reopen the finished job
+    post_callback(app_client, {"job_id": "job-1", "status": "processing", "progress": 60})
+
+    job = app_client.get("/api/jobs/job-1").json()
+    assert job["status"] == "completed"
+    assert job["progress"] == 100
+    assert job["output_url"].endswith("/outputs/out.mp4")
+
+
+def test_worker_callback_rejects_bad_signature(app_client):
+    add_job()
+    res = post_callback(
+        app_client, {"job_id": "job-1", "status": "completed"}, secret="wrong"
+    )
+    assert res.status_code == 400
+    assert app_client.get("/api/jobs/job-1").json()["status"] == "processing"
+
+
+def test_worker_callback_rejects_pending(app_client):
+    add_job()
+    res = post_callback(app_client, {"job_id": "job-1", "status": "pending"})
+    assert res.status_code == 400
+    assert app_client.get("/api/jobs/job-1").json()["status"] == "processing"
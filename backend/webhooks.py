@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Request, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from database import get_db
-from models import User
+from models import User, Job, JobStatus
+from schemas import WorkerCallback
+from stats import record_stats
 from svix.webhooks import Webhook, WebhookVerificationError
 import os
 import json
+import hmac
+import hashlib
 
 router = APIRouter()
 
@@ -38,6 +42,7 @@ async def clerk_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         if not existing_user:
             new_user = User(id=user_id, email=email)
             db.add(new_user)
+            await record_stats(db, new_users=1)
             await db.commit()
             print(f"User created: {user_id}")
 
@@ -61,7 +66,67 @@ async def clerk_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         
         if user:
             await db.delete(user)
+            await record_stats(db, deleted_users=1)
             await db.commit()
             print(f"User deleted: {user_id}")
 
     return {"status": "success"}
+
+
+def verify_worker_signature(payload: bytes, signature: str) -> bool:
+    """Verify the HMAC-SHA256 signature the worker puts on its callbacks."""
+    secret = os.environ.get("WORKER_CALLBACK_SECRET", "").strip()
+    if not secret:
+        return False
+
+    expected = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@router.post("/api/webhooks/worker")
+async def worker_callback(request: Request, db: AsyncSession = Depends(get_db)):
+    """Receive progress and completion updates from the RunPod worker."""
+    if not os.environ.get("WORKER_CALLBACK_SECRET"):
+        raise HTTPException(status_code=500, detail="Missing WORKER_CALLBACK_SECRET")
+
+    payload = await request.body()
+    signature = request.headers.get("x-worker-signature", "")
+    if not verify_worker_signature(payload, signature):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+
+    try:
+        callback = WorkerCallback.model_validate_json(payload)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    result = await db.execute(select(Job).where(Job.id == callback.job_id))
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    values = {"status": callback.status, "eta_seconds": callback.eta_seconds}
+    if callback.progress is not None:
+        values["progress"] = max(job.progress or 0, min(callback.progress, 100))
+    if callback.status == JobStatus.COMPLETED:
+        values.update(progress=100, eta_seconds=0)
+    elif callback.status == JobStatus.FAILED:
+        values.update(error=callback.error, eta_seconds=None)
+
+    # Late or retried posts must not reopen a finished job, and two concurrent
+    # completions must not both count it, so the check and the write are one statement
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status.notin_([JobStatus.COMPLETED, JobStatus.FAILED]))
+        .values(**values)
+    )
+    if result.rowcount != 1:
+        return {"status": "ignored"}
+
+    if callback.status == JobStatus.COMPLETED:
+        await record_stats(db, jobs_completed=1)
+    elif callback.status == JobStatus.FAILED:
+        await record_stats(db, jobs_failed=1)
+
+    await db.commit()
+    return {"status": "success"}
@@ -14,9 +14,19 @@ interface Stats {
     redeemed_codes: number;
 }
 
+interface DailyStats {
+    day: string;
+    new_users: number;
+    jobs_created: number;
+    jobs_completed: number;
+    jobs_failed: number;
+    codes_redeemed: number;
+}
+
 export default function AdminDashboard() {
     const { getToken } = useAuth();
     const [stats, setStats] = useState<Stats | null>(null);
+    const [daily, setDaily] = useState<DailyStats[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -30,6 +40,12 @@ export default function AdminDashboard() {
                 if (res.ok) {
                     setStats(await res.json());
                 }
+                const dailyRes = await fetch(`${API_URL}/api/admin/stats/daily?days=14`, {
+                    headers: { Authorization: `Bearer ${token}` }
+                });
+                if (dailyRes.ok) {
+                    setDaily(await dailyRes.json());
+                }
             } catch (error) {
                 console.error('Failed to fetch stats:', error);
             } finally {
@@ -104,6 +120,37 @@ export default function AdminDashboard() {
                     </div>
                 </div>
             )}
+
+            {/* Daily Trends */}
+            {daily.length > 0 && (
+                <div className="mt-8 p-6 bg-gray-900 rounded-xl border border-white/10 overflow-x-auto">
+                    <h2 className="text-xl font-semibold text-white mb-4">Last 14 Days</h2>
+                    <table className="w-full text-sm">
+                        <thead>
+                            <tr className="text-gray-500 text-left">
+                                <th className="py-2 pr-4 font-medium">Day</th>
+                                <th className="py-2 pr-4 font-medium">New Users</th>
+                                <th className="py-2 pr-4 font-medium">Jobs</th>
+                                <th className="py-2 pr-4 font-medium">Completed</th>
+                                <th className="py-2 pr-4 font-medium">Failed</th>
+                                <th className="py-2 font-medium">Codes Redeemed</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {[...daily].reverse().map((d) => (
+                                <tr key={d.day} className="border-t border-white/5 text-gray-300">
+                                    <td className="py-2 pr-4 font-mono">{d.day}</td>
+                                    <td className="py-2 pr-4">{d.new_users}</td>
+                                    <td className="py-2 pr-4">{d.jobs_created}</td>
+                                    <td className="py-2 pr-4 text-green-400">{d.jobs_completed}</td>
+                                    <td className="py-2 pr-4 text-red-400">{d.jobs_failed}</td>
+                                    <td className="py-2">{d.codes_redeemed}</td>
+                                </tr>
+                            ))}
+                        </tbody>
+                    </table>
+                </div>
+            )}
         </div>
     );
 }
@@ -11,6 +11,7 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent } from '@/components/ui/card';
 import { FileUpload } from '@/components/ui/FileUpload';
 import { AuroraBackground } from '@/components/ui/AuroraBackground';
+import { uploadMultipart } from '@/lib/upload';
 import { toast } from 'sonner';
 import { useAuth } from '@clerk/nextjs';
 import { useTranslations, useLocale } from 'next-intl';
@@ -112,24 +113,8 @@ export default function DashboardPage() {
         try {
             const token = await getToken();
 
-            const formData = new FormData();
-            formData.append('file', file);
-
-            // Use Direct Railway URL to bypass Vercel 4.5MB limit
-            const DIRECT_API = 'https://aiwatermarkremover-production.up.railway.app';
-
-            const uploadResponse = await fetch(`${DIRECT_API}/api/upload`, {
-                method: 'POST',
-                headers: { 'Authorization': `Bearer ${token}` },
-                body: formData,
-            });
-
-            if (!uploadResponse.ok) {
-                const errorText = await uploadResponse.text();
-                console.error("Upload failed details:", errorText);
-                throw new Error(`Upload failed: ${errorText}`);
-            }
-            const { key } = await uploadResponse.json();
+            // Upload parts straight to R2, the backend only signs the requests
+            const key = await uploadMultipart(file, token);
 
             const jobResponse = await fetch(`${API_URL}/api/jobs?input_key=${encodeURIComponent(key)}`, {
                 method: 'POST',
@@ -13,6 +13,9 @@ interface Job {
     status: 'pending' | 'processing' | 'completed' | 'failed';
     input_url?: string;
     output_url?: string;
+    progress: number;
+    eta_seconds?: number | null;
+    error?: string | null;
     created_at: string;
 }
 
@@ -87,9 +90,10 @@ export default function JobPage() {
                 const data = await res.json();
                 if (isMounted) {
                     setJob(data);
-                    // Stop polling if completed/failed? 
-                    // The interval will run regardless, but that's fine for now, 
-                    // or we could clear it if status is terminal.
+                    // Progress is pushed by the worker, nothing changes after a terminal state
+                    if (data.status === 'completed' || data.status === 'failed') {
+                        clearInterval(interval);
+                    }
                 }
 
             } catch (err) {
@@ -249,6 +253,22 @@ export default function JobPage() {
                                                 {job.status === 'pending' ? 'Preparing' : 'Restoring'}
                                             </h3>
 
+                                            {/* Real progress reported by the worker */}
+                                            {job.status === 'processing' && (
+                                                <div className="w-64 space-y-2">
+                                                    <div className="h-1.5 w-full rounded-full bg-white/10 overflow-hidden">
+                                                        <div
+                                                            className="h-full bg-gradient-to-r from-blue-400 to-purple-400 transition-all duration-700"
+                                                            style={{ width: `${job.progress ?? 0}%` }}
+                                                        ></div>
+                                                    </div>
+                                                    <p className="text-white/60 text-xs font-mono">
+                                                        {job.progress ?? 0}%
+                                                        {job.eta_seconds != null && job.eta_seconds > 0 && ` · ~${job.eta_seconds}s left`}
+                                                    </p>
+                                                </div>
+                                            )}
+
                                             {/* Dynamic Step Text */}
                                             <div className="h-8 overflow-hidden relative w-full flex justify-center">
                                                 <p key={activityStep} className="text-blue-200/80 text-sm font-mono tracking-widest uppercase animate-[slideUp_0.5s_ease-out]">
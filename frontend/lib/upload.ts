@@ -0,0 +1,88 @@
+const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://localhost:8000';
+
+// Number of parts uploaded to R2 at the same time
+const PART_CONCURRENCY = 4;
+
+interface PartURL {
+    part_number: number;
+    url: string;
+}
+
+interface MultipartUpload {
+    key: string;
+    upload_id: string;
+    part_size: number;
+    parts: PartURL[];
+}
+
+/**
+ * Upload a file straight to R2/S3 using presigned multipart URLs.
+ * The backend only creates/completes the upload; the bytes never pass through it.
+ * Returns the object key to pass to job creation.
+ */
+export async function uploadMultipart(file: File, token: string | null): Promise<string> {
+    const headers = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`,
+    };
+
+    const createRes = await fetch(`${API_URL}/api/uploads/multipart`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({
+            filename: file.name,
+            content_type: file.type || 'video/mp4',
+            size: file.size,
+        }),
+    });
+    if (!createRes.ok) {
+        throw new Error(`Upload failed: ${await createRes.text()}`);
+    }
+    const upload: MultipartUpload = await createRes.json();
+
+    try {
+        const completed: { part_number: number; etag: string }[] = [];
+        const queue = [...upload.parts];
+
+        const worker = async () => {
+            while (queue.length > 0) {
+                const part = queue.shift()!;
+                const start = (part.part_number - 1) * upload.part_size;
+                const res = await fetch(part.url, {
+                    method: 'PUT',
+                    body: file.slice(start, start + upload.part_size),
+                });
+                const etag = res.headers.get('ETag');
+                if (!res.ok || !etag) {
+                    throw new Error(`Part ${part.part_number} upload failed`);
+                }
+                completed.push({ part_number: part.part_number, etag });
+            }
+        };
+        await Promise.all(
+            Array.from({ length: Math.min(PART_CONCURRENCY, upload.parts.length) }, worker)
+        );
+
+        const completeRes = await fetch(`${API_URL}/api/uploads/multipart/complete`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({
+                key: upload.key,
+                upload_id: upload.upload_id,
+                parts: completed,
+            }),
+        });
+        if (!completeRes.ok) {
+            throw new Error(`Upload failed: ${await completeRes.text()}`);
+        }
+        return upload.key;
+    } catch (error) {
+        // Free the already uploaded parts on the bucket side
+        await fetch(`${API_URL}/api/uploads/multipart/abort`, {
+            method: 'POST',
+            headers,
+            body: JSON.stringify({ key: upload.key, upload_id: upload.upload_id }),
+        }).catch(() => undefined);
+        throw error;
+    }
+}
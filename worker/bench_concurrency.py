@@ -0,0 +1,118 @@
+"""
+Measure worker throughput (jobs/hour) at different per-pod concurrency levels.
+
+Usage:
+    python bench_concurrency.py --jobs 8 --concurrency 1 2 3 4
+    python bench_concurrency.py --simulate-inference 0.02   # no models/GPU needed
+
+Synthetic videos are served from a local directory-backed object store with a
+simulated transfer bandwidth, so download/upload time is comparable to R2.
+Jobs go through handler.handler exactly as RunPod would call it.
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import handler
+
+
+class LocalObjectStore:
+    """Stand-in for the boto3 S3 client with a fixed transfer bandwidth."""
+
+    def __init__(self, root: Path, bandwidth_mbps: float):
+        self.root = root
+        self.bandwidth_mbps = bandwidth_mbps
+
+    def _transfer(self, src: Path, dst: Path):
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dst)
+        time.sleep(src.stat().st_size * 8 / 1e6 / self.bandwidth_mbps)
+
+    def download_file(self, bucket, key, filename):
+        self._transfer(self.root / key, Path(filename))
+
+    def upload_file(self, filename, bucket, key):
+        self._transfer(Path(filename), self.root / key)
+
+
+class SimulatedDeMarker:
+    """Copies the input after sleeping per frame, in place of real inference."""
+
+    def __init__(self, seconds_per_frame: float):
+        self.seconds_per_frame = seconds_per_frame
+
+    def run(self, input_video_path, output_video_path, progress_callback=None, metrics_sink=None):
+        frames = int(cv2.VideoCapture(str(input_video_path)).get(cv2.CAP_PROP_FRAME_COUNT))
+        time.sleep(frames * self.seconds_per_frame)
+        shutil.copyfile(input_video_path, output_video_path)
+
+
+def make_video(path: Path, frames: int, width: int = 640, height: int = 360, fps: int = 30):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        cv2.putText(frame, "watermark", (20 + i % 100, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+
+async def run_level(jobs: int, concurrency: int, quality: str) -> float:
+    """Run `jobs` jobs with at most `concurrency` in flight, return jobs/hour."""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with slots:
+            result = await handler.handler({"input": {
+                "job_id": f"bench-{concurrency}-{i}",
+                "input_key": "uploads/bench.mp4",
+                "output_key": f"outputs/bench-{concurrency}-{i}.mp4",
+                "quality": quality,
+            }})
+            assert result["status"] == "completed", result
+
+    began = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(jobs)))
+    return jobs / (time.perf_counter() - began) * 3600
+
+
+async def main(args):
+    root = Path(tempfile.mkdtemp(prefix="bench-store-"))
+    make_video(root / "uploads" / "bench.mp4", args.frames)
+    handler.s3_client = LocalObjectStore(root, args.bandwidth_mbps)
+    if args.simulate_inference is not None:
+        simulated = SimulatedDeMarker(args.simulate_inference)
+        handler.DeMarkWorld = lambda cleaner_type: simulated
+    else:
+        # Load models once so the first level does not pay for it
+        with handler.checkout_demarker(handler.cleaner_type_for(args.quality)):
+            pass
+
+    print(f"{'concurrency':>11} {'jobs/hour':>10} {'speedup':>8}")
+    baseline = None
+    for concurrency in args.concurrency:
+        throughput = await run_level(args.jobs, concurrency, args.quality)
+        baseline = baseline or throughput
+        print(f"{concurrency:>11} {throughput:>10.0f} {throughput / baseline:>7.2f}x")
+
+    shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--quality", default="lama")
+    parser.add_argument("--bandwidth-mbps", type=float, default=200.0)
+    parser.add_argument("--simulate-inference", type=float, default=None,
+                        help="Seconds per frame instead of running the models")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,71 @@
+"""
+Time the modulated deformable conv backends used by E2FGVI's propagation.
+
+Usage:
+    python bench_deform_conv.py --width 1280 --height 720 --frames 10
+    python bench_deform_conv.py --backends vectorized torchvision --threads 8
+
+Shapes match SecondOrderDeformableAlignment in E2FGVI-HQ: 256 input channels,
+128 output channels, 3x3 kernel, 16 deform groups, at 1/4 of the frame size.
+Each propagation direction calls it once per local frame after the first.
+"""
+import argparse
+import time
+
+import torch
+
+from demark_world.models.model.modules.deform_conv import BACKENDS
+
+C_IN, C_OUT, DEFORM_GROUPS, K = 256, 128, 16, 9
+
+
+def make_inputs(height: int, width: int):
+    h, w = height // 4, width // 4
+    x = torch.randn(1, C_IN, h, w)
+    offset = torch.randn(1, 2 * K * DEFORM_GROUPS, h, w) * 2
+    mask = torch.rand(1, K * DEFORM_GROUPS, h, w)
+    weight = torch.randn(C_OUT, C_IN, 3, 3) * 0.01
+    bias = torch.zeros(C_OUT)
+    return x, offset, mask, weight, bias
+
+
+@torch.inference_mode()
+def time_backend(backend: str, inputs, repeats: int) -> float:
+    x, offset, mask, weight, bias = inputs
+    fn = BACKENDS[backend]
+    fn(x, offset, mask, weight, bias, 1, 1, 1, 1, DEFORM_GROUPS)  # warm up
+    began = time.perf_counter()
+    for _ in range(repeats):
+        fn(x, offset, mask, weight, bias, 1, 1, 1, 1, DEFORM_GROUPS)
+    return (time.perf_counter() - began) / repeats
+
+
+def main(args):
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    inputs = make_inputs(args.height, args.width)
+    # Two directions, one call per local frame after the first
+    calls_per_window = 2 * (args.frames - 1)
+
+    print(f"feature map {inputs[0].shape[-1]}x{inputs[0].shape[-2]}, {torch.get_num_threads()} threads")
+    print(f"{'backend':>12} {'ms/call':>9} {'s/window':>9}")
+    for backend in args.backends:
+        try:
+            seconds = time_backend(backend, inputs, args.repeats)
+        except ImportError as e:
+            print(f"{backend:>12} unavailable ({e})")
+            continue
+        print(f"{backend:>12} {seconds * 1000:>9.1f} {seconds * calls_per_window:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=10, help="local frames per window")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument(
+        "--backends", nargs="+", default=["reference", "vectorized", "torchvision", "mmcv"]
+    )
+    main(parser.parse_args())
@@ -0,0 +1,248 @@
+"""
+End-to-end benchmark of DeMarkWorld.run on synthetic videos.
+
+Usage:
+    python bench_e2e.py                                    # offline, CPU, stand-in models
+    python bench_e2e.py --sizes 1280x720 --seconds 10 --cleaners lama --real
+    python bench_e2e.py --output e2e.json
+
+Videos are ffmpeg testsrc with a sine audio track and a watermark image
+overlaid at known positions. The watermark jumps between three corners once a
+second and is absent every fourth second. Each (size, length, cleaner) case
+runs in a fresh interpreter. It reports per-stage throughput (decode, detect,
+impute, clean, encode, ffmpeg_wait, audio_mux), peak RSS, and detection
+recall (IoU >= 0.5) and false positives against the ground-truth boxes.
+
+Without --real, stand-ins replace the models, so no weights or network are
+needed: template matching for the detector, cv2.inpaint for both cleaners.
+The stand-ins exercise the product's decode/impute/segment/encode path, but
+their compute cost is not the models'. Use --real (and --watermark with a
+mark the detector was trained on) to benchmark the models themselves.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import ffmpeg
+import numpy as np
+
+from demark_world.utils.quality_utils import box_iou
+
+FPS = 30
+SEGMENT_FRAMES = FPS  # The watermark moves once a second
+GAP_EVERY = 4  # ... and is absent every 4th second
+
+
+def make_watermark(path: Path, width: int, height: int):
+    mark = np.full((height, width, 3), 40, dtype=np.uint8)
+    cv2.rectangle(mark, (2, 2), (width - 3, height - 3), (255, 255, 255), 2)
+    cv2.putText(mark, "WM", (width // 5, height * 3 // 4), cv2.FONT_HERSHEY_SIMPLEX, height / 40, (255, 255, 255), 2)
+    cv2.imwrite(str(path), mark)
+
+
+def watermark_positions(width: int, height: int, mark_w: int, mark_h: int) -> List[Tuple[int, int]]:
+    margin_x, margin_y = width // 20, height // 20
+    return [
+        (margin_x, margin_y),
+        (width - mark_w - margin_x, height // 2 - mark_h // 2),
+        (margin_x, height - mark_h - margin_y),
+    ]
+
+
+def ground_truth(total_frames: int, positions, mark_w: int, mark_h: int) -> List[Optional[tuple]]:
+    boxes = []
+    for frame in range(total_frames):
+        segment = frame // SEGMENT_FRAMES
+        if segment % GAP_EVERY == GAP_EVERY - 1:
+            boxes.append(None)
+        else:
+            x, y = positions[segment % len(positions)]
+            boxes.append((x, y, x + mark_w, y + mark_h))
+    return boxes
+
+
+def synthesize(path: Path, watermark: Path, width: int, height: int, seconds: int) -> List[Optional[tuple]]:
+    """Write the test video, return the ground-truth box (or None) of every frame."""
+    mark_h, mark_w = cv2.imread(str(watermark)).shape[:2]
+    positions = watermark_positions(width, height, mark_w, mark_h)
+    total_frames = seconds * FPS
+    truth = ground_truth(total_frames, positions, mark_w, mark_h)
+
+    video = ffmpeg.input(f"testsrc=size={width}x{height}:rate={FPS}:duration={seconds}", f="lavfi")
+    audio = ffmpeg.input(f"sine=frequency=440:duration={seconds}", f="lavfi")
+    for index, (x, y) in enumerate(positions):
+        windows = []
+        for segment in range(index, total_frames // SEGMENT_FRAMES, len(positions)):
+            if segment % GAP_EVERY != GAP_EVERY - 1:
+                start = segment * SEGMENT_FRAMES / FPS
+                # End half a frame early so neighbouring windows never share a frame
+                end = (segment * SEGMENT_FRAMES + SEGMENT_FRAMES - 0.5) / FPS
+                windows.append(f"between(t,{start},{end})")
+        if windows:
+            video = ffmpeg.overlay(video, ffmpeg.input(str(watermark)), x=x, y=y, enable="+".join(windows))
+    (
+        ffmpeg.output(video, audio, str(path), vcodec="libx264", pix_fmt="yuv420p", acodec="aac", r=FPS)
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return truth
+
+
+class TemplateDetector:
+    """Stand-in for DeMarkWorldDetector: template matching against the known mark."""
+
+    def __init__(self, watermark: Path, threshold: float = 0.8):
+        self.template = cv2.cvtColor(cv2.imread(str(watermark)), cv2.COLOR_BGR2GRAY)
+        self.threshold = threshold
+
+    def detect(self, input_image: np.ndarray):
+        gray = cv2.cvtColor(input_image, cv2.COLOR_BGR2GRAY)
+        scores = cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, (x1, y1) = cv2.minMaxLoc(scores)
+        if confidence < self.threshold:
+            return {"detected": False, "bbox": None, "confidence": None, "center": None}
+        h, w = self.template.shape
+        return {
+            "detected": True,
+            "bbox": (x1, y1, x1 + w, y1 + h),
+            "confidence": float(confidence),
+            "center": (x1 + w // 2, y1 + h // 2),
+        }
+
+
+class RecordingDetector:
+    """Pass-through that keeps every frame's detected box for scoring."""
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.boxes = []
+
+    def detect(self, input_image: np.ndarray):
+        result = self.detector.detect(input_image)
+        self.boxes.append(result["bbox"])
+        return result
+
+
+class InpaintLamaStandIn:
+    def clean(self, input_image: np.ndarray, watermark_mask: np.ndarray) -> np.ndarray:
+        return cv2.inpaint(input_image, watermark_mask, 3, cv2.INPAINT_TELEA)
+
+
+@dataclass
+class StandInE2FGVIConfig:
+    overlap_ratio: float = 0.05
+
+
+class InpaintE2FGVIStandIn:
+    config = StandInE2FGVIConfig()
+
+    def clean(self, frames: np.ndarray, masks: np.ndarray) -> List[np.ndarray]:
+        return [cv2.inpaint(frame, mask, 3, cv2.INPAINT_TELEA) for frame, mask in zip(frames, masks)]
+
+
+def detection_scores(truth: List[Optional[tuple]], detected: List[Optional[tuple]]) -> dict:
+    present = [i for i, box in enumerate(truth) if box is not None]
+    hits = sum(1 for i in present if i < len(detected) and box_iou(truth[i], detected[i]) >= 0.5)
+    false_positives = sum(1 for i, box in enumerate(truth) if box is None and i < len(detected) and detected[i])
+    return {
+        "recall": hits / len(present) if present else 1.0,
+        "false_positives": false_positives,
+        "frames_with_watermark": len(present),
+    }
+
+
+def measure(video: Path, truth_path: Path, watermark: Path, cleaner: str, real: bool) -> dict:
+    from demark_world.core import DeMarkWorld
+    from demark_world.schemas import CleanerType
+
+    cleaner_type = CleanerType(cleaner)
+    if real:
+        from demark_world.watermark_detector import DeMarkWorldDetector
+
+        detector, cleaner_impl = RecordingDetector(DeMarkWorldDetector()), None
+    else:
+        detector = RecordingDetector(TemplateDetector(watermark))
+        cleaner_impl = InpaintLamaStandIn() if cleaner_type == CleanerType.LAMA else InpaintE2FGVIStandIn()
+    demarker = DeMarkWorld(cleaner_type, detector=detector, cleaner=cleaner_impl)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        began = time.perf_counter()
+        demarker.run(video, Path(tmp) / "out.mp4", quiet=True)
+        total = time.perf_counter() - began
+
+    truth = [tuple(it) if it else None for it in json.loads(truth_path.read_text())]
+    return {
+        "seconds": total,
+        "frames": len(truth),
+        "fps": len(truth) / total,
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": demarker.stage_timer.as_dict(),
+        **detection_scores(truth, detector.boxes),
+    }
+
+
+def main(args):
+    stage_names = ["decode", "detect", "impute", "clean", "encode", "ffmpeg_wait", "audio_mux"]
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        watermark = args.watermark
+        if watermark is None:
+            watermark = tmp / "watermark.png"
+            make_watermark(watermark, 120, 48)
+
+        header = f"{'size':>10} {'sec':>4} {'cleaner':>10} {'fps':>6} {'RSS MB':>7} {'recall':>7} {'FP':>4}"
+        print(header + "".join(f" {name + ' fps':>13}" for name in stage_names))
+        for size in args.sizes:
+            width, height = (int(v) for v in size.split("x"))
+            for seconds in args.seconds:
+                video = tmp / f"{size}_{seconds}s.mp4"
+                truth_path = video.with_suffix(".json")
+                truth_path.write_text(json.dumps(synthesize(video, watermark, width, height, seconds)))
+                for cleaner in args.cleaners:
+                    command = [sys.executable, __file__, "--measure", str(video), "--truth", str(truth_path),
+                               "--watermark", str(watermark), "--cleaners", cleaner]
+                    if args.real:
+                        command.append("--real")
+                    result = subprocess.run(command, capture_output=True, text=True)
+                    if result.returncode != 0:
+                        print(f"{size:>10} {seconds:>4} {cleaner:>10} failed:\n{result.stderr[-2000:]}")
+                        continue
+                    r = json.loads(result.stdout.strip().splitlines()[-1])
+                    report.append({"size": size, "video_seconds": seconds, "cleaner": cleaner, **r})
+                    line = (f"{size:>10} {seconds:>4} {cleaner:>10} {r['fps']:>6.1f} {r['peak_rss_mb']:>7.0f} "
+                            f"{r['recall']:>7.3f} {r['false_positives']:>4}")
+                    stages = r["stages"]
+                    print(line + "".join(
+                        f" {stages[name]['fps'] if name in stages else 0:>13.1f}" for name in stage_names
+                    ))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", default=["640x360", "1280x720"])
+    parser.add_argument("--seconds", nargs="+", type=int, default=[4, 12])
+    parser.add_argument("--cleaners", nargs="+", default=["lama", "e2fgvi_hq"])
+    parser.add_argument("--real", action="store_true", help="use the real models (needs their weights)")
+    parser.add_argument("--watermark", type=Path, help="watermark image to overlay, a generated one if omitted")
+    parser.add_argument("--output", type=Path, help="also write the results as JSON")
+    parser.add_argument("--measure", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--truth", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.truth, args.watermark, args.cleaners[0], args.real)))
+    else:
+        main(args)
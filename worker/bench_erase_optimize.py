@@ -0,0 +1,92 @@
+"""
+CPU latency of the erase models with each IOPAINT_OPTIMIZE mode.
+
+Usage:
+    python bench_erase_optimize.py --models lama migan mat --width 1280 --height 720
+
+Each (model, mode) runs twice in fresh interpreters sharing one optimized-model
+directory: the first run pays for freezing/compiling and fills the cache, the
+second shows what later worker processes see. Reports load time, first call
+and median steady-state latency.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def measure(model: str, width: int, height: int, repeats: int) -> dict:
+    import numpy as np
+    import torch
+
+    from demark_world.iopaint.download import cli_download_model, scan_models
+    from demark_world.iopaint.model_manager import ModelManager
+    from demark_world.iopaint.schema import InpaintRequest
+    from demark_world.utils.warmup_utils import watermark_box
+
+    if model not in [it.name for it in scan_models()]:
+        cli_download_model(model)
+
+    timings = {}
+    began = time.perf_counter()
+    manager = ModelManager(name=model, device=torch.device("cpu"))
+    timings["load"] = time.perf_counter() - began
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width, 1), dtype=np.uint8)
+    x1, y1, x2, y2 = watermark_box(width, height)
+    mask[y1:y2, x1:x2] = 255
+    request = InpaintRequest()
+
+    began = time.perf_counter()
+    manager(image, mask, request)
+    timings["first_call"] = time.perf_counter() - began
+
+    latencies = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        manager(image, mask, request)
+        latencies.append(time.perf_counter() - began)
+    timings["median"] = statistics.median(latencies)
+    return timings
+
+
+def main(args):
+    print(f"{'model':>10} {'mode':>8} {'run':>5} {'load s':>7} {'first s':>8} {'median ms':>10}")
+    for model in args.models:
+        for mode in args.modes:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                env = {**os.environ, "IOPAINT_OPTIMIZE": mode, "IOPAINT_OPTIMIZED_MODEL_DIR": cache_dir}
+                env.pop("TORCHINDUCTOR_CACHE_DIR", None)
+                for run in ("cold", "warm"):
+                    result = subprocess.run(
+                        [sys.executable, __file__, "--measure", model, "--width", str(args.width),
+                         "--height", str(args.height), "--repeats", str(args.repeats)],
+                        capture_output=True, text=True, env=env,
+                    )
+                    if result.returncode != 0:
+                        print(f"{model:>10} {mode:>8} {run:>5} failed: {result.stderr.strip().splitlines()[-1]}")
+                        break
+                    t = json.loads(result.stdout.strip().splitlines()[-1])
+                    print(f"{model:>10} {mode:>8} {run:>5} {t['load']:>7.2f} {t['first_call']:>8.2f} {t['median'] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", default=["lama", "anime-lama", "migan", "manga", "mat", "fcf"])
+    parser.add_argument("--modes", nargs="+", default=["none", "freeze", "compile"])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.width, args.height, args.repeats)))
+    else:
+        main(args)
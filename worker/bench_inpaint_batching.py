@@ -0,0 +1,89 @@
+"""
+Throughput of the iopaint inpaint API path with and without micro-batching.
+
+Usage:
+    python bench_inpaint_batching.py --model lama --device cuda --clients 8 --batch-sizes 1 2 4 8
+    python bench_inpaint_batching.py --device cpu --size 512x512 --requests 8
+
+N client threads each submit requests back to back through an InpaintScheduler,
+as concurrent /api/v1/inpaint calls do. Reports requests/s, latency
+percentiles and the mean batch size for every max batch size; 1 is the
+unbatched baseline.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import torch
+
+from demark_world.iopaint.batch_scheduler import InpaintScheduler
+from demark_world.iopaint.benchmark import make_inputs
+from demark_world.iopaint.model.utils import torch_gc
+from demark_world.iopaint.model_manager import ModelManager
+from demark_world.iopaint.schema import HDStrategy, InpaintRequest
+
+
+def run(model_manager, args, max_batch_size: int) -> dict:
+    width, height = (int(v) for v in args.size.split("x"))
+    image, mask = make_inputs(width, height, args.coverage)
+    config = InpaintRequest(hd_strategy=HDStrategy.ORIGINAL)
+    scheduler = InpaintScheduler(
+        model_manager, max_batch_size=max_batch_size, max_wait_ms=args.max_wait_ms, on_idle=torch_gc
+    )
+    for _ in range(args.warmup):
+        scheduler.submit(image, mask, config)
+    scheduler.requests = scheduler.batches = 0
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(args.requests):
+            began = time.perf_counter()
+            scheduler.submit(image, mask, config)
+            with lock:
+                latencies.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    scheduler.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "mean_batch_size": scheduler.stats()["mean_batch_size"],
+    }
+
+
+def main(args):
+    model_manager = ModelManager(name=args.model, device=torch.device(args.device))
+    print(f"{args.model} on {args.device}, {args.size}, {args.clients} clients x {args.requests} requests")
+    print(f"{'max batch':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10}")
+    for max_batch_size in args.batch_sizes:
+        r = run(model_manager, args, max_batch_size)
+        print(
+            f"{max_batch_size:>9} {r['requests_per_s']:>8.2f} {r['p50_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f} {r['mean_batch_size']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="lama")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--size", default="512x512")
+    parser.add_argument("--coverage", type=float, default=0.1)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=16, help="requests per client")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--warmup", type=int, default=2)
+    main(parser.parse_args())
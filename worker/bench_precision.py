@@ -0,0 +1,132 @@
+"""
+Compare precision / memory-format modes for the cleaners and the detector.
+
+Usage:
+    python bench_precision.py --model lama --modes fp32 fp32+cl bf16 bf16+cl
+    python bench_precision.py --model e2fgvi_hq --video sample.mp4 --frames 50
+    python bench_precision.py --model detector --modes fp32 bf16
+
+Every mode is checked against fp32 on the same frames: PSNR/SSIM inside the
+watermark box for the cleaners (pixels outside it are copied from the input),
+box IoU for the detector. The fastest mode within tolerance is the one to set
+through DEMARK_WORLD_<MODEL>_PRECISION / _CHANNELS_LAST.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from demark_world.utils.precision_utils import InferencePolicy
+from demark_world.utils.quality_utils import box_iou, psnr, ssim
+from demark_world.utils.video_utils import VideoLoader
+from demark_world.utils.warmup_utils import watermark_box
+
+
+def load_frames(video: Path, frames: int):
+    loader = VideoLoader(video)
+    return np.array(loader.get_slice(0, min(frames, loader.total_frames)))
+
+
+def build(model: str, policy: InferencePolicy):
+    if model == "lama":
+        from demark_world.cleaner.lama_cleaner import LamaCleaner
+
+        return LamaCleaner(policy=policy)
+    if model == "e2fgvi_hq":
+        from demark_world.cleaner.e2fgvi_hq_cleaner import E2FGVIHDCleaner
+
+        return E2FGVIHDCleaner(policy=policy)
+    from demark_world.watermark_detector import DeMarkWorldDetector
+
+    return DeMarkWorldDetector(policy=policy)
+
+
+def run_model(model: str, runner, frames: np.ndarray, masks: np.ndarray) -> list:
+    if model == "lama":
+        return [runner.clean(frame, mask) for frame, mask in zip(frames, masks)]
+    if model == "e2fgvi_hq":
+        return [np.asarray(it, dtype=np.uint8) for it in runner.clean(frames, masks)]
+    return [runner.detect(frame)["bbox"] for frame in frames]
+
+
+def compare(model: str, reference: list, outputs: list, box) -> dict:
+    if model == "detector":
+        return {"iou": min(box_iou(a, b) for a, b in zip(reference, outputs))}
+    x1, y1, x2, y2 = box
+    crops = [(a[y1:y2, x1:x2], b[y1:y2, x1:x2]) for a, b in zip(reference, outputs)]
+    return {
+        "psnr": min(psnr(a, b) for a, b in crops),
+        "ssim": min(ssim(a, b) for a, b in crops),
+    }
+
+
+def within_tolerance(quality: dict, args) -> bool:
+    if "iou" in quality:
+        return quality["iou"] >= args.min_iou
+    return quality["psnr"] >= args.min_psnr and quality["ssim"] >= args.min_ssim
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video
+        if video is None:
+            from bench_concurrency import make_video
+
+            video = Path(tmp) / "bench.mp4"
+            make_video(video, args.frames, args.width, args.height)
+        frames = load_frames(video, args.frames)
+    if args.model == "e2fgvi_hq":
+        # DeMarkWorld.run hands E2FGVI RGB frames
+        frames = frames[:, :, :, ::-1].copy()
+
+    height, width = frames.shape[1:3]
+    box = watermark_box(width, height)
+    masks = np.zeros(frames.shape[:3], dtype=np.uint8)
+    masks[:, box[1] : box[3], box[0] : box[2]] = 255
+
+    modes = [InferencePolicy.parse(it) for it in args.modes]
+    if str(modes[0]) != "fp32":
+        modes.insert(0, InferencePolicy())
+
+    reference = None
+    results = []
+    print(f"{args.model}: {len(frames)} frames at {width}x{height}")
+    print(f"{'mode':>9} {'frames/s':>9} {'quality (worst frame)':>28}  ok")
+    for policy in modes:
+        runner = build(args.model, policy)
+        if str(runner.policy) != str(policy):
+            print(f"{str(policy):>9} not supported on this device, skipped")
+            continue
+        # Warm up; E2FGVI chunks by a ratio of the clip length, so it needs the whole clip
+        warm = len(frames) if args.model == "e2fgvi_hq" else 2
+        run_model(args.model, runner, frames[:warm], masks[:warm])
+        began = time.perf_counter()
+        outputs = run_model(args.model, runner, frames, masks)
+        fps = len(frames) / (time.perf_counter() - began)
+        if reference is None:
+            reference = outputs
+        quality = compare(args.model, reference, outputs, box)
+        ok = within_tolerance(quality, args)
+        results.append((policy, fps, ok))
+        shown = " ".join(f"{k}={v:.4g}" for k, v in quality.items())
+        print(f"{str(policy):>9} {fps:>9.2f} {shown:>28}  {'yes' if ok else 'NO'}")
+        del runner
+
+    best = max((it for it in results if it[2]), key=lambda it: it[1])
+    print(f"\nfastest within tolerance: {best[0]} ({best[1]:.2f} frames/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", choices=["lama", "e2fgvi_hq", "detector"], default="lama")
+    parser.add_argument("--modes", nargs="+", default=["fp32", "fp32+cl", "bf16", "bf16+cl", "fp16"])
+    parser.add_argument("--video", type=Path, help="sample video, synthetic frames if omitted")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--min-psnr", type=float, default=40.0)
+    parser.add_argument("--min-ssim", type=float, default=0.98)
+    parser.add_argument("--min-iou", type=float, default=0.9)
+    main(parser.parse_args())
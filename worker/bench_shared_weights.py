@@ -0,0 +1,99 @@
+"""
+Per-process memory and load time with private vs. mmap-shared weights.
+
+Usage:
+    demark-world-convert-weights          # once, writes the *.mmap.pt files
+    python bench_shared_weights.py --model e2fgvi_hq --processes 4
+
+Starts N processes that each load the model on CPU and stay alive, then
+reads RSS, PSS and USS of each. RSS counts shared page-cache pages in every
+process; PSS splits them between the processes sharing them and USS leaves
+them out, so those two show what sharing saves.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+
+def load(model: str):
+    if model == "lama":
+        from demark_world.cleaner.lama_cleaner import LamaCleaner
+
+        return LamaCleaner()
+    if model == "e2fgvi_hq":
+        from demark_world.cleaner.e2fgvi_hq_cleaner import E2FGVIHDCleaner
+
+        return E2FGVIHDCleaner()
+    from demark_world.watermark_detector import DeMarkWorldDetector
+
+    return DeMarkWorldDetector()
+
+
+def child(model: str):
+    import torch
+
+    torch.set_num_threads(1)
+    began = time.perf_counter()
+    loaded = load(model)
+    print(json.dumps({"load": time.perf_counter() - began}), flush=True)
+    sys.stdin.read()  # Stay alive until the parent has measured
+    del loaded
+
+
+def run(model: str, processes: int, shared: bool) -> list:
+    env = {**os.environ, "DEMARK_WORLD_SHARED_WEIGHTS": "1" if shared else "0", "CUDA_VISIBLE_DEVICES": ""}
+    children = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", model],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env,
+        )
+        for _ in range(processes)
+    ]
+    results = []
+    for proc in children:
+        # Skip anything a library printed before the result line
+        line = ""
+        while not line.startswith('{"load"'):
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"worker {proc.pid} exited before loading the model")
+        results.append(json.loads(line))
+    for proc, result in zip(children, results):
+        info = psutil.Process(proc.pid).memory_full_info()
+        result.update(rss=info.rss, pss=getattr(info, "pss", 0), uss=info.uss)
+    for proc in children:
+        proc.stdin.close()
+        proc.wait()
+    return results
+
+
+def main(args):
+    mb = 1024 * 1024
+    print(f"{args.model}, {args.processes} processes")
+    print(f"{'weights':>8} {'load s':>7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8} {'total PSS MB':>13}")
+    for shared in (False, True):
+        results = run(args.model, args.processes, shared)
+        avg = {k: sum(r[k] for r in results) / len(results) for k in results[0]}
+        total_pss = sum(r["pss"] for r in results)
+        print(
+            f"{'shared' if shared else 'private':>8} {avg['load']:>7.2f} {avg['rss'] / mb:>8.0f} "
+            f"{avg['pss'] / mb:>8.0f} {avg['uss'] / mb:>8.0f} {total_pss / mb:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", choices=["lama", "e2fgvi_hq", "detector"], default="e2fgvi_hq")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+    else:
+        main(args)
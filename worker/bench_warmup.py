@@ -0,0 +1,69 @@
+"""
+Report first-job latency with and without model warmup.
+
+Usage:
+    python bench_warmup.py --quality lama --width 1280 --height 720
+
+Each mode runs in a fresh interpreter so neither benefits from the other's
+JIT/cuDNN state. Reports model load, warmup, first job and second job times;
+with warmup the first job should be about as fast as the second.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def measure(video: Path, quality: str, width: int, height: int, warm: bool) -> dict:
+    from demark_world.core import DeMarkWorld
+    from demark_world.schemas import CleanerType
+
+    timings = {}
+    began = time.perf_counter()
+    demarker = DeMarkWorld(CleanerType.LAMA if quality == "lama" else CleanerType.E2FGVI_HQ)
+    timings["load"] = time.perf_counter() - began
+    timings["warmup"] = demarker.warmup([(width, height)]) if warm else 0.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("first_job", "second_job"):
+            began = time.perf_counter()
+            demarker.run(video, Path(tmp) / f"{name}.mp4", quiet=True)
+            timings[name] = time.perf_counter() - began
+    return timings
+
+
+def main(args):
+    from bench_concurrency import make_video
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = Path(tmp) / "bench.mp4"
+        make_video(video, args.frames, args.width, args.height)
+
+        print(f"{'mode':>6} {'load s':>7} {'warmup s':>9} {'first job s':>12} {'second job s':>13}")
+        for mode in ("cold", "warm"):
+            result = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--video", str(video),
+                 "--quality", args.quality, "--width", str(args.width), "--height", str(args.height)],
+                capture_output=True, text=True, check=True,
+            )
+            t = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{mode:>6} {t['load']:>7.2f} {t['warmup']:>9.2f} {t['first_job']:>12.2f} {t['second_job']:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quality", default="lama")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=90)
+    parser.add_argument("--measure", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--video", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.video, args.quality, args.width, args.height, args.measure == "warm")))
+    else:
+        main(args)
@@ -11,7 +11,10 @@ from demark_world.configs import E2FGVI_HQ_CHECKPOINT_PATH, E2FGVI_HQ_CHECKPOINT
 from demark_world.models.model.e2fgvi_hq import InpaintGenerator
 from demark_world.utils.devices_utils import get_device
 from demark_world.utils.download_utils import ensure_model_downloaded
+from demark_world.utils.precision_utils import InferencePolicy
 from demark_world.utils.video_utils import merge_frames_with_overlap
+from demark_world.utils.warmup_utils import DEFAULT_WARMUP_RESOLUTIONS, dummy_frame_and_mask
+from demark_world.utils.weights_utils import attach_shared_weights
 
 
 def get_ref_index(
@@ -78,13 +81,17 @@ class E2FGVIHDCleaner:
         self,
         ckpt_path: Path = E2FGVI_HQ_CHECKPOINT_PATH,
         config: E2FGVIHDConfig = E2FGVIHDConfig(),
+        policy: InferencePolicy | None = None,
     ):
         ensure_model_downloaded(ckpt_path, E2FGVI_HQ_CHECKPOINT_REMOTE_URL)
         self.model = InpaintGenerator().to(device)
-        state = torch.load(ckpt_path, map_location=device)
-        self.model.load_state_dict(state)
+        if not attach_shared_weights(self.model, ckpt_path, device):
+            state = torch.load(ckpt_path, map_location=device)
+            self.model.load_state_dict(state)
         self.model.eval()
         self.config = config
+        self.policy = (policy or InferencePolicy.from_env("e2fgvi_hq")).resolve(device)
+        self.policy.apply(self.model)
 
     def process_frames_chunk(
         self,
@@ -122,7 +129,7 @@ class E2FGVIHDCleaner:
             selected_imgs = imgs_chunk[:1, neighbor_ids + ref_ids, :, :, :]
             selected_masks = masks_chunk[:1, neighbor_ids + ref_ids, :, :, :]
 
-            with torch.no_grad():
+            with torch.no_grad(), self.policy.autocast(device):
                 masked_imgs = selected_imgs * (1 - selected_masks)
                 mod_size_h = 60
                 mod_size_w = 108
@@ -137,7 +144,7 @@ class E2FGVIHDCleaner:
                 pred_imgs, _ = self.model(masked_imgs, len(neighbor_ids))
                 pred_imgs = pred_imgs[:, :, :h, :w]
                 pred_imgs = (pred_imgs + 1) / 2
-                pred_imgs = pred_imgs.cpu().permute(0, 2, 3, 1).numpy() * 255
+                pred_imgs = pred_imgs.float().cpu().permute(0, 2, 3, 1).numpy() * 255
 
                 for i in range(len(neighbor_ids)):
                     idx = neighbor_ids[i]
@@ -206,6 +213,30 @@ class E2FGVIHDCleaner:
                 pass
         return comp_frames
 
+    def warmup(self, resolutions=DEFAULT_WARMUP_RESOLUTIONS, num_frames: int | None = None):
+        """Inpaint one dummy chunk per resolution so cuDNN autotuning and CUDA
+        kernel setup happen before the first job.
+
+        The default, neighbor_stride * 2 + 1 frames, is the smallest chunk
+        whose passes cover a full neighbor window plus reference frames; a
+        whole segment through clean() takes minutes on CPU for the same shapes.
+        """
+        num_frames = num_frames or self.config.neighbor_stride * 2 + 1
+        for width, height in resolutions:
+            frame, mask = dummy_frame_and_mask(width, height)
+            frames = np.repeat(frame[np.newaxis], num_frames, axis=0)
+            masks = np.repeat(mask[np.newaxis], num_frames, axis=0)
+            imgs, masks_tensor = numpy_to_tensor(frames, masks)
+            self.process_frames_chunk(
+                num_frames,
+                self.config.neighbor_stride,
+                imgs.to(device),
+                masks_tensor.to(device),
+                np.expand_dims(masks > 0, axis=-1).astype(np.uint8),
+                frames,
+                height,
+                width,
+            )
 
 if __name__ == "__main__":
     #       --frames examples/extract_frame_and_mask_frames.npy \
@@ -8,26 +8,48 @@ from loguru import logger
 from demark_world.configs import DEFAULT_WATERMARK_REMOVE_MODEL
 from demark_world.iopaint.const import DEFAULT_MODEL_DIR
 from demark_world.iopaint.download import cli_download_model, scan_models
+from demark_world.iopaint.helper import get_cache_path_by_url
+from demark_world.iopaint.model.lama import LAMA_MODEL_URL
 from demark_world.iopaint.model_manager import ModelManager
 from demark_world.iopaint.schema import InpaintRequest
 from demark_world.utils.devices_utils import get_device
+from demark_world.utils.precision_utils import InferencePolicy
+from demark_world.utils.warmup_utils import DEFAULT_WARMUP_RESOLUTIONS, dummy_frame_and_mask
+from demark_world.utils.weights_utils import attach_shared_weights
 
 # This codebase is from https://github.com/Sanster/IOPaint#, thanks for their amazing work!
 
 
 class LamaCleaner:
-    def __init__(self):
+    def __init__(self, policy: InferencePolicy | None = None):
         self.model = DEFAULT_WATERMARK_REMOVE_MODEL
         self.device = get_device()
+        self.policy = (policy or InferencePolicy.from_env("lama")).resolve(self.device)
 
         scanned_models = scan_models()
         if self.model not in [it.name for it in scanned_models]:
             logger.info(f"{self.model} not found in {DEFAULT_MODEL_DIR}, try to downloading")
             cli_download_model(self.model)
         self.model_manager = ModelManager(name=self.model, device=self.device)
+        attach_shared_weights(
+            self.model_manager.model.model, get_cache_path_by_url(LAMA_MODEL_URL), self.device
+        )
+        self.policy.apply(self.model_manager.model.model)
         self.inpaint_request = InpaintRequest()
 
     def clean(self, input_image: np.array, watermark_mask: np.array) -> np.array:
-        inpaint_result = self.model_manager(input_image, watermark_mask, self.inpaint_request)
+        with self.policy.autocast(self.device):
+            inpaint_result = self.model_manager(input_image, watermark_mask, self.inpaint_request)
         inpaint_result = cv2.cvtColor(inpaint_result, cv2.COLOR_BGR2RGB)
         return inpaint_result
+
+    def warmup(self, resolutions=DEFAULT_WARMUP_RESOLUTIONS, iterations: int = 2):
+        """Run dummy inpaints through the same crop/pad path as real frames.
+
+        The TorchScript profiling executor optimizes a graph only after
+        profiling it, so each shape needs two runs before it is fast.
+        """
+        for width, height in resolutions:
+            frame, mask = dummy_frame_and_mask(width, height)
+            for _ in range(iterations):
+                self.clean(frame, mask)
@@ -1,3 +1,4 @@
+import time
 from pathlib import Path
 from typing import Callable
 
@@ -12,7 +13,10 @@ from demark_world.utils.imputation_utils import (
     find_idxs_interval,
     get_interval_average_bbox,
 )
+from demark_world.utils.metrics_utils import MetricsSink
+from demark_world.utils.stage_timer import StageTimer
 from demark_world.utils.video_utils import VideoLoader, merge_frames_with_overlap
+from demark_world.utils.warmup_utils import DEFAULT_WARMUP_RESOLUTIONS
 from demark_world.watermark_cleaner import WaterMarkCleaner
 from demark_world.watermark_detector import DeMarkWorldDetector
 
@@ -20,10 +24,34 @@ VIDEO_EXTENSIONS = [".mp4", ".avi", ".mov", ".mkv", ".flv", ".wmv", ".webm"]
 
 
 class DeMarkWorld:
-    def __init__(self, cleaner_type: CleanerType = CleanerType.LAMA):
-        self.detector = DeMarkWorldDetector()
-        self.cleaner = WaterMarkCleaner(cleaner_type)
+    def __init__(
+        self,
+        cleaner_type: CleanerType = CleanerType.LAMA,
+        detector: DeMarkWorldDetector | None = None,
+        cleaner=None,
+    ):
+        # detector / cleaner can be passed in, e.g. stand-ins for benchmarks
+        self.detector = detector or DeMarkWorldDetector()
+        self.cleaner = cleaner or WaterMarkCleaner(cleaner_type)
         self.cleaner_type = cleaner_type
+        # Per-stage timings of the last run()
+        self.stage_timer = StageTimer()
+
+    def warmup(self, resolutions=DEFAULT_WARMUP_RESOLUTIONS, num_frames: int | None = None) -> float:
+        """Warm the detector and cleaner at the given (width, height) resolutions.
+
+        `num_frames` is the E2FGVI warmup clip length, its own default if None.
+        Returns the time spent in seconds.
+        """
+        began = time.perf_counter()
+        self.detector.warmup(resolutions)
+        if num_frames is not None and self.cleaner_type == CleanerType.E2FGVI_HQ:
+            self.cleaner.warmup(resolutions, num_frames=num_frames)
+        else:
+            self.cleaner.warmup(resolutions)
+        elapsed = time.perf_counter() - began
+        logger.info(f"Warmed up {self.cleaner_type.value} at {resolutions} in {elapsed:.2f}s")
+        return elapsed
 
     def run_batch(
         self,
@@ -78,7 +106,9 @@ class DeMarkWorld:
         output_video_path: Path,
         progress_callback: Callable[[int], None] | None = None,
         quiet: bool = False,
+        metrics_sink: MetricsSink | None = None,
     ):
+        timer = self.stage_timer = StageTimer(metrics_sink)
         input_video_loader = VideoLoader(input_video_path)
         output_video_path.parent.mkdir(parents=True, exist_ok=True)
         width = input_video_loader.width
@@ -124,13 +154,14 @@ class DeMarkWorld:
             )
         for idx, frame in enumerate(
             tqdm(
-                input_video_loader,
+                timer.iterate("decode", input_video_loader),
                 total=total_frames,
                 desc="Detect watermarks",
                 disable=quiet,
             )
         ):
-            detection_result = self.detector.detect(frame)
+            with timer.stage("detect", frames=1):
+                detection_result = self.detector.detect(frame)
             if detection_result["detected"]:
                 frame_bboxes[idx] = {"bbox": detection_result["bbox"]}
                 x1, y1, x2, y2 = detection_result["bbox"]
@@ -149,57 +180,58 @@ class DeMarkWorld:
         if not quiet:
             logger.debug(f"detect missed frames: {detect_missed}")
         bkps_full = [0, total_frames]
-        if detect_missed:
-            # 1. find the bkps of the bbox centers
-            bkps = find_2d_data_bkps(bbox_centers)
-            # add the start and end position, to form the complete interval boundaries
-            bkps_full = [0] + bkps + [total_frames]
-            # bkps_full = bkps_full[0] + bkps + bkps_full[1]
-            # logger.debug(f"bkps intervals: {bkps_full}")
-
-            # 2. calculate the average bbox of each interval
-            interval_bboxes = get_interval_average_bbox(bboxes, bkps_full)
-            # logger.debug(f"interval average bboxes: {interval_bboxes}")
-
-            # 3. find the interval index of each missed frame
-            missed_intervals = find_idxs_interval(detect_missed, bkps_full)
-            # logger.debug(
-            #     f"missed frame intervals: {list(zip(detect_missed, missed_intervals))}"
-            # )
-
-            # 4. fill the missed frames with the average bbox of the corresponding interval
-            for missed_idx, interval_idx in zip(detect_missed, missed_intervals):
-                if (
-                    interval_idx < len(interval_bboxes)
-                    and interval_bboxes[interval_idx] is not None
-                ):
-                    frame_bboxes[missed_idx]["bbox"] = interval_bboxes[interval_idx]
-                    if not quiet:
-                        logger.debug(
-                            f"Filled missed frame {missed_idx} with bbox:\n"
-                            f" {interval_bboxes[interval_idx]}"
-                        )
-                else:
-                    # if the interval has no valid bbox, use the previous and next frame to complete (fallback strategy)
-                    before = max(missed_idx - 1, 0)
-                    after = min(missed_idx + 1, total_frames - 1)
-                    before_box = frame_bboxes[before]["bbox"]
-                    after_box = frame_bboxes[after]["bbox"]
-                    if before_box:
-                        frame_bboxes[missed_idx]["bbox"] = before_box
-                    elif after_box:
-                        frame_bboxes[missed_idx]["bbox"] = after_box
-        else:
-            del bboxes
-            del bbox_centers
-            del detect_missed
+        with timer.stage("impute", frames=len(detect_missed)):
+            if detect_missed:
+                # 1. find the bkps of the bbox centers
+                bkps = find_2d_data_bkps(bbox_centers)
+                # add the start and end position, to form the complete interval boundaries
+                bkps_full = [0] + bkps + [total_frames]
+                # bkps_full = bkps_full[0] + bkps + bkps_full[1]
+                # logger.debug(f"bkps intervals: {bkps_full}")
+
+                # 2. calculate the average bbox of each interval
+                interval_bboxes = get_interval_average_bbox(bboxes, bkps_full)
+                # logger.debug(f"interval average bboxes: {interval_bboxes}")
+
+                # 3. find the interval index of each missed frame
+                missed_intervals = find_idxs_interval(detect_missed, bkps_full)
+                # logger.debug(
+                #     f"missed frame intervals: {list(zip(detect_missed, missed_intervals))}"
+                # )
+
+                # 4. fill the missed frames with the average bbox of the corresponding interval
+                for missed_idx, interval_idx in zip(detect_missed, missed_intervals):
+                    if (
+                        interval_idx < len(interval_bboxes)
+                        and interval_bboxes[interval_idx] is not None
+                    ):
+                        frame_bboxes[missed_idx]["bbox"] = interval_bboxes[interval_idx]
+                        if not quiet:
+                            logger.debug(
+                                f"Filled missed frame {missed_idx} with bbox:\n"
+                                f" {interval_bboxes[interval_idx]}"
+                            )
+                    else:
+                        # if the interval has no valid bbox, use the previous and next frame to complete (fallback strategy)
+                        before = max(missed_idx - 1, 0)
+                        after = min(missed_idx + 1, total_frames - 1)
+                        before_box = frame_bboxes[before]["bbox"]
+                        after_box = frame_bboxes[after]["bbox"]
+                        if before_box:
+                            frame_bboxes[missed_idx]["bbox"] = before_box
+                        elif after_box:
+                            frame_bboxes[missed_idx]["bbox"] = after_box
+            else:
+                del bboxes
+                del bbox_centers
+                del detect_missed
 
         if self.cleaner_type == CleanerType.LAMA:
             ## 1. Lama Cleaner Strategy.
             input_video_loader = VideoLoader(input_video_path)
             for idx, frame in enumerate(
                 tqdm(
-                    input_video_loader,
+                    timer.iterate("decode", input_video_loader),
                     total=total_frames,
                     desc="Remove watermarks",
                     disable=quiet,
@@ -210,10 +242,12 @@ class DeMarkWorld:
                     x1, y1, x2, y2 = bbox
                     mask = np.zeros((height, width), dtype=np.uint8)
                     mask[y1:y2, x1:x2] = 255
-                    cleaned_frame = self.cleaner.clean(frame, mask)
+                    with timer.stage("clean", frames=1):
+                        cleaned_frame = self.cleaner.clean(frame, mask)
                 else:
                     cleaned_frame = frame
-                process_out.stdin.write(cleaned_frame.tobytes())
+                with timer.stage("encode", frames=1):
+                    process_out.stdin.write(cleaned_frame.tobytes())
 
                 # 50% - 95%
                 if progress_callback and idx % 10 == 0:
@@ -260,7 +294,8 @@ class DeMarkWorld:
                         f"with_overlap=[{start}, {end}), overlap={segment_overlap}"
                     )
 
-                frames = np.array(input_video_loader.get_slice(start, end))
+                with timer.stage("decode", frames=end - start):
+                    frames = np.array(input_video_loader.get_slice(start, end))
                 # Convert BGR to RGB for E2FGVI_HQ cleaner (expects RGB format)
                 frames = frames[:, :, :, ::-1].copy()
 
@@ -272,7 +307,8 @@ class DeMarkWorld:
                         # offset
                         idx_offset = idx - start
                         masks[idx_offset][y1:y2, x1:x2] = 255
-                cleaned_frames = self.cleaner.clean(frames, masks)
+                with timer.stage("clean", frames=len(frames)):
+                    cleaned_frames = self.cleaner.clean(frames, masks)
 
                 # Merge with overlap blending support
                 all_cleaned_frames = merge_frames_with_overlap(
@@ -296,24 +332,30 @@ class DeMarkWorld:
                         cleaned_frame = all_cleaned_frames[write_idx]
                         # Convert RGB back to BGR for FFmpeg output (expects bgr24 format)
                         cleaned_frame_bgr = cleaned_frame[:, :, ::-1]
-                        process_out.stdin.write(cleaned_frame_bgr.astype(np.uint8).tobytes())
+                        with timer.stage("encode", frames=1):
+                            process_out.stdin.write(cleaned_frame_bgr.astype(np.uint8).tobytes())
                         frame_counter += 1
                         # 50% - 95%
                         if progress_callback and frame_counter % 10 == 0:
                             progress = 50 + int((frame_counter / total_frames) * 45)
                             progress_callback(progress)
 
-        process_out.stdin.close()
-        process_out.wait()
+        # Frames still queued in the encoder
+        with timer.stage("ffmpeg_wait"):
+            process_out.stdin.close()
+            process_out.wait()
 
         # 95% - 99%
         if progress_callback:
             progress_callback(95)
 
-        self.merge_audio_track(input_video_path, temp_output_path, output_video_path)
+        with timer.stage("audio_mux"):
+            self.merge_audio_track(input_video_path, temp_output_path, output_video_path)
 
         if progress_callback:
             progress_callback(99)
+        if metrics_sink is not None:
+            metrics_sink.run_finished(timer.stages)
 
     def merge_audio_track(
         self, input_video_path: Path, temp_output_path: Path, output_video_path: Path
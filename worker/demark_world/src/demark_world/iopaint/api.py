@@ -21,7 +21,7 @@ except:
     pass
 
 import uvicorn
-from fastapi import APIRouter, FastAPI, Request, UploadFile
+from fastapi import APIRouter, FastAPI, File, Form, Request, UploadFile
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -29,13 +29,17 @@ from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 from PIL import Image
+from pydantic import ValidationError
 from socketio import AsyncServer
 
+from demark_world.iopaint.batch_scheduler import InpaintScheduler
 from demark_world.iopaint.file_manager import FileManager
 from demark_world.iopaint.helper import (
     adjust_mask,
     concat_alpha_channel,
+    crop_to_mask_box,
     decode_base64_to_image,
+    decode_bytes_to_image,
     gen_frontend_mask,
     load_img,
     numpy_to_bytes,
@@ -46,6 +50,7 @@ from demark_world.iopaint.model_manager import ModelManager
 from demark_world.iopaint.plugins import InteractiveSeg, RealESRGANUpscaler, build_plugins
 from demark_world.iopaint.plugins.base_plugin import BasePlugin
 from demark_world.iopaint.plugins.remove_bg import RemoveBG
+from demark_world.iopaint.result_cache import ResultCache, result_cache_key
 from demark_world.iopaint.schema import (
     AdjustMaskRequest,
     ApiConfig,
@@ -154,6 +159,13 @@ class Api:
         self.file_manager = self._build_file_manager()
         self.plugins = self._build_plugins()
         self.model_manager = self._build_model_manager()
+        self.inpaint_scheduler = InpaintScheduler(
+            self.model_manager,
+            max_batch_size=self.config.batch_max_size,
+            max_wait_ms=self.config.batch_max_wait_ms,
+            on_idle=torch_gc,
+        )
+        self.result_cache = ResultCache()
 
         # fmt: off
         self.add_api_route("/api/v1/gen-info", self.api_geninfo, methods=["POST"], response_model=GenInfoResponse)
@@ -163,6 +175,7 @@ class Api:
         self.add_api_route("/api/v1/model", self.api_switch_model, methods=["POST"], response_model=ModelInfo)
         self.add_api_route("/api/v1/inputimage", self.api_input_image, methods=["GET"])
         self.add_api_route("/api/v1/inpaint", self.api_inpaint, methods=["POST"])
+        self.add_api_route("/api/v1/inpaint_file", self.api_inpaint_file, methods=["POST"])
         self.add_api_route("/api/v1/switch_plugin_model", self.api_switch_plugin_model, methods=["POST"])
         self.add_api_route("/api/v1/run_plugin_gen_mask", self.api_run_plugin_gen_mask, methods=["POST"])
         self.add_api_route("/api/v1/run_plugin_gen_image", self.api_run_plugin_gen_image, methods=["POST"])
@@ -247,6 +260,8 @@ class Api:
             disableModelSwitch=False,
             isDesktop=False,
             samplers=self.api_samplers(),
+            modelCache=self.model_manager.cache_stats(),
+            resultCache=self.result_cache.stats(),
         )
 
     def api_input_image(self) -> FileResponse:
@@ -266,11 +281,8 @@ class Api:
             negative_prompt = parts[1].split("\n")[0].strip()
         return GenInfoResponse(prompt=prompt, negative_prompt=negative_prompt)
 
-    def api_inpaint(self, req: InpaintRequest):
-        image, alpha_channel, infos, ext = decode_base64_to_image(req.image)
-        mask, _, _, _ = decode_base64_to_image(req.mask, gray=True)
-        logger.info(f"image ext: {ext}")
-
+    def _inpaint(self, image, mask, req: InpaintRequest):
+        """Inpaint RGB `image` where gray `mask` > 127. Returns the RGB result and the binary mask."""
         mask = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)[1]
         if image.shape[:2] != mask.shape[:2]:
             raise HTTPException(
@@ -279,11 +291,27 @@ class Api:
             )
 
         start = time.time()
-        rgb_np_img = self.model_manager(image, mask, req)
-        logger.info(f"process time: {(time.time() - start) * 1000:.2f}ms")
-        torch_gc()
+        key = None
+        if self.result_cache.enabled:
+            key = result_cache_key(
+                self.model_manager.name, self.model_manager.model.is_erase_model, image, mask, req
+            )
+        bgr_np_img = self.result_cache.get(key) if key else None
+        if bgr_np_img is None:
+            bgr_np_img = self.inpaint_scheduler.submit(image, mask, req)
+            if key:
+                self.result_cache.put(key, bgr_np_img)
+            logger.info(f"process time: {(time.time() - start) * 1000:.2f}ms")
+        else:
+            logger.info(f"result cache hit: {(time.time() - start) * 1000:.2f}ms")
+        return cv2.cvtColor(bgr_np_img.astype(np.uint8), cv2.COLOR_BGR2RGB), mask
+
+    def api_inpaint(self, req: InpaintRequest):
+        image, alpha_channel, infos, ext = decode_base64_to_image(req.image)
+        mask, _, _, _ = decode_base64_to_image(req.mask, gray=True)
+        logger.info(f"image ext: {ext}")
 
-        rgb_np_img = cv2.cvtColor(rgb_np_img.astype(np.uint8), cv2.COLOR_BGR2RGB)
+        rgb_np_img, _ = self._inpaint(image, mask, req)
         rgb_res = concat_alpha_channel(rgb_np_img, alpha_channel)
 
         res_img_bytes = pil_to_bytes(
@@ -301,6 +329,52 @@ class Api:
             headers={"X-Seed": str(req.sd_seed)},
         )
 
+    def api_inpaint_file(
+        self,
+        image: UploadFile = File(...),
+        mask: UploadFile = File(...),
+        config: str = Form("{}", description="InpaintRequest JSON, image and mask are ignored"),
+        patch_only: bool = Form(False),
+    ):
+        """/api/v1/inpaint with the image and mask uploaded as files, no base64.
+
+        With patch_only, only the bounding box of the mask is encoded and
+        returned, with its position in the X-Patch-Offset header ("x,y"); an
+        empty mask returns 204. The extender changes the output size, so
+        patch_only can't be combined with use_extender (400).
+        """
+        try:
+            req = InpaintRequest.model_validate_json(config)
+        except ValidationError as e:
+            raise HTTPException(422, detail=e.errors())
+        if patch_only and req.use_extender:
+            raise HTTPException(400, detail="patch_only can't be used with use_extender")
+        np_img, alpha_channel, infos, ext = decode_bytes_to_image(image.file.read())
+        np_mask, _, _, _ = decode_bytes_to_image(mask.file.read(), gray=True)
+
+        rgb_np_img, np_mask = self._inpaint(np_img, np_mask, req)
+        asyncio.run(self.sio.emit("diffusion_finish"))
+
+        headers = {"X-Seed": str(req.sd_seed)}
+        if patch_only:
+            patch = crop_to_mask_box(rgb_np_img, np_mask)
+            if patch is None:
+                return Response(status_code=204, headers=headers)
+            rgb_np_img, (x, y) = patch
+            if alpha_channel is not None:
+                height, width = rgb_np_img.shape[:2]
+                alpha_channel = alpha_channel[y : y + height, x : x + width]
+            headers["X-Patch-Offset"] = f"{x},{y}"
+        rgb_res = concat_alpha_channel(rgb_np_img, alpha_channel)
+
+        res_img_bytes = pil_to_bytes(
+            Image.fromarray(rgb_res),
+            ext=ext,
+            quality=self.config.quality,
+            infos=infos,
+        )
+        return Response(content=res_img_bytes, media_type=f"image/{ext}", headers=headers)
+
     def api_run_plugin_gen_image(self, req: RunPluginRequest):
         ext = "png"
         if req.name not in self.plugins:
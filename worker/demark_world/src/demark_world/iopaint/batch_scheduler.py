@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional
+
+
+@dataclass
+class _Job:
+    key: Optional[tuple]
+    image: object
+    mask: object
+    config: object
+    submitted_at: float = field(default_factory=time.monotonic)
+    future: Future = field(default_factory=Future)
+
+
+class InpaintScheduler:
+    """Runs the inpaint requests of all API threads on one thread, batching them.
+
+    A request waits up to `max_wait_ms` after it was submitted for others with
+    the same ModelManager.batch_key (same model, padded shape and settings),
+    and runs with up to `max_batch_size - 1` of them in one batch_call. Requests
+    without a key run alone through ModelManager.__call__.
+    """
+
+    def __init__(
+        self,
+        model_manager,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 5.0,
+        on_idle: Optional[Callable[[], None]] = None,
+    ):
+        self.model_manager = model_manager
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        # Called whenever the queue runs empty, e.g. torch_gc
+        self.on_idle = on_idle
+        self.requests = 0
+        self.batches = 0
+        self._pending: Deque[_Job] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="inpaint-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, mask, config):
+        """Inpaint like ModelManager.__call__, blocking until the result is ready."""
+        key = None
+        if self.max_batch_size > 1:
+            key = self.model_manager.batch_key(image, config)
+        job = _Job(key, image, mask, config)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("InpaintScheduler is closed")
+            self._pending.append(job)
+            self._cond.notify_all()
+        return job.future.result()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _next_batch(self) -> List[_Job]:
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return []
+                self._cond.wait()
+            first = self._pending.popleft()
+            batch = [first]
+            if first.key is None:
+                return batch
+            deadline = first.submitted_at + self.max_wait
+            while len(batch) < self.max_batch_size:
+                for job in list(self._pending):
+                    if job.key == first.key and len(batch) < self.max_batch_size:
+                        self._pending.remove(job)
+                        batch.append(job)
+                remaining = deadline - time.monotonic()
+                if len(batch) == self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+            return batch
+
+    def _run(self, batch: List[_Job]):
+        if len(batch) == 1:
+            job = batch[0]
+            try:
+                job.future.set_result(self.model_manager(job.image, job.mask, job.config))
+            except Exception as e:
+                job.future.set_exception(e)
+            return
+        try:
+            results = self.model_manager.batch_call(
+                [it.image for it in batch], [it.mask for it in batch], batch[0].config
+            )
+            # A short result list would leave callers waiting forever
+            done = list(zip(batch, results, strict=True))
+        except Exception:
+            # e.g. out of memory for the whole batch; the requests may still fit alone
+            for job in batch:
+                self._run([job])
+            return
+        for job, result in done:
+            job.future.set_result(result)
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._run(batch)
+            self.requests += len(batch)
+            self.batches += 1
+            if self.on_idle is not None and not self._pending:
+                self.on_idle()
@@ -1,16 +1,34 @@
 #!/usr/bin/env python3
+"""
+Latency and memory benchmark for the erase models, on CPU, CUDA or MPS.
+
+    python -m demark_world.iopaint.benchmark --models lama mat --device cpu \
+        --sizes 512x512 1280x720 --coverages 0.02 0.1 --output bench.json
+    python -m demark_world.iopaint.benchmark --baseline bench.json   # exits 1 on regressions
+
+Runs every (model, image size, mask coverage, HD strategy) case and writes
+latency percentiles, peak RSS and peak device memory as JSON. Masks are one
+centered rectangle covering the given fraction of the image, like a
+watermark box. With --baseline, cases slower or bigger than the baseline by
+more than --tolerance are reported as regressions.
+"""
 
 import argparse
+import json
 import os
+import platform
+import sys
 import time
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-import nvidia_smi
 import psutil
 import torch
 
+from demark_world.iopaint.model import ERASE_MODELS
+from demark_world.iopaint.model.utils import torch_gc
 from demark_world.iopaint.model_manager import ModelManager
-from demark_world.iopaint.schema import HDStrategy, InpaintRequest, SDSampler
+from demark_world.iopaint.schema import HDStrategy, InpaintRequest
 
 try:
     torch._C._jit_override_can_fuse_on_cpu(False)
@@ -20,88 +38,209 @@ try:
 except:
     pass
 
-NUM_THREADS = str(4)
-
-os.environ["OMP_NUM_THREADS"] = NUM_THREADS
-os.environ["OPENBLAS_NUM_THREADS"] = NUM_THREADS
-os.environ["MKL_NUM_THREADS"] = NUM_THREADS
-os.environ["VECLIB_MAXIMUM_THREADS"] = NUM_THREADS
-os.environ["NUMEXPR_NUM_THREADS"] = NUM_THREADS
 if os.environ.get("CACHE_DIR"):
     os.environ["TORCH_HOME"] = os.environ["CACHE_DIR"]
 
+# Metrics compared against a baseline; latency is noisier than memory
+REGRESSION_METRICS = ("p50_ms", "p90_ms", "peak_rss_mb", "peak_device_mb")
+
 
-def run_model(model, size):
-    # RGB
-    image = np.random.randint(0, 256, (size[0], size[1], 3)).astype(np.uint8)
-    mask = np.random.randint(0, 255, size).astype(np.uint8)
+def make_inputs(width: int, height: int, coverage: float, seed: int = 0):
+    """An RGB noise image and a centered [H, W, 1] mask covering `coverage` of it."""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width, 1), dtype=np.uint8)
+    box_w = max(1, int(width * coverage**0.5))
+    box_h = max(1, int(height * coverage**0.5))
+    x1, y1 = (width - box_w) // 2, (height - box_h) // 2
+    mask[y1 : y1 + box_h, x1 : x1 + box_w] = 255
+    return image, mask
 
-    config = InpaintRequest(
+
+def make_request(strategy: HDStrategy) -> InpaintRequest:
+    return InpaintRequest(
         ldm_steps=2,
-        hd_strategy=HDStrategy.ORIGINAL,
+        hd_strategy=strategy,
         hd_strategy_crop_margin=128,
-        hd_strategy_crop_trigger_size=128,
-        hd_strategy_resize_limit=128,
-        prompt="a fox is sitting on a bench",
-        sd_steps=5,
-        sd_sampler=SDSampler.ddim,
+        hd_strategy_crop_trigger_size=512,
+        hd_strategy_resize_limit=768,
     )
-    model(image, mask, config)
 
 
-def benchmark(model, times: int, empty_cache: bool):
-    sizes = [(512, 512)]
+class DeviceMemory:
+    """Peak memory allocated on the device since reset(), None on CPU."""
+
+    def __init__(self, device: torch.device):
+        self.device = device
+        self.mps_peak = 0
+
+    def synchronize(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        elif self.device.type == "mps":
+            torch.mps.synchronize()
+
+    def reset(self):
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        self.mps_peak = 0
 
-    nvidia_smi.nvmlInit()
-    device_id = 0
-    handle = nvidia_smi.nvmlDeviceGetHandleByIndex(device_id)
+    def sample(self):
+        if self.device.type == "mps":
+            self.mps_peak = max(self.mps_peak, torch.mps.current_allocated_memory())
 
-    def format(metrics):
-        return f"{np.mean(metrics):.2f} ± {np.std(metrics):.2f}"
+    def peak_mb(self) -> Optional[float]:
+        if self.device.type == "cuda":
+            return torch.cuda.max_memory_allocated(self.device) / 1024 / 1024
+        if self.device.type == "mps":
+            return self.mps_peak / 1024 / 1024
+        return None
 
+
+def run_case(model, device_memory: DeviceMemory, image, mask, request, times: int, warmup: int) -> dict:
     process = psutil.Process(os.getpid())
-    # 每个 size 给出显存和内存占用的指标
-    for size in sizes:
-        torch.cuda.empty_cache()
-        time_metrics = []
-        cpu_metrics = []
-        memory_metrics = []
-        gpu_memory_metrics = []
-        for _ in range(times):
-            start = time.time()
-            run_model(model, size)
-            torch.cuda.synchronize()
-
-            # cpu_metrics.append(process.cpu_percent())
-            time_metrics.append((time.time() - start) * 1000)
-            memory_metrics.append(process.memory_info().rss / 1024 / 1024)
-            gpu_memory_metrics.append(nvidia_smi.nvmlDeviceGetMemoryInfo(handle).used / 1024 / 1024)
-
-        print(f"size: {size}".center(80, "-"))
-        # print(f"cpu: {format(cpu_metrics)}")
-        print(f"latency: {format(time_metrics)}ms")
-        print(f"memory: {format(memory_metrics)} MB")
-        print(f"gpu memory: {format(gpu_memory_metrics)} MB")
-
-    nvidia_smi.nvmlShutdown()
+    for _ in range(warmup):
+        model(image, mask, request)
+    device_memory.synchronize()
+    device_memory.reset()
+
+    latencies = []
+    peak_rss = process.memory_info().rss
+    for _ in range(times):
+        start = time.perf_counter()
+        model(image, mask, request)
+        device_memory.synchronize()
+        latencies.append((time.perf_counter() - start) * 1000)
+        device_memory.sample()
+        peak_rss = max(peak_rss, process.memory_info().rss)
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    peak_device_mb = device_memory.peak_mb()
+    return {
+        "p50_ms": round(float(p50), 2),
+        "p90_ms": round(float(p90), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(np.mean(latencies)), 2),
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+        "peak_device_mb": None if peak_device_mb is None else round(peak_device_mb, 1),
+    }
+
+
+def case_key(case: dict) -> Tuple:
+    return case["model"], case["size"], case["coverage"], case["hd_strategy"]
+
+
+def compare_to_baseline(results: List[dict], baseline: List[dict], tolerance: float) -> List[dict]:
+    """Cases whose metrics exceed the baseline's by more than `tolerance` (a fraction)."""
+    previous: Dict[Tuple, dict] = {case_key(it): it for it in baseline}
+    regressions = []
+    for case in results:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            if case.get(metric) is None or not old.get(metric):
+                continue
+            change = case[metric] / old[metric] - 1
+            if change > tolerance:
+                regressions.append(
+                    {
+                        "model": case["model"],
+                        "size": case["size"],
+                        "coverage": case["coverage"],
+                        "hd_strategy": case["hd_strategy"],
+                        "metric": metric,
+                        "baseline": old[metric],
+                        "current": case[metric],
+                        "change": round(change, 3),
+                    }
+                )
+    return regressions
+
+
+def benchmark(args) -> List[dict]:
+    device = torch.device(args.device)
+    device_memory = DeviceMemory(device)
+    sizes = [tuple(int(v) for v in it.lower().split("x")) for it in args.sizes]
+    results = []
+    for name in args.models:
+        try:
+            model = ModelManager(name=name, device=device, disable_nsfw=True, sd_cpu_textencoder=True)
+        except NotImplementedError as e:
+            # Not downloaded (see `iopaint download`) or not an erase model
+            print(f"skip {name}: {e}", file=sys.stderr)
+            continue
+        for width, height in sizes:
+            for coverage in args.coverages:
+                image, mask = make_inputs(width, height, coverage)
+                for strategy in args.hd_strategies:
+                    request = make_request(HDStrategy(strategy))
+                    metrics = run_case(model, device_memory, image, mask, request, args.times, args.warmup)
+                    case = {
+                        "model": name,
+                        "size": f"{width}x{height}",
+                        "coverage": coverage,
+                        "hd_strategy": strategy,
+                        **metrics,
+                    }
+                    print(json.dumps(case), file=sys.stderr)
+                    results.append(case)
+        del model
+        torch_gc()
+    return results
 
 
 def get_args_parser():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--name")
-    parser.add_argument("--device", default="cuda", type=str)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=list(ERASE_MODELS))
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu", type=str)
+    parser.add_argument("--sizes", nargs="+", default=["512x512", "1280x720", "1920x1080"])
+    parser.add_argument("--coverages", nargs="+", type=float, default=[0.02, 0.1, 0.3])
+    parser.add_argument("--hd-strategies", nargs="+", default=[it.value for it in HDStrategy])
     parser.add_argument("--times", default=10, type=int)
-    parser.add_argument("--empty-cache", action="store_true")
+    parser.add_argument("--warmup", default=2, type=int)
+    parser.add_argument("--threads", default=0, type=int, help="torch intra-op threads, 0 keeps the default")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", default=0.15, type=float)
     return parser.parse_args()
 
 
-if __name__ == "__main__":
+def main():
     args = get_args_parser()
-    device = torch.device(args.device)
-    model = ModelManager(
-        name=args.name,
-        device=device,
-        disable_nsfw=True,
-        sd_cpu_textencoder=True,
-    )
-    benchmark(model, args.times, args.empty_cache)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    report = {
+        "environment": {
+            "device": args.device,
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "cpu": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": benchmark(args),
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare_to_baseline(report["results"], baseline, args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    for it in report.get("regressions", []):
+        print(
+            f"REGRESSION {it['model']} {it['size']} coverage={it['coverage']} {it['hd_strategy']}: "
+            f"{it['metric']} {it['baseline']} -> {it['current']} (+{it['change']:.0%})",
+            file=sys.stderr,
+        )
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
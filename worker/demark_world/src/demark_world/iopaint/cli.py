@@ -144,6 +144,8 @@ def start(
     gfpgan_device: Device = Option(Device.cpu),
     enable_restoreformer: bool = Option(False),
     restoreformer_device: Device = Option(Device.cpu),
+    batch_max_size: int = Option(4, help=BATCH_MAX_SIZE_HELP),
+    batch_max_wait_ms: float = Option(5.0, help=BATCH_MAX_WAIT_MS_HELP),
 ):
     dump_environment_info()
     device = check_device(device)
@@ -223,6 +225,8 @@ def start(
         gfpgan_device=gfpgan_device,
         enable_restoreformer=enable_restoreformer,
         restoreformer_device=restoreformer_device,
+        batch_max_size=batch_max_size,
+        batch_max_wait_ms=batch_max_wait_ms,
     )
     print(api_config.model_dump_json(indent=4))
     api = Api(app, api_config)
@@ -134,3 +134,10 @@ RESTOREFORMER_HELP = (
 GIF_HELP = "Enable GIF plugin. Make GIF to compare original and cleaned image"
 
 INBROWSER_HELP = "Automatically launch IOPaint in a new tab on the default browser"
+
+BATCH_MAX_SIZE_HELP = """
+Max concurrent inpaint requests run as one batch. Only erase models with a batched forward (lama) and requests
+of the same padded size and settings are batched. 1 disables batching.
+"""
+
+BATCH_MAX_WAIT_MS_HELP = "How long a request waits for others to batch with, in milliseconds."
@@ -1,5 +1,4 @@
 import glob
-import json
 import os
 from functools import lru_cache
 from pathlib import Path
@@ -15,7 +14,13 @@ from demark_world.iopaint.const import (
     DIFFUSERS_SDXL_CLASS_NAME,
     DIFFUSERS_SDXL_INPAINT_CLASS_NAME,
 )
-from demark_world.iopaint.model.original_sd_configs import get_config_files
+from demark_world.iopaint.model_index import (
+    ModelIndex,
+    get_model_index,
+    model_dirs_fingerprint,
+    read_model_index_class_name,
+    read_unet_in_channels,
+)
 from demark_world.iopaint.schema import ModelInfo, ModelType
 
 
@@ -48,145 +53,66 @@ def folder_name_to_show_name(name: str) -> str:
 @lru_cache(maxsize=512)
 def get_sd_model_type(model_abs_path: str) -> Optional[ModelType]:
     if "inpaint" in Path(model_abs_path).name.lower():
-        model_type = ModelType.DIFFUSERS_SD_INPAINT
-    else:
-        # load once to check num_in_channels
-        from diffusers import StableDiffusionInpaintPipeline
-
-        try:
-            StableDiffusionInpaintPipeline.from_single_file(
-                model_abs_path,
-                load_safety_checker=False,
-                num_in_channels=9,
-                original_config_file=get_config_files()["v1"],
-            )
-            model_type = ModelType.DIFFUSERS_SD_INPAINT
-        except ValueError as e:
-            if "[320, 4, 3, 3]" in str(e):
-                model_type = ModelType.DIFFUSERS_SD
-            else:
-                logger.info(f"Ignore non sdxl file: {model_abs_path}")
-                return
-        except Exception as e:
-            logger.error(f"Failed to load {model_abs_path}: {e}")
-            return
-    return model_type
+        return ModelType.DIFFUSERS_SD_INPAINT
+    # Sniff num_in_channels from the checkpoint header instead of loading a pipeline
+    in_channels = read_unet_in_channels(model_abs_path)
+    if in_channels == 9:
+        return ModelType.DIFFUSERS_SD_INPAINT
+    if in_channels == 4:
+        return ModelType.DIFFUSERS_SD
+    logger.info(f"Ignore non sd file: {model_abs_path}")
+    return None
 
 
 @lru_cache()
 def get_sdxl_model_type(model_abs_path: str) -> Optional[ModelType]:
     if "inpaint" in model_abs_path:
-        model_type = ModelType.DIFFUSERS_SDXL_INPAINT
-    else:
-        # load once to check num_in_channels
-        from diffusers import StableDiffusionXLInpaintPipeline
-
-        try:
-            model = StableDiffusionXLInpaintPipeline.from_single_file(
-                model_abs_path,
-                load_safety_checker=False,
-                num_in_channels=9,
-                original_config_file=get_config_files()["xl"],
-            )
-            if model.unet.config.in_channels == 9:
-                # https://github.com/huggingface/diffusers/issues/6610
-                model_type = ModelType.DIFFUSERS_SDXL_INPAINT
-            else:
-                model_type = ModelType.DIFFUSERS_SDXL
-        except ValueError as e:
-            if "[320, 4, 3, 3]" in str(e):
-                model_type = ModelType.DIFFUSERS_SDXL
-            else:
-                logger.info(f"Ignore non sdxl file: {model_abs_path}")
-                return
-        except Exception as e:
-            logger.error(f"Failed to load {model_abs_path}: {e}")
-            return
-    return model_type
-
-
-def scan_single_file_diffusion_models(cache_dir) -> List[ModelInfo]:
+        return ModelType.DIFFUSERS_SDXL_INPAINT
+    # https://github.com/huggingface/diffusers/issues/6610
+    in_channels = read_unet_in_channels(model_abs_path)
+    if in_channels == 9:
+        return ModelType.DIFFUSERS_SDXL_INPAINT
+    if in_channels == 4:
+        return ModelType.DIFFUSERS_SDXL
+    logger.info(f"Ignore non sdxl file: {model_abs_path}")
+    return None
+
+
+def scan_single_file_diffusion_models(cache_dir, index: Optional[ModelIndex] = None) -> List[ModelInfo]:
     cache_dir = Path(cache_dir)
-    stable_diffusion_dir = cache_dir / "stable_diffusion"
-    cache_file = stable_diffusion_dir / "iopaint_cache.json"
-    model_type_cache = {}
-    if cache_file.exists():
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                model_type_cache = json.load(f)
-                assert isinstance(model_type_cache, dict)
-        except:
-            pass
-
+    index = index or get_model_index(cache_dir)
     res = []
-    for it in stable_diffusion_dir.glob("*.*"):
-        if it.suffix not in [".safetensors", ".ckpt"]:
-            continue
-        model_abs_path = str(it.absolute())
-        model_type = model_type_cache.get(it.name)
-        if model_type is None:
-            model_type = get_sd_model_type(model_abs_path)
-        if model_type is None:
-            continue
-
-        model_type_cache[it.name] = model_type
-        res.append(
-            ModelInfo(
-                name=it.name,
-                path=model_abs_path,
-                model_type=model_type,
-                is_single_file_diffusers=True,
-            )
-        )
-    if stable_diffusion_dir.exists():
-        with open(cache_file, "w", encoding="utf-8") as fw:
-            json.dump(model_type_cache, fw, indent=2, ensure_ascii=False)
-
-    stable_diffusion_xl_dir = cache_dir / "stable_diffusion_xl"
-    sdxl_cache_file = stable_diffusion_xl_dir / "iopaint_cache.json"
-    sdxl_model_type_cache = {}
-    if sdxl_cache_file.exists():
-        try:
-            with open(sdxl_cache_file, "r", encoding="utf-8") as f:
-                sdxl_model_type_cache = json.load(f)
-                assert isinstance(sdxl_model_type_cache, dict)
-        except:
-            pass
-
-    for it in stable_diffusion_xl_dir.glob("*.*"):
-        if it.suffix not in [".safetensors", ".ckpt"]:
-            continue
-        model_abs_path = str(it.absolute())
-        model_type = sdxl_model_type_cache.get(it.name)
-        if model_type is None:
-            model_type = get_sdxl_model_type(model_abs_path)
-        if model_type is None:
-            continue
-
-        sdxl_model_type_cache[it.name] = model_type
-        if stable_diffusion_xl_dir.exists():
-            with open(sdxl_cache_file, "w", encoding="utf-8") as fw:
-                json.dump(sdxl_model_type_cache, fw, indent=2, ensure_ascii=False)
+    for sub_dir, get_model_type in [
+        ("stable_diffusion", get_sd_model_type),
+        ("stable_diffusion_xl", get_sdxl_model_type),
+    ]:
+        for it in (cache_dir / sub_dir).glob("*.*"):
+            if it.suffix not in [".safetensors", ".ckpt"]:
+                continue
+            model_abs_path = str(it.absolute())
+            model_type = index.cached(model_abs_path, get_model_type)
+            if model_type is None:
+                continue
 
-        res.append(
-            ModelInfo(
-                name=it.name,
-                path=model_abs_path,
-                model_type=model_type,
-                is_single_file_diffusers=True,
+            res.append(
+                ModelInfo(
+                    name=it.name,
+                    path=model_abs_path,
+                    model_type=model_type,
+                    is_single_file_diffusers=True,
+                )
             )
-        )
     return res
 
 
 def scan_inpaint_models(model_dir: Path) -> List[ModelInfo]:
     res = []
-    from demark_world.iopaint.model import models
+    from demark_world.iopaint.model import ERASE_MODELS, models
 
     # logger.info(f"Scanning inpaint models in {model_dir}")
 
-    for name, m in models.items():
-        if m.is_erase_model and m.is_downloaded():
+    for name in ERASE_MODELS:
+        if models[name].is_downloaded():
             res.append(
                 ModelInfo(
                     name=name,
@@ -197,9 +123,10 @@ def scan_inpaint_models(model_dir: Path) -> List[ModelInfo]:
     return res
 
 
-def scan_diffusers_models() -> List[ModelInfo]:
+def scan_diffusers_models(index: Optional[ModelIndex] = None) -> List[ModelInfo]:
     from huggingface_hub.constants import HF_HUB_CACHE
 
+    index = index or get_model_index(os.getenv("XDG_CACHE_HOME", DEFAULT_MODEL_DIR))
     available_models = []
     cache_dir = Path(HF_HUB_CACHE)
     # logger.info(f"Scanning diffusers models in {cache_dir}")
@@ -208,14 +135,10 @@ def scan_diffusers_models() -> List[ModelInfo]:
         os.path.join(cache_dir, "**/*", "model_index.json"), recursive=True
     )
     for it in model_index_files:
-        it = Path(it)
-        try:
-            with open(it, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except:
+        _class_name = index.cached(str(Path(it).absolute()), read_model_index_class_name)
+        if _class_name is None:
             continue
-
-        _class_name = data["_class_name"]
+        it = Path(it)
         name = folder_name_to_show_name(it.parent.parent.parent.name)
         if name in diffusers_model_names:
             continue
@@ -250,7 +173,7 @@ def scan_diffusers_models() -> List[ModelInfo]:
     return available_models
 
 
-def _scan_converted_diffusers_models(cache_dir) -> List[ModelInfo]:
+def _scan_converted_diffusers_models(cache_dir, index: ModelIndex) -> List[ModelInfo]:
     cache_dir = Path(cache_dir)
     available_models = []
     diffusers_model_names = []
@@ -258,57 +181,69 @@ def _scan_converted_diffusers_models(cache_dir) -> List[ModelInfo]:
         os.path.join(cache_dir, "**/*", "model_index.json"), recursive=True
     )
     for it in model_index_files:
+        _class_name = index.cached(str(Path(it).absolute()), read_model_index_class_name)
+        if _class_name is None:
+            continue
         it = Path(it)
-        with open(it, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except:
-                logger.error(
-                    f"Failed to load {it}, please try revert from original model or fix model_index.json by hand."
-                )
-                continue
-
-            _class_name = data["_class_name"]
-            name = folder_name_to_show_name(it.parent.name)
-            if name in diffusers_model_names:
-                continue
-            elif _class_name == DIFFUSERS_SD_CLASS_NAME:
-                model_type = ModelType.DIFFUSERS_SD
-            elif _class_name == DIFFUSERS_SD_INPAINT_CLASS_NAME:
-                model_type = ModelType.DIFFUSERS_SD_INPAINT
-            elif _class_name == DIFFUSERS_SDXL_CLASS_NAME:
-                model_type = ModelType.DIFFUSERS_SDXL
-            elif _class_name == DIFFUSERS_SDXL_INPAINT_CLASS_NAME:
-                model_type = ModelType.DIFFUSERS_SDXL_INPAINT
-            else:
-                continue
+        name = folder_name_to_show_name(it.parent.name)
+        if name in diffusers_model_names:
+            continue
+        elif _class_name == DIFFUSERS_SD_CLASS_NAME:
+            model_type = ModelType.DIFFUSERS_SD
+        elif _class_name == DIFFUSERS_SD_INPAINT_CLASS_NAME:
+            model_type = ModelType.DIFFUSERS_SD_INPAINT
+        elif _class_name == DIFFUSERS_SDXL_CLASS_NAME:
+            model_type = ModelType.DIFFUSERS_SDXL
+        elif _class_name == DIFFUSERS_SDXL_INPAINT_CLASS_NAME:
+            model_type = ModelType.DIFFUSERS_SDXL_INPAINT
+        else:
+            continue
 
-            diffusers_model_names.append(name)
-            available_models.append(
-                ModelInfo(
-                    name=name,
-                    path=str(it.parent.absolute()),
-                    model_type=model_type,
-                )
+        diffusers_model_names.append(name)
+        available_models.append(
+            ModelInfo(
+                name=name,
+                path=str(it.parent.absolute()),
+                model_type=model_type,
             )
+        )
     return available_models
 
 
-def scan_converted_diffusers_models(cache_dir) -> List[ModelInfo]:
+def scan_converted_diffusers_models(cache_dir, index: Optional[ModelIndex] = None) -> List[ModelInfo]:
     cache_dir = Path(cache_dir)
+    index = index or get_model_index(cache_dir)
     available_models = []
     stable_diffusion_dir = cache_dir / "stable_diffusion"
     stable_diffusion_xl_dir = cache_dir / "stable_diffusion_xl"
-    available_models.extend(_scan_converted_diffusers_models(stable_diffusion_dir))
-    available_models.extend(_scan_converted_diffusers_models(stable_diffusion_xl_dir))
+    available_models.extend(_scan_converted_diffusers_models(stable_diffusion_dir, index))
+    available_models.extend(_scan_converted_diffusers_models(stable_diffusion_xl_dir, index))
     return available_models
 
 
 def scan_models() -> List[ModelInfo]:
+    """Models available locally.
+
+    Served from the persistent model index while none of the scanned
+    directories changed; otherwise rescanned, re-reading only new or
+    modified files.
+    """
+    from huggingface_hub.constants import HF_HUB_CACHE
+    from torch.hub import get_dir
+
     model_dir = os.getenv("XDG_CACHE_HOME", DEFAULT_MODEL_DIR)
+    index = get_model_index(model_dir)
+    fingerprint = model_dirs_fingerprint(model_dir, HF_HUB_CACHE, os.path.join(get_dir(), "checkpoints"))
+    available_models = index.lookup_models(fingerprint)
+    if available_models is not None:
+        return available_models
+
+    index.begin_scan()
     available_models = []
     available_models.extend(scan_inpaint_models(model_dir))
-    available_models.extend(scan_single_file_diffusion_models(model_dir))
-    available_models.extend(scan_diffusers_models())
-    available_models.extend(scan_converted_diffusers_models(model_dir))
+    available_models.extend(scan_single_file_diffusion_models(model_dir, index))
+    available_models.extend(scan_diffusers_models(index))
+    available_models.extend(scan_converted_diffusers_models(model_dir, index))
+    index.finish_scan(fingerprint, available_models)
+    index.save()
     return available_models
@@ -15,6 +15,7 @@ from PIL import Image, ImageOps, PngImagePlugin
 from torch.hub import download_url_to_file, get_dir
 
 from demark_world.iopaint.const import MPS_UNSUPPORT_MODELS
+from demark_world.iopaint.model_optimizer import OPTIMIZE_MODE, freeze_jit_model
 
 
 def md5sum(filename):
@@ -111,6 +112,8 @@ def load_jit_model(url_or_path, device, model_md5: str):
     except Exception as e:
         handle_error(model_path, model_md5, e)
     model.eval()
+    if OPTIMIZE_MODE != "none":
+        model = freeze_jit_model(model, model_md5 or md5sum(model_path), torch.device(device))
     return model
 
 
@@ -310,7 +313,12 @@ def decode_base64_to_image(
         "data:application/octet-stream;base64,"
     ):
         encoding = encoding.split(";")[1].split(",")[1]
-    image_bytes = base64.b64decode(encoding)
+    return decode_bytes_to_image(base64.b64decode(encoding), gray=gray)
+
+
+def decode_bytes_to_image(
+    image_bytes: bytes, gray=False
+) -> Tuple[np.array, Optional[np.array], Dict, str]:
     ext = get_image_ext(image_bytes)
     image = Image.open(io.BytesIO(image_bytes))
 
@@ -347,6 +355,17 @@ def encode_pil_to_base64(image: Image, quality: int, infos: Dict) -> bytes:
     return base64.b64encode(img_bytes)
 
 
+def crop_to_mask_box(np_img, mask) -> Optional[Tuple[np.ndarray, Tuple[int, int]]]:
+    """The part of np_img inside the bounding box of mask > 0, and the box's (x, y).
+    None if the mask is empty.
+    """
+    ys, xs = np.nonzero(mask.reshape(mask.shape[:2]))
+    if len(xs) == 0:
+        return None
+    x1, y1, x2, y2 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+    return np_img[y1:y2, x1:x2], (int(x1), int(y1))
+
+
 def concat_alpha_channel(rgb_np_img, alpha_channel) -> np.ndarray:
     if alpha_channel is not None:
         if alpha_channel.shape[:2] != rgb_np_img.shape[:2]:
@@ -1,38 +1,89 @@
-from .anytext.anytext_model import AnyText
-from .controlnet import ControlNet
-from .fcf import FcF
-from .instruct_pix2pix import InstructPix2Pix
-from .kandinsky import Kandinsky22
-from .lama import AnimeLaMa, LaMa
-from .ldm import LDM
-from .manga import Manga
-from .mat import MAT
-from .mi_gan import MIGAN
-from .opencv2 import OpenCV2
-from .paint_by_example import PaintByExample
-from .power_paint.power_paint import PowerPaint
-from .sd import SD, SD2, SD15, Anything4, RealisticVision14
-from .sdxl import SDXL
-from .zits import ZITS
-
-models = {
-    LaMa.name: LaMa,
-    AnimeLaMa.name: AnimeLaMa,
-    LDM.name: LDM,
-    ZITS.name: ZITS,
-    MAT.name: MAT,
-    FcF.name: FcF,
-    OpenCV2.name: OpenCV2,
-    Manga.name: Manga,
-    MIGAN.name: MIGAN,
-    SD15.name: SD15,
-    Anything4.name: Anything4,
-    RealisticVision14.name: RealisticVision14,
-    SD2.name: SD2,
-    PaintByExample.name: PaintByExample,
-    InstructPix2Pix.name: InstructPix2Pix,
-    Kandinsky22.name: Kandinsky22,
-    SDXL.name: SDXL,
-    PowerPaint.name: PowerPaint,
-    AnyText.name: AnyText,
+import importlib
+from collections.abc import Mapping
+
+from demark_world.iopaint.const import (
+    ANYTEXT_NAME,
+    INSTRUCT_PIX2PIX_NAME,
+    KANDINSKY22_NAME,
+    POWERPAINT_NAME,
+)
+
+# Model classes are imported on first use: the SD family pulls in diffusers and
+# transformers, which a LaMa-only worker should never pay for at startup.
+# class name -> module (relative to this package)
+_CLASS_MODULES = {
+    "AnyText": ".anytext.anytext_model",
+    "ControlNet": ".controlnet",
+    "FcF": ".fcf",
+    "InstructPix2Pix": ".instruct_pix2pix",
+    "Kandinsky22": ".kandinsky",
+    "LaMa": ".lama",
+    "AnimeLaMa": ".lama",
+    "LDM": ".ldm",
+    "Manga": ".manga",
+    "MAT": ".mat",
+    "MIGAN": ".mi_gan",
+    "OpenCV2": ".opencv2",
+    "PaintByExample": ".paint_by_example",
+    "PowerPaint": ".power_paint.power_paint",
+    "SD": ".sd",
+    "SD2": ".sd",
+    "SD15": ".sd",
+    "Anything4": ".sd",
+    "RealisticVision14": ".sd",
+    "SDXL": ".sdxl",
+    "ZITS": ".zits",
+}
+
+# model name -> class name, must match each class's `name` attribute
+_MODEL_CLASSES = {
+    "lama": "LaMa",
+    "anime-lama": "AnimeLaMa",
+    "ldm": "LDM",
+    "zits": "ZITS",
+    "mat": "MAT",
+    "fcf": "FcF",
+    "cv2": "OpenCV2",
+    "manga": "Manga",
+    "migan": "MIGAN",
+    "runwayml/stable-diffusion-inpainting": "SD15",
+    "Sanster/anything-4.0-inpainting": "Anything4",
+    "Sanster/Realistic_Vision_V1.4-inpainting": "RealisticVision14",
+    "stabilityai/stable-diffusion-2-inpainting": "SD2",
+    "Fantasy-Studio/Paint-by-Example": "PaintByExample",
+    INSTRUCT_PIX2PIX_NAME: "InstructPix2Pix",
+    KANDINSKY22_NAME: "Kandinsky22",
+    "diffusers/stable-diffusion-xl-1.0-inpainting-0.1": "SDXL",
+    POWERPAINT_NAME: "PowerPaint",
+    ANYTEXT_NAME: "AnyText",
 }
+
+# Models with is_erase_model = True, checkable without importing the SD family
+ERASE_MODELS = ("lama", "anime-lama", "ldm", "zits", "mat", "fcf", "cv2", "manga", "migan")
+
+
+def _load_class(class_name: str):
+    module = importlib.import_module(_CLASS_MODULES[class_name], __name__)
+    return getattr(module, class_name)
+
+
+class _LazyModels(Mapping):
+    """name -> model class, importing each class's module on first lookup."""
+
+    def __getitem__(self, name):
+        return _load_class(_MODEL_CLASSES[name])
+
+    def __iter__(self):
+        return iter(_MODEL_CLASSES)
+
+    def __len__(self):
+        return len(_MODEL_CLASSES)
+
+
+models = _LazyModels()
+
+
+def __getattr__(name):
+    if name in _CLASS_MODULES:
+        return _load_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,5 @@
 import abc
-from typing import Optional
+from typing import List, Optional
 
 import cv2
 import numpy as np
@@ -8,6 +8,7 @@ from loguru import logger
 
 from demark_world.iopaint.helper import (
     boxes_from_mask,
+    ceil_modulo,
     pad_img_to_modulo,
     resize_max_size,
     switch_mps_device,
@@ -24,6 +25,8 @@ class InpaintModel:
     pad_mod = 8
     pad_to_square = False
     is_erase_model = False
+    # forward_batch runs one batched forward instead of looping over forward
+    supports_batch = False
 
     def __init__(self, device, **kwargs):
         """
@@ -78,6 +81,55 @@ class InpaintModel:
             result = result * (mask / 255) + image[:, :, ::-1] * (1 - (mask / 255))
         return result
 
+    def forward_batch(self, images, masks, config: InpaintRequest) -> List[np.ndarray]:
+        """forward for images of one padded shape
+        images: [N, H, W, C] RGB
+        masks: [N, H, W, 1]
+        return: N BGR IMAGES
+        """
+        return [self.forward(image, mask, config) for image, mask in zip(images, masks)]
+
+    def batch_shape(self, image, config: InpaintRequest) -> Optional[tuple]:
+        """The padded (H, W) that __call__ forwards `image` at, if it is a single
+        forward of the whole image; None if an HD strategy crops or resizes it.
+        """
+        if config.hd_strategy == HDStrategy.CROP and max(image.shape) > config.hd_strategy_crop_trigger_size:
+            return None
+        if config.hd_strategy == HDStrategy.RESIZE and max(image.shape) > config.hd_strategy_resize_limit:
+            return None
+        height = ceil_modulo(image.shape[0], self.pad_mod)
+        width = ceil_modulo(image.shape[1], self.pad_mod)
+        if self.min_size is not None:
+            height, width = max(self.min_size, height), max(self.min_size, width)
+        if self.pad_to_square:
+            height = width = max(height, width)
+        return height, width
+
+    @torch.no_grad()
+    def batch_call(self, images, masks, config: InpaintRequest) -> List[np.ndarray]:
+        """__call__ for images with the same batch_shape, in one forward_batch.
+        Same results as calling __call__ on each.
+        """
+        pad_images, pad_masks = [], []
+        for image, mask in zip(images, masks):
+            pad_args = dict(mod=self.pad_mod, square=self.pad_to_square, min_size=self.min_size)
+            pad_images.append(pad_img_to_modulo(image, **pad_args))
+            pad_masks.append(pad_img_to_modulo(mask, **pad_args))
+
+        results = self.forward_batch(np.stack(pad_images), np.stack(pad_masks), config)
+
+        outputs = []
+        for result, image, mask in zip(results, images, masks):
+            origin_height, origin_width = image.shape[:2]
+            image, mask = self.forward_pre_process(image, mask, config)
+            result = result[0:origin_height, 0:origin_width, :]
+            result, image, mask = self.forward_post_process(result, image, mask, config)
+            if config.sd_keep_unmasked_area:
+                mask = mask[:, :, np.newaxis]
+                result = result * (mask / 255) + image[:, :, ::-1] * (1 - (mask / 255))
+            outputs.append(result)
+        return outputs
+
     def forward_pre_process(self, image, mask, config):
         return image, mask
 
@@ -16,6 +16,7 @@ from demark_world.iopaint.helper import (
     norm_img,
     resize_max_size,
 )
+from demark_world.iopaint.model_optimizer import compile_model
 from demark_world.iopaint.schema import InpaintRequest
 
 from .base import InpaintModel
@@ -1599,7 +1600,7 @@ class FcF(InpaintModel):
             encoder_kwargs=kwargs,
             mapping_kwargs={"num_layers": 2},
         )
-        self.model = load_model(G, FCF_MODEL_URL, device, FCF_MODEL_MD5)
+        self.model = compile_model(load_model(G, FCF_MODEL_URL, device, FCF_MODEL_MD5), device)
         self.label = torch.zeros([1, self.model.c_dim], device=device)
 
     @staticmethod
@@ -31,6 +31,7 @@ class LaMa(InpaintModel):
     name = "lama"
     pad_mod = 8
     is_erase_model = True
+    supports_batch = True
 
     @staticmethod
     def download():
@@ -58,11 +59,27 @@ class LaMa(InpaintModel):
 
         inpainted_image = self.model(image, mask)
 
-        cur_res = inpainted_image[0].permute(1, 2, 0).detach().cpu().numpy()
+        cur_res = inpainted_image[0].permute(1, 2, 0).detach().float().cpu().numpy()
         cur_res = np.clip(cur_res * 255, 0, 255).astype("uint8")
         cur_res = cv2.cvtColor(cur_res, cv2.COLOR_RGB2BGR)
         return cur_res
 
+    def forward_batch(self, images, masks, config: InpaintRequest):
+        """images: [N, H, W, C] RGB
+        masks: [N, H, W, 1]
+        return: N BGR IMAGES
+        """
+        images = np.stack([norm_img(it) for it in images])
+        masks = (np.stack([norm_img(it) for it in masks]) > 0) * 1
+        images = torch.from_numpy(images).to(self.device)
+        masks = torch.from_numpy(masks).to(self.device)
+
+        inpainted_images = self.model(images, masks)
+
+        results = inpainted_images.permute(0, 2, 3, 1).detach().float().cpu().numpy()
+        results = np.clip(results * 255, 0, 255).astype("uint8")
+        return [cv2.cvtColor(it, cv2.COLOR_RGB2BGR) for it in results]
+
 
 class AnimeLaMa(LaMa):
     name = "anime-lama"
@@ -14,6 +14,7 @@ from demark_world.iopaint.helper import (
     load_model,
     norm_img,
 )
+from demark_world.iopaint.model_optimizer import compile_model
 from demark_world.iopaint.schema import InpaintRequest
 
 from .base import InpaintModel
@@ -1821,7 +1822,7 @@ class MAT(InpaintModel):
             mapping_kwargs={"torch_dtype": self.torch_dtype},
         ).to(self.torch_dtype)
         # fmt: off
-        self.model = load_model(G, MAT_MODEL_URL, device, MAT_MODEL_MD5)
+        self.model = compile_model(load_model(G, MAT_MODEL_URL, device, MAT_MODEL_MD5), device)
         self.z = torch.from_numpy(np.random.randn(1, G.z_dim)).to(self.torch_dtype).to(device)
         self.label = torch.zeros([1, self.model.c_dim], device=device).to(self.torch_dtype)
         # fmt: on
@@ -8,20 +8,6 @@ from typing import Any
 
 import numpy as np
 import torch
-from diffusers import (
-    DDIMScheduler,
-    DPMSolverMultistepScheduler,
-    DPMSolverSinglestepScheduler,
-    EulerAncestralDiscreteScheduler,
-    EulerDiscreteScheduler,
-    HeunDiscreteScheduler,
-    KDPM2AncestralDiscreteScheduler,
-    KDPM2DiscreteScheduler,
-    LCMScheduler,
-    LMSDiscreteScheduler,
-    PNDMScheduler,
-    UniPCMultistepScheduler,
-)
 from loguru import logger
 from torch import conv2d, conv_transpose2d
 
@@ -879,6 +865,22 @@ def set_seed(seed: int):
 
 
 def get_scheduler(sd_sampler, scheduler_config):
+    # diffusers is only needed by SD-family models
+    from diffusers import (
+        DDIMScheduler,
+        DPMSolverMultistepScheduler,
+        DPMSolverSinglestepScheduler,
+        EulerAncestralDiscreteScheduler,
+        EulerDiscreteScheduler,
+        HeunDiscreteScheduler,
+        KDPM2AncestralDiscreteScheduler,
+        KDPM2DiscreteScheduler,
+        LCMScheduler,
+        LMSDiscreteScheduler,
+        PNDMScheduler,
+        UniPCMultistepScheduler,
+    )
+
     # https://github.com/huggingface/diffusers/issues/4167
     keys_to_pop = ["use_karras_sigmas", "algorithm_type"]
     scheduler_config = dict(scheduler_config)
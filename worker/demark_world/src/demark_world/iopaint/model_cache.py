@@ -0,0 +1,194 @@
+"""
+LRU cache of loaded inpaint models for ModelManager.
+
+Switching models (or toggling ControlNet/BrushNet/PowerPaint) used to drop the
+current model and load the next one from disk. Loaded models now stay in this
+cache: the active model lives on its device, recently used ones stay on the
+device while they fit in the memory budget, and older ones are demoted to CPU
+RAM. Switching back is then a device transfer, not a disk load.
+
+Entries are keyed by (model name, variant flags). Variants of one model share
+pipeline components, so all entries of a name move between devices together.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple
+
+import torch
+from loguru import logger
+
+from demark_world.iopaint.model.utils import torch_gc
+from demark_world.iopaint.schema import ModelCacheEntry, ModelCacheStats
+
+# Device memory the cache may keep for inactive models (the active one always stays)
+MODEL_CACHE_DEVICE_BUDGET_MB = float(os.getenv("IOPAINT_MODEL_CACHE_DEVICE_BUDGET_MB", "0"))
+# Models kept loaded in total (on device or CPU), the rest are released
+MODEL_CACHE_SIZE = int(os.getenv("IOPAINT_MODEL_CACHE_SIZE", "2"))
+
+CPU = torch.device("cpu")
+
+
+def _model_parts(model) -> List[object]:
+    """torch modules and diffusers pipelines held by an InpaintModel."""
+    return [
+        value
+        for value in vars(model).values()
+        if isinstance(value, torch.nn.Module) or hasattr(value, "components")
+    ]
+
+
+def _part_tensors(part):
+    modules = [part] if isinstance(part, torch.nn.Module) else [
+        it for it in part.components.values() if isinstance(it, torch.nn.Module)
+    ]
+    for module in modules:
+        yield from module.parameters()
+        yield from module.buffers()
+
+
+def _storages(models) -> Dict[int, int]:
+    """data_ptr -> bytes of every tensor storage, shared weights counted once."""
+    storages = {}
+    for model in models:
+        for part in _model_parts(model):
+            for tensor in _part_tensors(part):
+                storage = tensor.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+    return storages
+
+
+class _Entry:
+    def __init__(self, model, device: torch.device):
+        self.model = model
+        self.device = device  # Where the model runs when active
+        self.location = device
+        self.last_used = time.time()
+
+
+class ModelCache:
+    def __init__(
+        self,
+        device_budget_mb: float = MODEL_CACHE_DEVICE_BUDGET_MB,
+        max_entries: int = MODEL_CACHE_SIZE,
+        cpu_offload: bool = False,
+    ):
+        self.device_budget_bytes = device_budget_mb * 1024 * 1024
+        self.max_entries = max(1, max_entries)
+        # Offloaded pipelines manage their own placement, never move them
+        self.cpu_offload = cpu_offload
+        self.entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.promotions = 0
+        self.demotions = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _group(key: Tuple) -> Hashable:
+        return key[0]
+
+    def _group_entries(self, group) -> List[_Entry]:
+        return [entry for key, entry in self.entries.items() if self._group(key) == group]
+
+    def _move_group(self, group, to_device: bool):
+        for entry in self._group_entries(group):
+            target = entry.device if to_device else CPU
+            if entry.location == target:
+                continue
+            for part in _model_parts(entry.model):
+                part.to(target)
+            entry.model.device = target
+            entry.location = target
+
+    def get(self, key: Tuple, load: Callable[[], object], device: torch.device):
+        """The model for `key` on its device, loading it with `load()` on a miss."""
+        group = self._group(key)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            if entry.location != entry.device:
+                logger.info(f"Model cache: moving {key[0]} back to {entry.device}")
+                self.promotions += 1
+        else:
+            self.misses += 1
+            entry = _Entry(load(), device)
+            self.entries[key] = entry
+
+        self._move_group(group, to_device=True)
+        entry.last_used = time.time()
+        self.entries.move_to_end(key)
+        self._enforce_limits(active_group=group)
+        return entry.model
+
+    def rekey(self, old_key: Tuple, new_key: Tuple):
+        """A cached model was reconfigured in place (e.g. a new ControlNet method)."""
+        if old_key in self.entries and old_key != new_key:
+            self.entries[new_key] = self.entries.pop(old_key)
+
+    def _groups_lru(self, exclude) -> List[Hashable]:
+        groups = []
+        for key in self.entries:
+            group = self._group(key)
+            if group != exclude and group not in groups:
+                groups.append(group)
+        return groups
+
+    def _device_bytes(self, group) -> int:
+        models = [e.model for e in self._group_entries(group) if e.location != CPU]
+        return sum(_storages(models).values())
+
+    def _enforce_limits(self, active_group):
+        released = False
+        # Release the least recently used groups beyond the entry limit
+        while len(self.entries) > self.max_entries:
+            inactive = self._groups_lru(exclude=active_group)
+            if not inactive:
+                break
+            victim = inactive[0]
+            for key in [k for k in self.entries if self._group(k) == victim]:
+                del self.entries[key]
+            logger.info(f"Model cache: released {victim}")
+            self.evictions += 1
+            released = True
+
+        # Demote inactive groups to CPU, oldest first, until they fit the budget
+        if not self.cpu_offload:
+            resident = [g for g in self._groups_lru(exclude=active_group) if self._device_bytes(g)]
+            used = sum(self._device_bytes(g) for g in resident)
+            for group in resident:
+                if used <= self.device_budget_bytes:
+                    break
+                used -= self._device_bytes(group)
+                self._move_group(group, to_device=False)
+                logger.info(f"Model cache: demoted {group} to CPU")
+                self.demotions += 1
+                released = True
+
+        if released:
+            torch_gc()
+
+    def stats(self) -> ModelCacheStats:
+        lookups = self.hits + self.misses
+        entries = []
+        for key, entry in reversed(self.entries.items()):
+            entries.append(
+                ModelCacheEntry(
+                    name=key[0],
+                    variant=[str(it) for it in key[1:]],
+                    device=str(entry.location),
+                    size_mb=round(sum(_storages([entry.model]).values()) / 1024 / 1024, 1),
+                    last_used=entry.last_used,
+                )
+            )
+        return ModelCacheStats(
+            entries=entries,
+            device_budget_mb=self.device_budget_bytes / 1024 / 1024,
+            max_entries=self.max_entries,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            promotions=self.promotions,
+            demotions=self.demotions,
+            evictions=self.evictions,
+        )
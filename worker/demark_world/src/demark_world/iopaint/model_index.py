@@ -0,0 +1,188 @@
+"""
+Persistent index of locally available models, used by scan_models.
+
+Scanning walks the torch hub, HF hub and stable_diffusion(_xl) directories and
+has to work out the type of every single-file checkpoint. The index stores
+per-file results keyed by (size, mtime) and the last scan result keyed by the
+mtimes of the scanned directories. Startup only reads it; a rescan re-reads
+just the files whose size or mtime changed.
+"""
+import glob
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from demark_world.iopaint.schema import ModelInfo
+
+INDEX_VERSION = 1
+INDEX_FILE_NAME = "iopaint_model_index.json"
+
+# First UNet conv: [320, 9, 3, 3] for inpainting checkpoints, [320, 4, 3, 3] otherwise
+UNET_CONV_IN_KEYS = ("model.diffusion_model.input_blocks.0.0.weight", "conv_in.weight")
+
+_MODEL_INFO_FIELDS = {"name", "path", "model_type", "is_single_file_diffusers"}
+
+
+def _stat_key(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class ModelIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, dict] = {}
+        self.fingerprint: Optional[dict] = None
+        self.models: Optional[List[dict]] = None
+        self.dirty = False
+        self._seen: set = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.fingerprint = data.get("fingerprint")
+        self.models = data.get("models")
+
+    def cached(self, path: str, compute: Callable[[str], object]):
+        """compute(path), reusing the stored value while the file's size and mtime match."""
+        stat = _stat_key(path)
+        if stat is None:
+            return None
+        self._seen.add(path)
+        entry = self.files.get(path)
+        if entry is not None and entry["stat"] == stat:
+            return entry["value"]
+        value = compute(path)
+        self.files[path] = {"stat": stat, "value": value}
+        self.dirty = True
+        return value
+
+    def lookup_models(self, fingerprint: dict) -> Optional[List[ModelInfo]]:
+        """The stored scan result, if nothing was added or removed since."""
+        if self.models is None or self.fingerprint != fingerprint:
+            return None
+        return [ModelInfo(**it) for it in self.models]
+
+    def begin_scan(self):
+        self._seen = set()
+
+    def finish_scan(self, fingerprint: dict, models: List[ModelInfo]):
+        """Store a full scan result and forget files that were not seen by it."""
+        stale = set(self.files) - self._seen
+        for path in stale:
+            del self.files[path]
+        dumped = [it.model_dump(mode="json", include=_MODEL_INFO_FIELDS) for it in models]
+        if stale or fingerprint != self.fingerprint or dumped != self.models:
+            self.dirty = True
+        self.fingerprint = fingerprint
+        self.models = dumped
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "models": self.models,
+            "files": self.files,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fw:
+                json.dump(data, fw, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            # A read-only model dir still works, it just rescans next time
+            logger.warning(f"Failed to write model index {self.path}: {e}")
+
+
+_indexes: Dict[str, ModelIndex] = {}
+
+
+def get_model_index(model_dir) -> ModelIndex:
+    model_dir = str(model_dir)
+    if model_dir not in _indexes:
+        _indexes[model_dir] = ModelIndex(Path(model_dir) / INDEX_FILE_NAME)
+    return _indexes[model_dir]
+
+
+def model_dirs_fingerprint(model_dir, hf_hub_cache, torch_checkpoints_dir) -> dict:
+    """mtimes of every directory whose entries decide what scan_models finds."""
+    model_dir = Path(model_dir)
+    dirs = [
+        Path(torch_checkpoints_dir),
+        model_dir / "stable_diffusion",
+        model_dir / "stable_diffusion_xl",
+        Path(hf_hub_cache),
+    ]
+    # A new revision of an already cached HF model only touches its snapshots dir
+    dirs.extend(Path(p) for p in sorted(glob.glob(os.path.join(hf_hub_cache, "models--*", "snapshots"))))
+    fingerprint = {}
+    for it in dirs:
+        stat = _stat_key(str(it))
+        fingerprint[str(it)] = stat[1] if stat else None
+    return fingerprint
+
+
+def _safetensors_shapes(path: str) -> Dict[str, list]:
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    return {k: v["shape"] for k, v in header.items() if k != "__metadata__"}
+
+
+def _ckpt_shapes(path: str) -> Dict[str, list]:
+    import torch
+
+    try:
+        # mmap keeps tensor data on disk, only the pickled structure is read
+        state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except RuntimeError:
+        # Legacy (non-zip) checkpoints cannot be mmapped
+        state = torch.load(path, map_location="cpu", weights_only=True)
+    state = state.get("state_dict", state)
+    return {k: list(v.shape) for k, v in state.items() if hasattr(v, "shape")}
+
+
+def read_unet_in_channels(path: str) -> Optional[int]:
+    """Input channels of the UNet's first conv, read from the checkpoint header."""
+    try:
+        if path.endswith(".safetensors"):
+            shapes = _safetensors_shapes(path)
+        else:
+            shapes = _ckpt_shapes(path)
+    except Exception as e:
+        logger.error(f"Failed to read {path}: {e}")
+        return None
+    for key in UNET_CONV_IN_KEYS:
+        if key in shapes and len(shapes[key]) == 4:
+            return shapes[key][1]
+    return None
+
+
+def read_model_index_class_name(path: str) -> Optional[str]:
+    """_class_name of a diffusers model_index.json."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["_class_name"]
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.error(
+            f"Failed to load {path}, please try revert from original model or fix model_index.json by hand."
+        )
+        return None
@@ -1,4 +1,5 @@
-from typing import Dict, List
+import hashlib
+from typing import Dict, List, Optional
 
 import numpy as np
 import torch
@@ -6,12 +7,10 @@ from loguru import logger
 
 from demark_world.iopaint.download import scan_models
 from demark_world.iopaint.helper import switch_mps_device
-from demark_world.iopaint.model import SD, SDXL, ControlNet, models
-from demark_world.iopaint.model.brushnet.brushnet_wrapper import BrushNetWrapper
-from demark_world.iopaint.model.brushnet.brushnet_xl_wrapper import BrushNetXLWrapper
-from demark_world.iopaint.model.power_paint.power_paint_v2 import PowerPaintV2
-from demark_world.iopaint.model.utils import is_local_files_only, torch_gc
-from demark_world.iopaint.schema import InpaintRequest, ModelInfo, ModelType
+from demark_world.iopaint.model import models
+from demark_world.iopaint.model.utils import is_local_files_only
+from demark_world.iopaint.model_cache import ModelCache
+from demark_world.iopaint.schema import InpaintRequest, ModelCacheStats, ModelInfo, ModelType
 
 
 class ModelManager:
@@ -20,6 +19,7 @@ class ModelManager:
         self.device = device
         self.kwargs = kwargs
         self.available_models: Dict[str, ModelInfo] = {}
+        self.model_cache = ModelCache(cpu_offload=kwargs.get("cpu_offload", False))
         self.scan_models()
 
         self.enable_controlnet = kwargs.get("enable_controlnet", False)
@@ -37,12 +37,33 @@ class ModelManager:
 
         self.enable_powerpaint_v2 = kwargs.get("enable_powerpaint_v2", False)
 
-        self.model = self.init_model(name, device, **kwargs)
+        self.model = self.load_model(name, device)
 
     @property
     def current_model(self) -> ModelInfo:
         return self.available_models[self.name]
 
+    def _cache_key(self, name: str) -> tuple:
+        return (
+            name,
+            self.enable_controlnet,
+            self.controlnet_method,
+            self.enable_brushnet,
+            self.brushnet_method,
+            self.enable_powerpaint_v2,
+        )
+
+    def load_model(self, name: str, device, **kwargs):
+        """The model for the current settings, from the cache or freshly loaded."""
+        return self.model_cache.get(
+            self._cache_key(name),
+            lambda: self.init_model(name, device, **kwargs, **self.kwargs),
+            device,
+        )
+
+    def cache_stats(self) -> ModelCacheStats:
+        return self.model_cache.stats()
+
     def init_model(self, name: str, device, **kwargs):
         logger.info(f"Loading model: {name}")
         if name not in self.available_models:
@@ -60,16 +81,25 @@ class ModelManager:
             "brushnet_method": self.brushnet_method,
         }
 
+        # Diffusion model classes are imported only when selected (they load diffusers)
         if model_info.support_controlnet and self.enable_controlnet:
+            from demark_world.iopaint.model.controlnet import ControlNet
+
             return ControlNet(device, **kwargs)
 
         if model_info.support_brushnet and self.enable_brushnet:
             if model_info.model_type == ModelType.DIFFUSERS_SD:
+                from demark_world.iopaint.model.brushnet.brushnet_wrapper import BrushNetWrapper
+
                 return BrushNetWrapper(device, **kwargs)
             elif model_info.model_type == ModelType.DIFFUSERS_SDXL:
+                from demark_world.iopaint.model.brushnet.brushnet_xl_wrapper import BrushNetXLWrapper
+
                 return BrushNetXLWrapper(device, **kwargs)
 
         if model_info.support_powerpaint_v2 and self.enable_powerpaint_v2:
+            from demark_world.iopaint.model.power_paint.power_paint_v2 import PowerPaintV2
+
             return PowerPaintV2(device, **kwargs)
 
         if model_info.name in models:
@@ -79,12 +109,16 @@ class ModelManager:
             ModelType.DIFFUSERS_SD_INPAINT,
             ModelType.DIFFUSERS_SD,
         ]:
+            from demark_world.iopaint.model.sd import SD
+
             return SD(device, **kwargs)
 
         if model_info.model_type in [
             ModelType.DIFFUSERS_SDXL_INPAINT,
             ModelType.DIFFUSERS_SDXL,
         ]:
+            from demark_world.iopaint.model.sdxl import SDXL
+
             return SDXL(device, **kwargs)
 
         raise NotImplementedError(f"Unsupported model: {name}")
@@ -110,6 +144,33 @@ class ModelManager:
         self.enable_disable_lcm_lora(config)
         return self.model(image, mask, config).astype(np.uint8)
 
+    def batch_key(self, image, config: InpaintRequest) -> Optional[tuple]:
+        """Requests with equal keys can run together in one batch_call: same model,
+        same padded shape and same settings. None if this request can't be batched.
+        """
+        if not getattr(self.model, "supports_batch", False):
+            return None
+        shape = self.model.batch_shape(image, config)
+        if shape is None:
+            return None
+        exclude = {"image", "mask"}
+        if self.model.is_erase_model:
+            # Erase models ignore the seed, and sd_seed=-1 becomes a random one per request
+            exclude.add("sd_seed")
+        settings = config.model_dump_json(exclude=exclude)
+        return self.name, shape, hashlib.sha1(settings.encode()).hexdigest()
+
+    def batch_call(self, images, masks, config: InpaintRequest) -> List[np.ndarray]:
+        """__call__ for requests with the same batch_key, as one batched forward."""
+        if config.enable_controlnet:
+            self.switch_controlnet_method(config)
+        if config.enable_brushnet:
+            self.switch_brushnet_method(config)
+
+        self.enable_disable_powerpaint_v2(config)
+        self.enable_disable_lcm_lora(config)
+        return [it.astype(np.uint8) for it in self.model.batch_call(images, masks, config)]
+
     def scan_models(self) -> List[ModelInfo]:
         available_models = scan_models()
         self.available_models = {it.name: it for it in available_models}
@@ -129,20 +190,13 @@ class ModelManager:
         ):
             self.controlnet_method = self.available_models[new_name].controlnets[0]
         try:
-            # TODO: enable/disable controlnet without reload model
-            del self.model
-            torch_gc()
-
-            self.model = self.init_model(
-                new_name, switch_mps_device(new_name, self.device), **self.kwargs
-            )
+            # The previous model stays in the cache, switching back skips the disk load
+            self.model = self.load_model(new_name, switch_mps_device(new_name, self.device))
         except Exception as e:
             self.name = old_name
             self.controlnet_method = old_controlnet_method
             logger.info(f"Switch model from {old_name} to {new_name} failed, rollback")
-            self.model = self.init_model(
-                old_name, switch_mps_device(old_name, self.device), **self.kwargs
-            )
+            self.model = self.load_model(old_name, switch_mps_device(old_name, self.device))
             raise e
 
     def switch_brushnet_method(self, config):
@@ -155,8 +209,10 @@ class ModelManager:
             and self.brushnet_method != config.brushnet_method
         ):
             old_brushnet_method = self.brushnet_method
+            old_key = self._cache_key(self.name)
             self.brushnet_method = config.brushnet_method
             self.model.switch_brushnet_method(config.brushnet_method)
+            self.model_cache.rekey(old_key, self._cache_key(self.name))
             logger.info(
                 f"Switch Brushnet method from {old_brushnet_method} to {config.brushnet_method}"
             )
@@ -177,11 +233,10 @@ class ModelManager:
             if hasattr(self.model.model, "tokenizer_2"):
                 pipe_components["tokenizer_2"] = self.model.model.tokenizer_2
 
-            self.model = self.init_model(
+            self.model = self.load_model(
                 self.name,
                 switch_mps_device(self.name, self.device),
                 pipe_components=pipe_components,
-                **self.kwargs,
             )
 
             if not config.enable_brushnet:
@@ -199,8 +254,10 @@ class ModelManager:
             and self.controlnet_method != config.controlnet_method
         ):
             old_controlnet_method = self.controlnet_method
+            old_key = self._cache_key(self.name)
             self.controlnet_method = config.controlnet_method
             self.model.switch_controlnet_method(config.controlnet_method)
+            self.model_cache.rekey(old_key, self._cache_key(self.name))
             logger.info(
                 f"Switch Controlnet method from {old_controlnet_method} to {config.controlnet_method}"
             )
@@ -216,11 +273,10 @@ class ModelManager:
             if hasattr(self.model.model, "text_encoder_2"):
                 pipe_components["text_encoder_2"] = self.model.model.text_encoder_2
 
-            self.model = self.init_model(
+            self.model = self.load_model(
                 self.name,
                 switch_mps_device(self.name, self.device),
                 pipe_components=pipe_components,
-                **self.kwargs,
             )
             if not config.enable_controlnet:
                 logger.info("Disable controlnet")
@@ -235,11 +291,10 @@ class ModelManager:
             self.enable_powerpaint_v2 = config.enable_powerpaint_v2
             pipe_components = {"vae": self.model.model.vae}
 
-            self.model = self.init_model(
+            self.model = self.load_model(
                 self.name,
                 switch_mps_device(self.name, self.device),
                 pipe_components=pipe_components,
-                **self.kwargs,
             )
             if config.enable_powerpaint_v2:
                 logger.info("Enable PowerPaintV2")
@@ -0,0 +1,94 @@
+"""
+Optional inference optimizations for the erase models, cached on disk.
+
+IOPAINT_OPTIMIZE selects what load_jit_model and the eager erase models do:
+
+- none (default): run the models as loaded
+- freeze: TorchScript models (LaMa, AnimeLaMa, MI-GAN, Manga, ...) are frozen
+  with torch.jit.freeze, which inlines weights and folds conv/bn. The frozen
+  module is saved under IOPAINT_OPTIMIZED_MODEL_DIR keyed by model md5, torch
+  version and device, then optimize_for_inference runs on it in each process
+  (its MKLDNN-converted weights cannot be serialized).
+- compile: freeze, plus torch.compile for eager models (MAT, FcF). Inductor's
+  FX graph cache lives in the same directory, keyed by torch version, graph
+  and input shapes, so later processes reuse the compiled kernels.
+
+Frozen modules hold their weights as graph constants, so they stay on the
+device they were frozen for.
+"""
+import os
+
+import torch
+from loguru import logger
+
+from demark_world.iopaint.const import DEFAULT_MODEL_DIR
+
+OPTIMIZE_MODES = ["none", "freeze", "compile"]
+OPTIMIZE_MODE = os.getenv("IOPAINT_OPTIMIZE", "none").lower()
+if OPTIMIZE_MODE not in OPTIMIZE_MODES:
+    logger.warning(
+        f"Unknown IOPAINT_OPTIMIZE={OPTIMIZE_MODE}, expected one of {OPTIMIZE_MODES}; using none"
+    )
+    OPTIMIZE_MODE = "none"
+OPTIMIZED_MODEL_DIR = os.getenv(
+    "IOPAINT_OPTIMIZED_MODEL_DIR", os.path.join(DEFAULT_MODEL_DIR, "optimized")
+)
+
+
+def _artifact_dir(model_md5: str, device: torch.device) -> str:
+    return os.path.join(OPTIMIZED_MODEL_DIR, f"{model_md5}-torch{torch.__version__}-{device.type}")
+
+
+def _load_frozen(path: str, device: torch.device):
+    if not os.path.exists(path):
+        return None
+    try:
+        return torch.jit.load(path, map_location=device)
+    except Exception as e:
+        logger.warning(f"Failed to load frozen model {path}, freezing again: {e}")
+        return None
+
+
+def _save_frozen(model, path: str):
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        torch.jit.save(model, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # A read-only cache dir only costs the freeze on every start
+        logger.warning(f"Failed to save frozen model {path}: {e}")
+
+
+def freeze_jit_model(model, model_md5: str, device: torch.device, mode: str = OPTIMIZE_MODE):
+    """`model` frozen and optimized for inference, or as is when mode is "none"."""
+    if mode == "none":
+        return model
+    path = os.path.join(_artifact_dir(model_md5, device), "frozen.pt")
+    frozen = _load_frozen(path, device)
+    try:
+        if frozen is None:
+            logger.info(f"Freezing TorchScript model {model_md5}")
+            frozen = torch.jit.freeze(model.eval())
+            _save_frozen(frozen, path)
+        if device.type in ("cpu", "cuda"):
+            frozen = torch.jit.optimize_for_inference(frozen)
+    except Exception as e:
+        logger.warning(f"Failed to optimize TorchScript model {model_md5}, running it as is: {e}")
+        return model
+    return frozen
+
+
+def compile_model(model: torch.nn.Module, device: torch.device, mode: str = OPTIMIZE_MODE):
+    """torch.compile'd `model` when mode is "compile", else `model`.
+
+    Compilation itself happens on the first forward call of each input shape.
+    """
+    if mode != "compile" or device.type not in ("cpu", "cuda"):
+        return model
+    import torch._inductor.config as inductor_config
+
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(OPTIMIZED_MODEL_DIR, "inductor"))
+    inductor_config.fx_graph_cache = True
+    # MAT and FcF always run at 512x512, a static graph avoids guards on shape
+    return torch.compile(model, dynamic=False)
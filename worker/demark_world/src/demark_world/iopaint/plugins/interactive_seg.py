@@ -1,5 +1,7 @@
 import hashlib
-from typing import List
+import os
+from collections import OrderedDict
+from typing import Dict, List
 
 import numpy as np
 import torch
@@ -80,6 +82,97 @@ SEGMENT_ANYTHING_MODELS = {
 }
 
 
+# Device memory for the image embeddings of recently clicked images
+SEG_EMBEDDING_CACHE_MB = float(os.getenv("IOPAINT_SEG_EMBEDDING_CACHE_MB", "256"))
+
+# What set_image computes, per predictor: the attributes to save and restore,
+# and the flag that marks an image as set
+PREDICTOR_IMAGE_STATE = {
+    SamPredictor: (("features", "original_size", "input_size"), "is_image_set"),
+    SamHQPredictor: (("features", "interm_features", "original_size", "input_size"), "is_image_set"),
+    SAM2ImagePredictor: (("_features", "_orig_hw", "_is_batch"), "_is_image_set"),
+}
+
+
+def image_key(rgb_np_img: np.ndarray) -> str:
+    """Hash of the shape and decoded pixels, with blake2b, which is faster than md5.
+
+    Hashes every pixel, more bytes than the compressed upload, but the same
+    image re-encoded by the client still finds its embedding.
+    """
+    digest = hashlib.blake2b(str(rgb_np_img.shape).encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(rgb_np_img).data)
+    return digest.hexdigest()
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, dict):
+        return sum(_nbytes(it) for it in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(it) for it in value)
+    return 0
+
+
+class ImageEmbeddingCache:
+    """LRU of predictor image states (SAM embeddings, SAM-HQ intermediate
+    features, SAM2 high-res features) within a byte budget.
+
+    Restoring a state replaces set_image, so a click on an image seen before
+    only runs the mask decoder.
+    """
+
+    def __init__(self, max_mb: float = SEG_EMBEDDING_CACHE_MB):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # (predictor, key) of the image the predictor holds now, cached or not
+        self.current = None
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
+        self.current = None
+
+    def set_image(self, predictor, rgb_np_img: np.ndarray, key: str):
+        """predictor.set_image(rgb_np_img), from the cache if `key` was seen."""
+        attrs, flag = next(
+            state for cls, state in PREDICTOR_IMAGE_STATE.items() if isinstance(predictor, cls)
+        )
+        if self.current == (id(predictor), key):
+            self.hits += 1
+            return
+        state = self.entries.get(key)
+        if state is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            for name, value in state.items():
+                setattr(predictor, name, value)
+            setattr(predictor, flag, True)
+            self.current = (id(predictor), key)
+            return
+
+        self.misses += 1
+        self.current = None
+        predictor.set_image(rgb_np_img)
+        self.current = (id(predictor), key)
+        state = {name: getattr(predictor, name) for name in attrs}
+        size = _nbytes(state)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = state
+        self.sizes[key] = size
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted, _ = self.entries.popitem(last=False)
+            self.bytes -= self.sizes.pop(evicted)
+
+
 class InteractiveSeg(BasePlugin):
     name = "InteractiveSeg"
     support_gen_mask = True
@@ -88,6 +181,7 @@ class InteractiveSeg(BasePlugin):
         super().__init__()
         self.model_name = model_name
         self.device = device
+        self.embedding_cache = ImageEmbeddingCache()
         self._init_session(model_name)
 
     def _init_session(self, model_name: str):
@@ -107,7 +201,8 @@ class InteractiveSeg(BasePlugin):
             self.predictor = SamPredictor(
                 sam_model_registry[model_name](checkpoint=model_path).to(self.device)
             )
-        self.prev_img_md5 = None
+        # Embeddings of the previous model do not fit the new one
+        self.embedding_cache.clear()
 
     def switch_model(self, new_model_name):
         if self.model_name == new_model_name:
@@ -118,11 +213,10 @@ class InteractiveSeg(BasePlugin):
         self.model_name = new_model_name
 
     def gen_mask(self, rgb_np_img, req: RunPluginRequest) -> np.ndarray:
-        img_md5 = hashlib.md5(req.image.encode("utf-8")).hexdigest()
-        return self.forward(rgb_np_img, req.clicks, img_md5)
+        return self.forward(rgb_np_img, req.clicks, image_key(rgb_np_img))
 
     @torch.inference_mode()
-    def forward(self, rgb_np_img, clicks: List[List], img_md5: str):
+    def forward(self, rgb_np_img, clicks: List[List], img_key: str):
         input_point = []
         input_label = []
         for click in clicks:
@@ -131,9 +225,7 @@ class InteractiveSeg(BasePlugin):
             input_point.append([x, y])
             input_label.append(click[2])
 
-        if img_md5 and img_md5 != self.prev_img_md5:
-            self.prev_img_md5 = img_md5
-            self.predictor.set_image(rgb_np_img)
+        self.embedding_cache.set_image(self.predictor, rgb_np_img, img_key or image_key(rgb_np_img))
 
         masks, _, _ = self.predictor.predict(
             point_coords=np.array(input_point),
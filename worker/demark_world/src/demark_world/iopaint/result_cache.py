@@ -0,0 +1,185 @@
+"""
+Cache of inpaint results for the API, keyed by what determines the result.
+
+Retries and undo/redo in the web UI resubmit the same image and mask. For
+erase models and for diffusion runs with a fixed seed, the result depends only
+on the decoded image, the mask, the model and the request settings, so the API
+returns the cached result instead of running the model again.
+
+Results live in memory under an LRU size budget. With
+IOPAINT_RESULT_CACHE_DIR set, they are also written there as .npy files, with
+their own size budget, and survive restarts.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from demark_world.iopaint.schema import InpaintRequest, ResultCacheStats
+
+RESULT_CACHE_MB = float(os.getenv("IOPAINT_RESULT_CACHE_MB", "256"))
+RESULT_CACHE_DIR = os.getenv("IOPAINT_RESULT_CACHE_DIR", "")
+RESULT_CACHE_DISK_MB = float(os.getenv("IOPAINT_RESULT_CACHE_DISK_MB", "2048"))
+
+MB = 1024 * 1024
+
+
+def result_cache_key(
+    model_name: str, is_erase_model: bool, image: np.ndarray, mask: np.ndarray, config: InpaintRequest
+) -> Optional[str]:
+    """Content hash of a request, or None if its result is not reproducible
+    (a diffusion model with a random seed).
+    """
+    exclude = {"image", "mask"}
+    if is_erase_model:
+        # Settings erase models ignore would only split the cache
+        exclude.add("sd_seed")
+    elif config.random_seed:
+        return None
+
+    digest = hashlib.sha256(model_name.encode())
+    for array in (image, mask):
+        digest.update(f"{array.shape}{array.dtype.str}".encode())
+        digest.update(np.ascontiguousarray(array).data)
+    digest.update(config.model_dump_json(exclude=exclude).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_mb: float = RESULT_CACHE_MB,
+        disk_dir: Optional[str] = RESULT_CACHE_DIR,
+        disk_max_mb: float = RESULT_CACHE_DISK_MB,
+    ):
+        self.max_bytes = max_mb * MB
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_mb * MB
+        # API handlers run on a thread pool
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(it.stat().st_size for it in self.disk_dir.glob("*.npy"))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.disk_dir is not None
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._disk_get(key)
+        with self.lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, result)
+        return result
+
+    def put(self, key: str, result: np.ndarray):
+        result = np.ascontiguousarray(result)
+        result.flags.writeable = False
+        with self.lock:
+            self._memory_put(key, result)
+        self._disk_put(key, result)
+
+    def _memory_put(self, key: str, result: np.ndarray):
+        if result.nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key).nbytes
+        self.entries[key] = result
+        self.bytes += result.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.npy"
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            result = np.load(path)
+            # mtime orders disk eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        result.flags.writeable = False
+        return result
+
+    def _disk_put(self, key: str, result: np.ndarray):
+        if self.disk_dir is None or result.nbytes > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        if path.exists():
+            # Same key, same result
+            return
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, result)
+            with self.lock:
+                # Another thread may have written the key meanwhile
+                replaced = path.stat().st_size if path.exists() else 0
+                os.replace(tmp_path, path)
+                self.disk_bytes += path.stat().st_size - replaced
+                if self.disk_bytes > self.disk_max_bytes:
+                    self._disk_evict()
+        except OSError as e:
+            logger.warning(f"Result cache: could not write {path}: {e}")
+
+    def _disk_evict(self):
+        files = []
+        for it in self.disk_dir.glob("*.npy"):
+            try:
+                stat = it.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, it))
+        files.sort()
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_bytes <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self.disk_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> ResultCacheStats:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return ResultCacheStats(
+                entries=len(self.entries),
+                size_mb=round(self.bytes / MB, 1),
+                max_mb=self.max_bytes / MB,
+                disk_dir=str(self.disk_dir) if self.disk_dir else None,
+                disk_size_mb=round(self.disk_bytes / MB, 1),
+                disk_max_mb=self.disk_max_bytes / MB,
+                hits=self.hits,
+                disk_hits=self.disk_hits,
+                misses=self.misses,
+                hit_rate=(self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                evictions=self.evictions,
+            )
@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import List, Literal, Optional
 
 from loguru import logger
-from pydantic import BaseModel, Field, computed_field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, computed_field, model_validator
 
 from demark_world.iopaint.const import (
     ANYTEXT_NAME,
@@ -280,6 +280,9 @@ class ApiConfig(BaseModel):
     gfpgan_device: Device
     enable_restoreformer: bool
     restoreformer_device: Device
+    # Micro-batching of concurrent inpaint requests, see InpaintScheduler
+    batch_max_size: int = 4
+    batch_max_wait_ms: float = 5.0
 
 
 class InpaintRequest(BaseModel):
@@ -404,10 +407,18 @@ class InpaintRequest(BaseModel):
         le=1.0,
     )
 
+    # sd_seed was -1 and replaced by a random one
+    _random_seed: bool = PrivateAttr(False)
+
+    @property
+    def random_seed(self) -> bool:
+        return self._random_seed
+
     @model_validator(mode="after")
     def validate_field(cls, values: "InpaintRequest"):
         if values.sd_seed == -1:
             values.sd_seed = random.randint(1, 99999999)
+            values._random_seed = True
             logger.info(f"Generate random seed: {values.sd_seed}")
 
         if values.use_extender and values.enable_controlnet:
@@ -459,6 +470,40 @@ class GenInfoResponse(BaseModel):
     negative_prompt: str = ""
 
 
+class ModelCacheEntry(BaseModel):
+    name: str
+    variant: List[str]
+    device: str
+    size_mb: float
+    last_used: float
+
+
+class ModelCacheStats(BaseModel):
+    entries: List[ModelCacheEntry]
+    device_budget_mb: float
+    max_entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+    promotions: int
+    demotions: int
+    evictions: int
+
+
+class ResultCacheStats(BaseModel):
+    entries: int
+    size_mb: float
+    max_mb: float
+    disk_dir: Optional[str]
+    disk_size_mb: float
+    disk_max_mb: float
+    hits: int
+    disk_hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+
+
 class ServerConfigResponse(BaseModel):
     plugins: List[PluginInfo]
     modelInfos: List[ModelInfo]
@@ -475,6 +520,8 @@ class ServerConfigResponse(BaseModel):
     disableModelSwitch: bool
     isDesktop: bool
     samplers: List[str]
+    modelCache: Optional[ModelCacheStats] = None
+    resultCache: Optional[ResultCacheStats] = None
 
 
 class SwitchModelRequest(BaseModel):
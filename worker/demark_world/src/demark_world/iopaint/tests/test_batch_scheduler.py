@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from demark_world.iopaint.batch_scheduler import InpaintScheduler
+
+
+class FakeModelManager:
+    """Images are strings; the key is their length, like a padded shape."""
+
+    def __init__(self, fail_batches=False, short_batches=False):
+        self.calls = []
+        self.fail_batches = fail_batches
+        self.short_batches = short_batches
+
+    def batch_key(self, image, config):
+        return None if image.startswith("hd") else ("lama", len(image), config)
+
+    def __call__(self, image, mask, config):
+        self.calls.append([image])
+        if image == "bad":
+            raise ValueError(image)
+        return image.upper()
+
+    def batch_call(self, images, masks, config):
+        self.calls.append(list(images))
+        if self.fail_batches:
+            raise MemoryError
+        results = [it.upper() for it in images]
+        return results[:-1] if self.short_batches else results
+
+
+def submit_all(scheduler, images, config="cfg"):
+    results = {}
+
+    def submit(image):
+        try:
+            results[image] = scheduler.submit(image, None, config)
+        except Exception as e:
+            results[image] = e
+
+    threads = [threading.Thread(target=submit, args=(it,)) for it in images]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_compatible_requests_are_batched():
+    manager = FakeModelManager()
+    idle = []
+    scheduler = InpaintScheduler(manager, max_batch_size=4, max_wait_ms=200, on_idle=lambda: idle.append(1))
+    results = submit_all(scheduler, ["aa", "bb", "cc", "ddd", "hd1"])
+    scheduler.close()
+
+    assert results == {"aa": "AA", "bb": "BB", "cc": "CC", "ddd": "DDD", "hd1": "HD1"}
+    assert sorted(map(sorted, manager.calls)) == [["aa", "bb", "cc"], ["ddd"], ["hd1"]]
+    assert scheduler.stats()["requests"] == 5
+    assert idle
+
+
+def test_max_batch_size_and_disabled_batching():
+    manager = FakeModelManager()
+    scheduler = InpaintScheduler(manager, max_batch_size=2, max_wait_ms=200)
+    submit_all(scheduler, ["aa", "bb", "cc"])
+    scheduler.close()
+    assert max(len(it) for it in manager.calls) == 2
+
+    manager = FakeModelManager()
+    scheduler = InpaintScheduler(manager, max_batch_size=1)
+    began = time.monotonic()
+    submit_all(scheduler, ["aa", "bb"])
+    scheduler.close()
+    assert [len(it) for it in manager.calls] == [1, 1]
+    assert time.monotonic() - began < 0.2
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    manager = FakeModelManager(fail_batches=True)
+    scheduler = InpaintScheduler(manager, max_batch_size=4, max_wait_ms=200)
+    results = submit_all(scheduler, ["ok", "no", "bad"])
+    scheduler.close()
+
+    assert results["ok"] == "OK" and results["no"] == "NO"
+    assert isinstance(results["bad"], ValueError)
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit("aa", None, "cfg")
+
+
+def test_short_batch_result_falls_back_to_single_requests():
+    manager = FakeModelManager(short_batches=True)
+    scheduler = InpaintScheduler(manager, max_batch_size=4, max_wait_ms=200)
+    results = submit_all(scheduler, ["aa", "bb", "cc"])
+    scheduler.close()
+    assert results == {"aa": "AA", "bb": "BB", "cc": "CC"}
+
+
+class FakeEraseModel:
+    is_erase_model = True
+    supports_batch = True
+
+    def batch_shape(self, image, config):
+        return image.shape[:2]
+
+
+def test_random_seed_requests_share_a_batch_key():
+    pytest.importorskip("torch")
+    import numpy as np
+
+    from demark_world.iopaint.model_manager import ModelManager
+    from demark_world.iopaint.schema import InpaintRequest
+
+    manager = ModelManager.__new__(ModelManager)
+    manager.name, manager.model = "lama", FakeEraseModel()
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    first, second = InpaintRequest(sd_seed=-1), InpaintRequest(sd_seed=-1)
+    assert first.random_seed and second.random_seed
+    assert manager.batch_key(image, first) == manager.batch_key(image, second)
+    assert manager.batch_key(image, first) != manager.batch_key(
+        image, InpaintRequest(sd_seed=-1, hd_strategy="Resize")
+    )
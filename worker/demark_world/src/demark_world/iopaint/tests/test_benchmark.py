@@ -0,0 +1,33 @@
+from demark_world.iopaint.benchmark import compare_to_baseline, make_inputs
+
+
+def case(p50, rss, model="lama"):
+    return {
+        "model": model,
+        "size": "512x512",
+        "coverage": 0.1,
+        "hd_strategy": "Original",
+        "p50_ms": p50,
+        "p90_ms": p50,
+        "peak_rss_mb": rss,
+        "peak_device_mb": None,
+    }
+
+
+def test_mask_coverage():
+    image, mask = make_inputs(400, 200, 0.25)
+    assert image.shape == (200, 400, 3)
+    assert mask.shape == (200, 400, 1)
+    assert abs((mask > 0).mean() - 0.25) < 0.01
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = [case(100, 1000), case(50, 500, model="mat")]
+    results = [case(110, 1300), case(80, 500, model="mat"), case(10, 10, model="fcf")]
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.15)
+    assert {(it["model"], it["metric"]) for it in regressions} == {
+        ("lama", "peak_rss_mb"),
+        ("mat", "p50_ms"),
+        ("mat", "p90_ms"),
+    }
@@ -0,0 +1,61 @@
+import numpy as np
+import torch
+
+from demark_world.iopaint.plugins.interactive_seg import ImageEmbeddingCache, image_key
+from demark_world.iopaint.plugins.segment_anything import SamPredictor
+
+EMBEDDING_MB = 256 * 64 * 64 * 4 / 1024 / 1024
+
+
+class FakePredictor(SamPredictor):
+    """Counts image encoder passes; the embedding is filled with the image's mean."""
+
+    def __init__(self):
+        self.encoded = 0
+        self.reset_image()
+
+    def set_image(self, image, image_format="RGB"):
+        self.encoded += 1
+        self.features = torch.full((1, 256, 64, 64), float(image.mean()))
+        self.original_size = image.shape[:2]
+        self.input_size = (1024, 1024)
+        self.is_image_set = True
+
+
+def image(value):
+    return np.full((32, 32, 3), value, dtype=np.uint8)
+
+
+def test_alternating_images_encode_once():
+    cache = ImageEmbeddingCache(max_mb=2.5 * EMBEDDING_MB)
+    predictor = FakePredictor()
+    for value in [1, 2, 1, 2, 1]:
+        cache.set_image(predictor, image(value), image_key(image(value)))
+        assert predictor.features[0, 0, 0, 0].item() == value
+        assert predictor.is_image_set
+    assert predictor.encoded == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = ImageEmbeddingCache(max_mb=2.5 * EMBEDDING_MB)
+    predictor = FakePredictor()
+    for value in [1, 2, 3, 1]:
+        cache.set_image(predictor, image(value), image_key(image(value)))
+    assert predictor.encoded == 4
+    assert len(cache.entries) == 2
+    assert cache.bytes <= cache.max_bytes
+
+    # Disabled cache still skips re-encoding the image the predictor holds
+    cache = ImageEmbeddingCache(max_mb=0)
+    predictor = FakePredictor()
+    for value in [1, 1, 2]:
+        cache.set_image(predictor, image(value), image_key(image(value)))
+    assert predictor.encoded == 2
+    assert not cache.entries
+
+
+def test_image_key_is_content_based():
+    assert image_key(image(1)) == image_key(image(1).copy())
+    assert image_key(image(1)) != image_key(image(2))
+    assert image_key(image(1)) != image_key(np.full((16, 64, 3), 1, dtype=np.uint8))
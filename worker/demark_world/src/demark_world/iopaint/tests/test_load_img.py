@@ -1,4 +1,13 @@
-from demark_world.iopaint.helper import load_img
+import base64
+
+import numpy as np
+
+from demark_world.iopaint.helper import (
+    crop_to_mask_box,
+    decode_base64_to_image,
+    decode_bytes_to_image,
+    load_img,
+)
 from demark_world.iopaint.tests.utils import current_dir
 
 png_img_p = current_dir / "image.png"
@@ -17,3 +26,24 @@ def test_load_jpg_image():
         np_img, alpha_channel = load_img(f.read())
     assert np_img.shape == (394, 448, 3)
     assert alpha_channel is None
+
+
+def test_decode_bytes_matches_base64():
+    with open(png_img_p, "rb") as f:
+        image_bytes = f.read()
+    np_img, alpha_channel, _, ext = decode_bytes_to_image(image_bytes)
+    b64_img, b64_alpha, _, b64_ext = decode_base64_to_image(base64.b64encode(image_bytes).decode())
+    assert ext == b64_ext == "png"
+    assert np.array_equal(np_img, b64_img)
+    assert np.array_equal(alpha_channel, b64_alpha)
+
+
+def test_crop_to_mask_box():
+    image = np.arange(10 * 12 * 3, dtype=np.uint8).reshape(10, 12, 3)
+    mask = np.zeros((10, 12, 1), dtype=np.uint8)
+    assert crop_to_mask_box(image, mask) is None
+
+    mask[2:5, 3:9] = 255
+    patch, offset = crop_to_mask_box(image, mask)
+    assert offset == (3, 2)
+    assert np.array_equal(patch, image[2:5, 3:9])
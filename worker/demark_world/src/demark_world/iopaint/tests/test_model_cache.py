@@ -0,0 +1,48 @@
+import torch
+
+from demark_world.iopaint.model_cache import ModelCache
+
+
+class FakeModel:
+    def __init__(self, device):
+        self.device = device
+        self.model = torch.nn.Linear(256, 256)
+
+
+def key(name):
+    return (name, False, None, False, None, False)
+
+
+def test_switch_back_is_a_cache_hit():
+    cache = ModelCache(max_entries=2)
+    loads = []
+
+    def loader(name):
+        return lambda: loads.append(name) or FakeModel(torch.device("cpu"))
+
+    lama = cache.get(key("lama"), loader("lama"), torch.device("cpu"))
+    cache.get(key("mat"), loader("mat"), torch.device("cpu"))
+    assert cache.get(key("lama"), loader("lama"), torch.device("cpu")) is lama
+    assert loads == ["lama", "mat"]
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert [it.name for it in stats.entries] == ["lama", "mat"]
+
+
+def test_least_recently_used_is_released():
+    cache = ModelCache(max_entries=2)
+    for name in ["lama", "mat", "lama", "fcf"]:
+        cache.get(key(name), lambda: FakeModel(torch.device("cpu")), torch.device("cpu"))
+
+    assert [k[0] for k in cache.entries] == ["lama", "fcf"]
+    assert cache.stats().evictions == 1
+
+
+def test_rekey_keeps_the_loaded_model():
+    cache = ModelCache()
+    model = cache.get(key("sd"), lambda: FakeModel(torch.device("cpu")), torch.device("cpu"))
+    new_key = ("sd", True, "canny", False, None, False)
+    cache.rekey(key("sd"), new_key)
+
+    assert cache.get(new_key, lambda: None, torch.device("cpu")) is model
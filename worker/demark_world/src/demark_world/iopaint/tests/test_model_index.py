@@ -0,0 +1,64 @@
+import json
+import os
+import struct
+
+from demark_world.iopaint import download, model_index
+from demark_world.iopaint.schema import ModelType
+
+
+def write_safetensors(path, in_channels):
+    """A checkpoint whose header declares the UNet conv_in shape (tensor data is zeros)."""
+    shape = [320, in_channels, 3, 3]
+    size = 320 * in_channels * 3 * 3 * 2
+    header = json.dumps({
+        "model.diffusion_model.input_blocks.0.0.weight": {
+            "dtype": "F16", "shape": shape, "data_offsets": [0, size],
+        }
+    }).encode()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * size)
+
+
+def test_sd_model_type_from_header(tmp_path):
+    download.get_sd_model_type.cache_clear()
+    write_safetensors(tmp_path / "plain.safetensors", 4)
+    write_safetensors(tmp_path / "custom.safetensors", 9)
+
+    assert download.get_sd_model_type(str(tmp_path / "plain.safetensors")) == ModelType.DIFFUSERS_SD
+    assert download.get_sd_model_type(str(tmp_path / "custom.safetensors")) == ModelType.DIFFUSERS_SD_INPAINT
+
+
+def test_scan_models_reuses_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(model_index, "_indexes", {})
+    download.get_sd_model_type.cache_clear()
+
+    sniffed = []
+    real_read = download.read_unet_in_channels
+
+    def counting_read(path):
+        sniffed.append(os.path.basename(path))
+        return real_read(path)
+
+    monkeypatch.setattr(download, "read_unet_in_channels", counting_read)
+
+    write_safetensors(tmp_path / "stable_diffusion" / "a.safetensors", 4)
+    names = [it.name for it in download.scan_models()]
+    assert "a.safetensors" in names
+    assert sniffed == ["a.safetensors"]
+    assert (tmp_path / model_index.INDEX_FILE_NAME).exists()
+
+    # A new process reads the stored index instead of rescanning
+    monkeypatch.setattr(model_index, "_indexes", {})
+    download.get_sd_model_type.cache_clear()
+    assert [it.name for it in download.scan_models()] == names
+    assert sniffed == ["a.safetensors"]
+
+    # Only the new checkpoint is sniffed on rescan
+    write_safetensors(tmp_path / "stable_diffusion" / "b.safetensors", 9)
+    models = {it.name: it for it in download.scan_models()}
+    assert models["b.safetensors"].model_type == ModelType.DIFFUSERS_SD_INPAINT
+    assert sniffed == ["a.safetensors", "b.safetensors"]
@@ -0,0 +1,39 @@
+import os
+
+import torch
+
+from demark_world.iopaint import model_optimizer
+
+
+class Net(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 8, 3, padding=1)
+        self.bn = torch.nn.BatchNorm2d(8)
+
+    def forward(self, x):
+        return torch.relu(self.bn(self.conv(x)))
+
+
+def test_frozen_model_is_cached_and_matches(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_optimizer, "OPTIMIZED_MODEL_DIR", str(tmp_path))
+    cpu = torch.device("cpu")
+    model = torch.jit.script(Net().eval())
+    x = torch.rand(1, 3, 32, 32)
+
+    frozen = model_optimizer.freeze_jit_model(model, "abc", cpu, mode="freeze")
+    torch.testing.assert_close(frozen(x), model(x))
+    assert os.path.exists(os.path.join(model_optimizer._artifact_dir("abc", cpu), "frozen.pt"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("froze again instead of loading the cached artifact")
+
+    monkeypatch.setattr(torch.jit, "freeze", fail)
+    cached = model_optimizer.freeze_jit_model(model, "abc", cpu, mode="freeze")
+    torch.testing.assert_close(cached(x), model(x))
+
+
+def test_none_mode_returns_model_unchanged():
+    model = torch.jit.script(Net().eval())
+    assert model_optimizer.freeze_jit_model(model, "abc", torch.device("cpu"), mode="none") is model
+    assert model_optimizer.compile_model(Net(), torch.device("cpu"), mode="freeze").__class__ is Net
@@ -0,0 +1,64 @@
+import numpy as np
+
+from demark_world.iopaint.result_cache import ResultCache, result_cache_key
+from demark_world.iopaint.schema import InpaintRequest
+
+
+def inputs(seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    mask = np.zeros((32, 48), dtype=np.uint8)
+    mask[8:16, 8:24] = 255
+    return image, mask
+
+
+def test_key_covers_content_model_and_settings():
+    image, mask = inputs()
+    config = InpaintRequest()
+    key = result_cache_key("lama", True, image, mask, config)
+    assert key == result_cache_key("lama", True, image.copy(), mask.copy(), InpaintRequest())
+    assert key != result_cache_key("mat", True, image, mask, config)
+    assert key != result_cache_key("lama", True, inputs(1)[0], mask, config)
+    assert key != result_cache_key("lama", True, image, 255 - mask, config)
+    assert key != result_cache_key("lama", True, image, mask, InpaintRequest(hd_strategy="Resize"))
+    # Erase models ignore the seed
+    assert key == result_cache_key("lama", True, image, mask, InpaintRequest(sd_seed=7))
+
+
+def test_random_seed_diffusion_runs_are_not_cached():
+    image, mask = inputs()
+    assert result_cache_key("sd", False, image, mask, InpaintRequest(sd_seed=-1)) is None
+    seeded = result_cache_key("sd", False, image, mask, InpaintRequest(sd_seed=7))
+    assert seeded is not None
+    assert seeded != result_cache_key("sd", False, image, mask, InpaintRequest(sd_seed=8))
+
+
+def test_memory_lru_by_size():
+    result = np.zeros((32, 48, 3), dtype=np.uint8)
+    cache = ResultCache(max_mb=2.5 * result.nbytes / 1024 / 1024, disk_dir=None)
+    for key in "abc":
+        cache.put(key, result)
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    stats = cache.stats()
+    assert (stats.entries, stats.hits, stats.misses, stats.evictions) == (2, 1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_disk_tier_survives_restart_and_evicts(tmp_path):
+    result = np.arange(32 * 48 * 3, dtype=np.uint8).reshape(32, 48, 3)
+    cache = ResultCache(max_mb=0, disk_dir=tmp_path, disk_max_mb=2.5 * result.nbytes / 1024 / 1024)
+    cache.put("a", result)
+
+    restarted = ResultCache(max_mb=1, disk_dir=tmp_path, disk_max_mb=cache.disk_max_bytes / 1024 / 1024)
+    assert np.array_equal(restarted.get("a"), result)
+    assert restarted.stats().disk_hits == 1
+
+    # Putting a key again must not count its file twice
+    restarted.put("a", result)
+    assert restarted.disk_bytes == (tmp_path / "a.npy").stat().st_size
+
+    for key in "bcd":
+        restarted.put(key, result)
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+    assert restarted.stats().disk_size_mb <= restarted.stats().disk_max_mb
@@ -0,0 +1,428 @@
+"""
+Modulated deformable conv (DCNv2) backends for E2FGVI's feature propagation.
+
+mmcv ships a CUDA/C++ kernel, but it is not installed on every node. Without it
+the convolution runs on one of the PyTorch backends below:
+
+- torchvision: torchvision.ops.deform_conv2d, a native kernel with mask support
+- vectorized: one grid_sample over every deform group and kernel tap, then a
+  single matmul with the weights
+- reference: the original per-group, per-tap loop, kept for parity checks
+
+The backend is picked once per process from DEMARK_WORLD_DEFORM_CONV_BACKEND
+("auto" by default: mmcv, then torchvision, then vectorized). All backends take
+mmcv's offset layout, (dy, dx) pairs per deform group and kernel tap.
+"""
+
+import os
+from functools import lru_cache
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from loguru import logger
+
+DEFORM_CONV_BACKEND = os.getenv("DEMARK_WORLD_DEFORM_CONV_BACKEND", "auto")
+
+
+# Fallback: constant_init function
+def constant_init(module, val=0, bias=0):
+    """Initialize module parameters with constant values."""
+    if hasattr(module, "weight") and module.weight is not None:
+        nn.init.constant_(module.weight, val)
+    if hasattr(module, "bias") and module.bias is not None:
+        nn.init.constant_(module.bias, bias)
+
+
+def _pair(v):
+    if isinstance(v, tuple):
+        return v
+    return (v, v)
+
+
+@torch.no_grad()
+def _compute_output_shape(H_in, W_in, kH, kW, stride, padding, dilation):
+    sh, sw = stride
+    ph, pw = padding
+    dh, dw = dilation
+    H_out = (H_in + 2 * ph - (dh * (kH - 1) + 1)) // sh + 1
+    W_out = (W_in + 2 * pw - (dw * (kW - 1) + 1)) // sw + 1
+    return H_out, W_out
+
+def _modulated_deform_conv2d_core(
+    x,
+    offset,
+    mask,
+    weight,
+    bias,
+    stride=1,
+    padding=0,
+    dilation=1,
+    groups=1,
+    deform_groups=1,
+):
+    """
+    纯 PyTorch 版 Modulated Deformable Conv2d，支持 deform_groups
+    x:      (N, C_in, H_in, W_in)
+    offset: (N, 2*kH*kW*deform_groups, H_out, W_out)
+    mask:   (N,   kH*kW*deform_groups, H_out, W_out)
+    weight: (C_out, C_in/groups, kH, kW)
+    bias:   (C_out,) or None
+    """
+    if groups != 1:
+        raise NotImplementedError("This fallback only supports groups=1 for now.")
+
+    device = x.device
+    dtype = x.dtype
+
+    N, C_in, H_in, W_in = x.shape
+    C_out, C_in_w, kH, kW = weight.shape
+    assert C_in_w == C_in, "groups=1 only, C_in in weight must equal input channels"
+
+    stride = _pair(stride)
+    padding = _pair(padding)
+    dilation = _pair(dilation)
+    sh, sw = stride
+    ph, pw = padding
+    dh, dw = dilation
+
+    # conv 输出空间大小
+    H_out, W_out = _compute_output_shape(H_in, W_in, kH, kW, stride, padding, dilation)
+
+    # 检查 offset / mask 形状
+    K = kH * kW
+    assert offset.shape[1] == 2 * K * deform_groups
+    assert offset.shape[2] == H_out and offset.shape[3] == W_out
+    assert mask.shape[1] == K * deform_groups
+    assert mask.shape[2] == H_out and mask.shape[3] == W_out
+
+    # 每个 deform_group 负责的输入通道数
+    C_per_deform_group = C_in // deform_groups
+
+    # 输出
+    out = x.new_zeros(N, C_out, H_out, W_out)
+
+    # 输出位置网格 (h_out, w_out)
+    yy, xx = torch.meshgrid(
+        torch.arange(H_out, device=device, dtype=dtype),
+        torch.arange(W_out, device=device, dtype=dtype),
+        indexing="ij",
+    )  # (H_out, W_out)
+
+    # batch 索引，用于高级索引
+    n_idx = torch.arange(N, device=device).view(N, 1, 1).expand(N, H_out, W_out)
+
+    # 遍历每个 deform_group
+    for g in range(deform_groups):
+        # 该 group 负责的输入通道范围
+        c_start = g * C_per_deform_group
+        c_end = (g + 1) * C_per_deform_group
+        x_g = x[:, c_start:c_end, :, :]  # (N, C_per_deform_group, H_in, W_in)
+
+        for i in range(kH):
+            for j in range(kW):
+                k = i * kW + j  # 第 k 个 kernel 位置
+
+                # 该 group 和 kernel 位置对应的 offset / mask 索引
+                offset_idx = g * K + k
+
+                # 常规 conv 的采样中心位置 p0 + p_n
+                base_y = yy * sh - ph + i * dh  # (H_out, W_out)
+                base_x = xx * sw - pw + j * dw  # (H_out, W_out)
+
+                # 取出该 group+kernel 位置对应的 offset 分量
+                off_y = offset[:, 2 * offset_idx + 0, :, :]  # (N, H_out, W_out)
+                off_x = offset[:, 2 * offset_idx + 1, :, :]  # (N, H_out, W_out)
+
+                # 最终采样坐标
+                pos_y = base_y.unsqueeze(0) + off_y  # (N, H_out, W_out)
+                pos_x = base_x.unsqueeze(0) + off_x  # (N, H_out, W_out)
+
+                # 双线性插值的 4 个邻居坐标（浮点）
+                y0 = torch.floor(pos_y)
+                x0 = torch.floor(pos_x)
+                y1 = y0 + 1
+                x1 = x0 + 1
+
+                # 是否在合法范围内（用于零填充）
+                inside = (pos_y >= 0) & (pos_y <= H_in - 1) & (pos_x >= 0) & (pos_x <= W_in - 1)
+
+                # clamp 之后再索引
+                y0c = y0.clamp(0, H_in - 1).long()
+                y1c = y1.clamp(0, H_in - 1).long()
+                x0c = x0.clamp(0, W_in - 1).long()
+                x1c = x1.clamp(0, W_in - 1).long()
+
+                # 双线性权重
+                wy0 = (y1 - pos_y).clamp(0, 1)
+                wy1 = (pos_y - y0).clamp(0, 1)
+                wx0 = (x1 - pos_x).clamp(0, 1)
+                wx1 = (pos_x - x0).clamp(0, 1)
+
+                wa = (wy0 * wx0)[:, None, :, :]  # (N,1,H_out,W_out)
+                wb = (wy0 * wx1)[:, None, :, :]
+                wc = (wy1 * wx0)[:, None, :, :]
+                wd = (wy1 * wx1)[:, None, :, :]
+
+                # 从 x_g 中取四个邻居值
+                Ia = x_g[n_idx, :, y0c, x0c].permute(
+                    0, 3, 1, 2
+                )  # (N, C_per_deform_group, H_out, W_out)
+                Ib = x_g[n_idx, :, y0c, x1c].permute(0, 3, 1, 2)
+                Ic = x_g[n_idx, :, y1c, x0c].permute(0, 3, 1, 2)
+                Id = x_g[n_idx, :, y1c, x1c].permute(0, 3, 1, 2)
+
+                # 双线性插值
+                sampled = (
+                    Ia * wa + Ib * wb + Ic * wc + Id * wd
+                )  # (N, C_per_deform_group, H_out, W_out)
+
+                # 越界位置置 0
+                sampled = sampled * inside[:, None, :, :]
+
+                # modulation mask（这一位置对应的 mask 标量）
+                mask_k = mask[:, offset_idx, :, :]  # (N, H_out, W_out)
+                sampled = sampled * mask_k[:, None, :, :]
+
+                # 该 kernel 位置和 group 对应的权重 (C_out, C_per_deform_group)
+                w_ij = weight[:, c_start:c_end, i, j]  # (C_out, C_per_deform_group)
+
+                # 按公式累加：out += w_ij @ sampled
+                out = out + torch.einsum("oc,nchw->nohw", w_ij, sampled)
+
+    if bias is not None:
+        out = out + bias.view(1, -1, 1, 1)
+
+    return out
+
+
+def _modulated_deform_conv2d_vectorized(
+    x,
+    offset,
+    mask,
+    weight,
+    bias,
+    stride=1,
+    padding=0,
+    dilation=1,
+    groups=1,
+    deform_groups=1,
+):
+    """
+    Same contract as _modulated_deform_conv2d_core, with mmcv's border handling:
+    out-of-image bilinear taps read zeros instead of dropping the whole sample.
+    """
+    if groups != 1:
+        raise NotImplementedError("This fallback only supports groups=1 for now.")
+
+    N, C_in, H_in, W_in = x.shape
+    C_out, _, kH, kW = weight.shape
+    sh, sw = _pair(stride)
+    ph, pw = _pair(padding)
+    dh, dw = _pair(dilation)
+    H_out, W_out = _compute_output_shape(
+        H_in, W_in, kH, kW, (sh, sw), (ph, pw), (dh, dw)
+    )
+    K = kH * kW
+    G = deform_groups
+
+    # Regular conv sampling positions per kernel tap: (K, H_out, W_out)
+    ki = torch.arange(kH, device=x.device, dtype=x.dtype).repeat_interleave(kW)
+    kj = torch.arange(kW, device=x.device, dtype=x.dtype).repeat(kH)
+    ys = torch.arange(H_out, device=x.device, dtype=x.dtype) * sh - ph
+    xs = torch.arange(W_out, device=x.device, dtype=x.dtype) * sw - pw
+    base_y = ys.view(1, H_out, 1) + (ki * dh).view(K, 1, 1)
+    base_x = xs.view(1, 1, W_out) + (kj * dw).view(K, 1, 1)
+
+    # Offsets (N, G*K*2, H_out, W_out) -> sampling grid normalised for
+    # grid_sample(align_corners=True): -1 and 1 are the first and last pixel
+    offset = offset.reshape(N * G, K, 2, H_out, W_out)
+    grid_y = (base_y + offset[:, :, 0]) * (2 / max(H_in - 1, 1)) - 1
+    grid_x = (base_x + offset[:, :, 1]) * (2 / max(W_in - 1, 1)) - 1
+    grid = torch.stack((grid_x, grid_y), dim=-1).view(N * G, K * H_out, W_out, 2)
+
+    # (N*G, C_in/G, K*H_out, W_out): every tap of every group in one call
+    sampled = F.grid_sample(
+        x.reshape(N * G, C_in // G, H_in, W_in),
+        grid,
+        mode="bilinear",
+        padding_mode="zeros",
+        align_corners=True,
+    )
+    sampled = sampled * mask.reshape(N * G, 1, K * H_out, W_out)
+
+    # Columns ordered (C_in, K) like weight.view(C_out, C_in * K)
+    columns = sampled.view(N, C_in * K, H_out * W_out)
+    out = torch.matmul(weight.reshape(C_out, C_in * K), columns)
+    out = out.view(N, C_out, H_out, W_out)
+    if bias is not None:
+        out = out + bias.view(1, -1, 1, 1)
+    return out
+
+
+def _modulated_deform_conv2d_torchvision(
+    x,
+    offset,
+    mask,
+    weight,
+    bias,
+    stride=1,
+    padding=0,
+    dilation=1,
+    groups=1,
+    deform_groups=1,
+):
+    from torchvision.ops import deform_conv2d
+
+    # torchvision infers the deform groups from offset.shape[1]
+    return deform_conv2d(
+        x,
+        offset,
+        weight,
+        bias,
+        stride=_pair(stride),
+        padding=_pair(padding),
+        dilation=_pair(dilation),
+        mask=mask,
+    )
+
+
+def _modulated_deform_conv2d_mmcv(
+    x,
+    offset,
+    mask,
+    weight,
+    bias,
+    stride=1,
+    padding=0,
+    dilation=1,
+    groups=1,
+    deform_groups=1,
+):
+    from mmcv.ops import modulated_deform_conv2d as mmcv_modulated_deform_conv2d
+
+    return mmcv_modulated_deform_conv2d(
+        x, offset, mask, weight, bias, stride, padding, dilation, groups, deform_groups
+    )
+
+
+BACKENDS = {
+    "mmcv": _modulated_deform_conv2d_mmcv,
+    "torchvision": _modulated_deform_conv2d_torchvision,
+    "vectorized": _modulated_deform_conv2d_vectorized,
+    "reference": _modulated_deform_conv2d_core,
+}
+
+
+def _importable(module: str) -> bool:
+    try:
+        __import__(module)
+    except Exception:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(name: str = DEFORM_CONV_BACKEND) -> str:
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(
+                f"Unknown deform conv backend: {name}. Available: {['auto', *BACKENDS]}"
+            )
+        return name
+    if _importable("mmcv.ops"):
+        return "mmcv"
+    if _importable("torchvision.ops"):
+        logger.warning("mmcv is not available, using torchvision deform_conv2d")
+        return "torchvision"
+    logger.warning("mmcv is not available, using a fallback implementation")
+    return "vectorized"
+
+
+def modulated_deform_conv2d(
+    input,
+    offset,
+    mask,
+    weight,
+    bias=None,
+    stride=1,
+    padding=0,
+    dilation=1,
+    groups=1,
+    deform_groups=1,
+):
+    """
+    函数版接口，对齐 mmcv.ops.modulated_deform_conv2d
+    """
+    return BACKENDS[resolve_backend()](
+        input,
+        offset,
+        mask,
+        weight,
+        bias,
+        stride=stride,
+        padding=padding,
+        dilation=dilation,
+        groups=groups,
+        deform_groups=deform_groups,
+    )
+
+
+class ModulatedDeformConv2d(nn.Module):
+    """
+    纯 PyTorch 版 ModulatedDeformConv2d，接口对齐 mmcv.ops.ModulatedDeformConv2d
+    支持 deform_groups，但仅支持 groups=1
+
+    forward(x, offset, mask) -> y
+    """
+
+    def __init__(
+        self,
+        in_channels,
+        out_channels,
+        kernel_size,
+        stride=1,
+        padding=0,
+        dilation=1,
+        groups=1,
+        deform_groups=1,
+        bias=True,
+    ):
+        super().__init__()
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.kernel_size = _pair(kernel_size)
+        self.stride = _pair(stride)
+        self.padding = _pair(padding)
+        self.dilation = _pair(dilation)
+        self.groups = groups
+        self.deform_groups = deform_groups
+
+        if groups != 1:
+            raise NotImplementedError(
+                "This fallback ModulatedDeformConv2d currently only supports groups=1."
+            )
+
+        C_in_group = in_channels // groups
+        self.weight = nn.Parameter(torch.empty(out_channels, C_in_group, *self.kernel_size))
+        if bias:
+            self.bias = nn.Parameter(torch.zeros(out_channels))
+        else:
+            self.register_parameter("bias", None)
+
+        # 简单初始化，也可以在外面用 constant_init / kaiming_init 再调
+        nn.init.kaiming_uniform_(self.weight, a=1.0)
+
+    def forward(self, x, offset, mask):
+        return modulated_deform_conv2d(
+            x,
+            offset,
+            mask,
+            self.weight,
+            self.bias,
+            stride=self.stride,
+            padding=self.padding,
+            dilation=self.dilation,
+            groups=self.groups,
+            deform_groups=self.deform_groups,
+        )
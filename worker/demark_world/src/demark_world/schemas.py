@@ -4,3 +4,9 @@ from enum import Enum
 class CleanerType(str, Enum):
     LAMA = "lama"
     E2FGVI_HQ = "e2fgvi_hq"
+
+
+class Precision(str, Enum):
+    FP32 = "fp32"
+    BF16 = "bf16"  # autocast, CPU or CUDA with bf16 support
+    FP16 = "fp16"  # autocast, CUDA only
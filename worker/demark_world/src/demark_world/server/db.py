@@ -17,6 +17,7 @@ async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_
 
 
 async def init_db():
+    SQLITE_PATH.parent.mkdir(exist_ok=True, parents=True)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
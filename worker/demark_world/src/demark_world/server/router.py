@@ -3,7 +3,8 @@ from uuid import uuid4
 
 import aiofiles
 from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from demark_world.server.schemas import WMRemoveResults
 from demark_world.server.worker import worker
@@ -52,3 +53,8 @@ async def download_video(task_id: str):
         raise HTTPException(status_code=404, detail="Output file does not exits")
 
     return FileResponse(path=output_path, filename=output_path.name, media_type="video/mp4")
+
+
+@router.get("/metrics")
+async def metrics():
+    return Response(content=worker.metrics.render(), media_type=CONTENT_TYPE_LATEST)
@@ -12,6 +12,7 @@ from demark_world.core import DeMarkWorld
 from demark_world.server.db import get_session
 from demark_world.server.models import Task
 from demark_world.server.schemas import Status, WMRemoveResults
+from demark_world.utils.metrics_utils import PrometheusSink
 
 
 class WMRemoveTaskWorker:
@@ -21,11 +22,15 @@ class WMRemoveTaskWorker:
         self.output_dir = WORKING_DIR
         self.upload_dir = WORKING_DIR / "uploads"
         self.upload_dir.mkdir(exist_ok=True, parents=True)
+        # Exported on /metrics
+        self.metrics = PrometheusSink()
 
     async def initialize(self):
         logger.info("Initializing DeMarkWorld models...")
         self.sora_wm = DeMarkWorld()
         logger.info("DeMarkWorld models initialized")
+        # Pay for JIT profiling and cuDNN autotuning now rather than on the first task
+        self.sora_wm.warmup()
 
     async def create_task(self) -> str:
         task_uuid = str(uuid4())
@@ -49,6 +54,7 @@ class WMRemoveTaskWorker:
             task.percentage = 0
 
         self.queue.put_nowait((task_id, video_path))
+        self.metrics.set_queue_depth("tasks", self.queue.qsize())
         logger.info(f"Task {task_id} queued for processing: {video_path}")
 
     async def mark_task_error(self, task_id: str, error_msg: str):
@@ -64,6 +70,7 @@ class WMRemoveTaskWorker:
         logger.info("Worker started, waiting for tasks...")
         while True:
             task_uuid, video_path = await self.queue.get()
+            self.metrics.set_queue_depth("tasks", self.queue.qsize())
             logger.info(f"Processing task {task_uuid}: {video_path}")
 
             try:
@@ -86,7 +93,11 @@ class WMRemoveTaskWorker:
                     )
 
                 await asyncio.to_thread(
-                    self.sora_wm.run, video_path, output_path, progress_callback
+                    self.sora_wm.run,
+                    video_path,
+                    output_path,
+                    progress_callback,
+                    metrics_sink=self.metrics,
                 )
 
                 async with get_session() as session:
@@ -0,0 +1,83 @@
+"""Report per-module import time for a module, e.g. the worker entry point.
+
+    python -m demark_world.utils.import_profiler demark_world.core --top 30
+
+Each measurement runs in a fresh interpreter so nothing is already cached.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"python {' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return result
+
+
+def _importtime(code: str) -> List[ImportEntry]:
+    result = _run_python("-X", "importtime", "-c", code)
+    entries = []
+    for line in result.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entries.append(ImportEntry(name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def profile_imports(module: str) -> List[ImportEntry]:
+    """Per-module import times of `module`, without interpreter startup imports."""
+    startup = {entry.module for entry in _importtime("pass")}
+    return [entry for entry in _importtime(f"import {module}") if entry.module not in startup]
+
+
+def import_snapshot(module: str) -> dict:
+    """Wall-clock import time and the set of modules loaded by importing `module`."""
+    code = (
+        "import json, sys, time\n"
+        "began = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'seconds': time.perf_counter() - began, 'modules': sorted(sys.modules)}))\n"
+    )
+    result = _run_python("-c", code)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import time report")
+    parser.add_argument("module", nargs="?", default="demark_world.core")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    snapshot = import_snapshot(args.module)
+    packages = {}
+    for entry in entries:
+        top_level = entry.module.split(".")[0]
+        packages[top_level] = packages.get(top_level, 0) + entry.self_us
+
+    print(f"import {args.module}: {snapshot['seconds'] * 1000:.0f} ms, {len(snapshot['modules'])} modules loaded\n")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for entry in sorted(entries, key=lambda e: e.cumulative_us, reverse=True)[: args.top]:
+        print(f"{entry.cumulative_us / 1000:>14.1f} {entry.self_us / 1000:>8.1f}  {entry.module}")
+
+    print(f"\n{'self ms':>14}  top-level package")
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{self_us / 1000:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 from typing import List, Tuple
 
 import numpy as np
-import pandas as pd
-import ruptures as rpt
-from sklearn.preprocessing import StandardScaler
 
 
 def find_2d_data_bkps(X: List[Tuple[int, int]]) -> List[int]:
+    # Only needed when the detector missed frames, keep them off the import path
+    import pandas as pd
+    import ruptures as rpt
+    from sklearn.preprocessing import StandardScaler
+
     X_clean = [point if point is not None else (np.nan, np.nan) for point in X]
     X = np.array(X_clean, dtype=float)
     X = pd.DataFrame(X).interpolate("linear").bfill().ffill().to_numpy()
@@ -0,0 +1,152 @@
+"""Sinks for the stage timings, frame latencies and queue depths of DeMarkWorld.run.
+
+A sink is passed to `DeMarkWorld.run(..., metrics_sink=...)`. The StageTimer of
+the run forwards every timed call to `observe`. When the run ends the sink gets
+the whole run's per-stage spans through `run_finished`. Callers holding queues
+(the server's task queue, the serverless handler's admission) report them
+through `set_queue_depth`.
+
+- PrometheusSink keeps process-wide metrics for a `/metrics` endpoint.
+- JsonLogSink collects one job, including the caller's own stages, and prints
+  it as a single JSON log line when the caller calls `emit`.
+"""
+import json
+import sys
+import time
+from typing import Dict, List, TextIO
+
+from demark_world.utils.stage_timer import StageStats, StageTimer
+
+# Stages whose calls are model inference; their per-frame latency is histogrammed
+INFERENCE_STAGES = ("detect", "clean")
+# Seconds per frame, from a small-frame detect on GPU to E2FGVI on CPU
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds per stage of a whole run
+STAGE_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+class MetricsSink:
+    """Base sink, drops everything. Subclasses override what they export."""
+
+    def observe(self, stage: str, seconds: float, frames: int = 0):
+        pass
+
+    def run_finished(self, stages: Dict[str, StageStats]):
+        pass
+
+    def set_queue_depth(self, queue: str, depth: int):
+        pass
+
+
+class PrometheusSink(MetricsSink):
+    """Prometheus metrics in their own registry, rendered by `render()`."""
+
+    def __init__(self):
+        # Only the server exports Prometheus metrics
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        self.registry = CollectorRegistry()
+        self.frame_latency = Histogram(
+            "demark_world_frame_latency_seconds",
+            "Inference latency per frame",
+            ["stage"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.stage_duration = Histogram(
+            "demark_world_stage_duration_seconds",
+            "Time one run spent in each stage",
+            ["stage"],
+            buckets=STAGE_BUCKETS,
+            registry=self.registry,
+        )
+        self.stage_frames = Counter(
+            "demark_world_stage_frames",
+            "Frames processed by each stage",
+            ["stage"],
+            registry=self.registry,
+        )
+        self.runs = Counter("demark_world_runs", "Finished runs", registry=self.registry)
+        self.queue_depth = Gauge(
+            "demark_world_queue_depth", "Items waiting in each queue", ["queue"], registry=self.registry
+        )
+
+    def observe(self, stage: str, seconds: float, frames: int = 0):
+        if stage in INFERENCE_STAGES and frames:
+            self.frame_latency.labels(stage).observe(seconds / frames)
+
+    def run_finished(self, stages: Dict[str, StageStats]):
+        for name, stats in stages.items():
+            self.stage_duration.labels(name).observe(stats.seconds)
+            self.stage_frames.labels(name).inc(stats.frames)
+        self.runs.inc()
+
+    def set_queue_depth(self, queue: str, depth: int):
+        self.queue_depth.labels(queue).set(depth)
+
+    def render(self) -> bytes:
+        from prometheus_client import generate_latest
+
+        return generate_latest(self.registry)
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    """Count, percentiles and LATENCY_BUCKETS histogram (non-cumulative) of `latencies`."""
+    ordered = sorted(latencies)
+    buckets = {str(bound): 0 for bound in LATENCY_BUCKETS}
+    buckets["+Inf"] = 0
+    for value in ordered:
+        bound = next((str(b) for b in LATENCY_BUCKETS if value <= b), "+Inf")
+        buckets[bound] += 1
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": ordered[-1],
+        "buckets": buckets,
+    }
+
+
+class JsonLogSink(MetricsSink):
+    """Collects one job and writes it as one JSON line on `emit`.
+
+    Anything observed outside the run (e.g. a `queue_wait` or `upload` the
+    caller timed) is reported as a stage too, so the caller emits once the
+    job is over, whether it succeeded or not.
+    """
+
+    def __init__(self, job_id: str | None = None, stream: TextIO | None = None):
+        self.job_id = job_id
+        self.stream = stream
+        self.started_at = time.perf_counter()
+        self.timer = StageTimer()
+        self.latencies: Dict[str, List[float]] = {}
+        self.queue_depths: Dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float, frames: int = 0):
+        self.timer.add(stage, seconds, frames)
+        if stage in INFERENCE_STAGES and frames:
+            self.latencies.setdefault(stage, []).append(seconds / frames)
+
+    def set_queue_depth(self, queue: str, depth: int):
+        self.queue_depths[queue] = depth
+
+    def emit(self, status: str, error: str | None = None):
+        record = {
+            "event": "demark_world_run",
+            "job_id": self.job_id,
+            "status": status,
+            "error": error,
+            "seconds": time.perf_counter() - self.started_at,
+            "stages": self.timer.as_dict(),
+            "frame_latency": {name: latency_summary(v) for name, v in self.latencies.items()},
+            "queue_depth": self.queue_depths,
+        }
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(record) + "\n")
+        stream.flush()
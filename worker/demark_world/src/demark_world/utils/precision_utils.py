@@ -0,0 +1,74 @@
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+
+from loguru import logger
+
+from demark_world.schemas import Precision
+
+# torch is imported inside the functions (tests/test_import_time.py)
+
+
+@dataclass(frozen=True)
+class InferencePolicy:
+    """Numeric precision and memory format one model runs with."""
+
+    precision: Precision = Precision.FP32
+    channels_last: bool = False
+
+    @classmethod
+    def from_env(cls, name: str) -> "InferencePolicy":
+        """DEMARK_WORLD_<NAME>_PRECISION and DEMARK_WORLD_<NAME>_CHANNELS_LAST."""
+        prefix = f"DEMARK_WORLD_{name.upper()}"
+        value = os.getenv(f"{prefix}_PRECISION", Precision.FP32.value).lower()
+        try:
+            precision = Precision(value)
+        except ValueError:
+            logger.warning(f"Unknown {prefix}_PRECISION={value}, using fp32")
+            precision = Precision.FP32
+        return cls(
+            precision=precision,
+            channels_last=os.getenv(f"{prefix}_CHANNELS_LAST", "0").lower() in ("1", "true", "yes"),
+        )
+
+    @classmethod
+    def parse(cls, value: str) -> "InferencePolicy":
+        """Parse "fp32", "bf16+cl" (channels_last) and the like."""
+        precision, _, memory_format = value.lower().partition("+")
+        return cls(precision=Precision(precision), channels_last=memory_format == "cl")
+
+    def __str__(self):
+        return self.precision.value + ("+cl" if self.channels_last else "")
+
+    def resolve(self, device) -> "InferencePolicy":
+        """This policy with a precision `device` cannot run replaced by fp32."""
+        import torch
+
+        supported = self.precision == Precision.FP32
+        if self.precision == Precision.FP16:
+            supported = device.type == "cuda"
+        elif self.precision == Precision.BF16:
+            supported = device.type == "cpu" or (
+                device.type == "cuda" and torch.cuda.is_bf16_supported()
+            )
+        if supported:
+            return self
+        logger.warning(f"{self.precision.value} is not supported on {device.type}, using fp32")
+        return replace(self, precision=Precision.FP32)
+
+    def autocast(self, device):
+        """Context to run the forward pass in, autocast unless fp32."""
+        if self.precision == Precision.FP32:
+            return nullcontext()
+        import torch
+
+        dtype = torch.bfloat16 if self.precision == Precision.BF16 else torch.float16
+        return torch.autocast(device_type=device.type, dtype=dtype)
+
+    def apply(self, module):
+        """Convert `module`'s weights to channels_last if the policy asks for it."""
+        if self.channels_last:
+            import torch
+
+            module.to(memory_format=torch.channels_last)
+        return module
@@ -0,0 +1,44 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def psnr(reference: np.ndarray, image: np.ndarray) -> float:
+    """Peak signal-to-noise ratio in dB of two uint8 images, inf if identical."""
+    mse = np.mean((reference.astype(np.float64) - image.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float("inf")
+    return float(10 * np.log10(255.0**2 / mse))
+
+
+def ssim(reference: np.ndarray, image: np.ndarray) -> float:
+    """Mean structural similarity of two uint8 images (11x11 Gaussian window, per channel)."""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    x = reference.astype(np.float64)
+    y = image.astype(np.float64)
+
+    def blur(img):
+        return cv2.GaussianBlur(img, (11, 11), 1.5)
+
+    mu_x, mu_y = blur(x), blur(y)
+    sigma_x = blur(x * x) - mu_x**2
+    sigma_y = blur(y * y) - mu_y**2
+    sigma_xy = blur(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)) / (
+        (mu_x**2 + mu_y**2 + c1) * (sigma_x + sigma_y + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def box_iou(
+    a: Optional[Tuple[int, int, int, int]], b: Optional[Tuple[int, int, int, int]]
+) -> float:
+    """IoU of two (x1, y1, x2, y2) boxes; 1.0 if both are missing."""
+    if a is None or b is None:
+        return float(a is None and b is None)
+    iw = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageStats:
+    seconds: float = 0.0
+    frames: int = 0
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds else 0.0
+
+
+class StageTimer:
+    """Wall time and frame count per pipeline stage of one DeMarkWorld.run.
+
+    Every timed call is also passed to `sink.observe`, if there is a sink (a
+    demark_world.utils.metrics_utils.MetricsSink).
+    """
+
+    def __init__(self, sink=None):
+        self.stages: Dict[str, StageStats] = {}
+        self.sink = sink
+
+    def add(self, name: str, seconds: float, frames: int = 0):
+        stats = self.stages.setdefault(name, StageStats())
+        stats.seconds += seconds
+        stats.frames += frames
+        if self.sink is not None:
+            self.sink.observe(name, seconds, frames)
+
+    @contextmanager
+    def stage(self, name: str, frames: int = 0):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - began, frames)
+
+    def iterate(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from `items`, counting the time spent producing each as `name`."""
+        iterator = iter(items)
+        while True:
+            began = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - began)
+                return
+            self.add(name, time.perf_counter() - began, frames=1)
+            yield item
+
+    def as_dict(self) -> Dict[str, dict]:
+        return {name: {**asdict(stats), "fps": stats.fps} for name, stats in self.stages.items()}
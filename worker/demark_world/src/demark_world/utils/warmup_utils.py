@@ -0,0 +1,32 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Resolutions (width, height) warmed by default; generated videos are mostly 720p
+DEFAULT_WARMUP_RESOLUTIONS: List[Tuple[int, int]] = [(1280, 720), (720, 1280)]
+
+
+def watermark_box(width: int, height: int) -> Tuple[int, int, int, int]:
+    """A watermark-sized (x1, y1, x2, y2) box, so crops/pads match real masks."""
+    box_w, box_h = max(8, width // 6), max(8, height // 12)
+    x1, y1 = width - box_w - width // 20, height - box_h - height // 20
+    return x1, y1, x1 + box_w, y1 + box_h
+
+
+def dummy_frame_and_mask(width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """A blank frame and a mask covering watermark_box, as DeMarkWorld.run builds them."""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    x1, y1, x2, y2 = watermark_box(width, height)
+    mask[y1:y2, x1:x2] = 255
+    return frame, mask
+
+
+def parse_resolutions(value: str) -> List[Tuple[int, int]]:
+    """Parse "1280x720,720x1280" into [(1280, 720), (720, 1280)]."""
+    resolutions = []
+    for item in value.split(","):
+        if item.strip():
+            width, height = item.lower().split("x")
+            resolutions.append((int(width), int(height)))
+    return resolutions
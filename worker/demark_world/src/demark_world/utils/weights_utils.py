@@ -0,0 +1,109 @@
+"""Memory-mapped model weights shared by every worker process on a host.
+
+    python -m demark_world.utils.weights_utils   # one-time conversion
+
+The conversion writes each model's state dict as `<name>.mmap.pt` next to its
+checkpoint. On CPU the cleaners and the detector then point their parameters
+at `torch.load(mmap=True)` tensors: the weights live in the page cache once,
+however many processes load them, and E2FGVI skips unpickling its checkpoint.
+
+Anything that rewrites weights after loading (channels_last, torch.jit.freeze
+with optimize_for_inference) gives that process a private copy again.
+"""
+import os
+from pathlib import Path
+
+from loguru import logger
+
+SHARED_WEIGHTS_ENABLED = os.getenv("DEMARK_WORLD_SHARED_WEIGHTS", "1").lower() in ("1", "true", "yes")
+
+
+def shared_weights_path(checkpoint_path: Path) -> Path:
+    checkpoint_path = Path(checkpoint_path)
+    return checkpoint_path.with_name(f"{checkpoint_path.stem}.mmap.pt")
+
+
+def save_shared_weights(module, checkpoint_path: Path) -> Path:
+    """Write `module`'s state dict where attach_shared_weights looks for it."""
+    import torch
+
+    path = shared_weights_path(checkpoint_path)
+    state = {k: v.detach().cpu().contiguous() for k, v in module.state_dict().items()}
+    tmp_path = path.with_suffix(".tmp")
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def attach_shared_weights(module, checkpoint_path: Path, device) -> bool:
+    """Back `module`'s weights by the mmap'd conversion of `checkpoint_path`.
+
+    Only on CPU (elsewhere weights are copied to the device anyway) and only if
+    the conversion exists. Returns whether the weights are now shared.
+    """
+    import torch
+
+    path = shared_weights_path(checkpoint_path)
+    if not SHARED_WEIGHTS_ENABLED or device.type != "cpu" or not path.exists():
+        return False
+    own = module.state_dict(keep_vars=True)
+    if not own:
+        # e.g. a frozen TorchScript module, whose weights are folded into the graph
+        return False
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    mismatched = [
+        k for k, v in own.items() if k not in state or state[k].shape != v.shape or state[k].dtype != v.dtype
+    ]
+    if mismatched:
+        logger.warning(
+            f"{path} does not match the loaded model ({len(mismatched)} tensors differ), "
+            f"convert it again; using private weights"
+        )
+        return False
+    with torch.no_grad():
+        for name, tensor in own.items():
+            tensor.set_(state[name])
+    logger.debug(f"Weights shared from {path}")
+    return True
+
+
+def convert_all():
+    """Convert the E2FGVI, LaMa and YOLO checkpoints this worker uses."""
+    import torch
+
+    from demark_world.configs import (
+        E2FGVI_HQ_CHECKPOINT_PATH,
+        E2FGVI_HQ_CHECKPOINT_REMOTE_URL,
+        WATER_MARK_DETECT_YOLO_WEIGHTS,
+        WATER_MARK_DETECT_YOLO_WEIGHTS_REMOTE_URL,
+    )
+    from demark_world.iopaint.helper import download_model
+    from demark_world.iopaint.model.lama import LAMA_MODEL_MD5, LAMA_MODEL_URL
+    from demark_world.models.model.e2fgvi_hq import InpaintGenerator
+    from demark_world.utils.download_utils import ensure_model_downloaded
+
+    ensure_model_downloaded(E2FGVI_HQ_CHECKPOINT_PATH, E2FGVI_HQ_CHECKPOINT_REMOTE_URL)
+    e2fgvi = InpaintGenerator()
+    e2fgvi.load_state_dict(torch.load(E2FGVI_HQ_CHECKPOINT_PATH, map_location="cpu"))
+    logger.info(f"Wrote {save_shared_weights(e2fgvi, E2FGVI_HQ_CHECKPOINT_PATH)}")
+
+    lama_path = download_model(LAMA_MODEL_URL, LAMA_MODEL_MD5)
+    lama = torch.jit.load(lama_path, map_location="cpu")
+    logger.info(f"Wrote {save_shared_weights(lama, lama_path)}")
+
+    from ultralytics import YOLO
+
+    ensure_model_downloaded(WATER_MARK_DETECT_YOLO_WEIGHTS, WATER_MARK_DETECT_YOLO_WEIGHTS_REMOTE_URL)
+    yolo = YOLO(WATER_MARK_DETECT_YOLO_WEIGHTS)
+    # Predictors fuse conv+bn on first use; store the fused weights so that
+    # does not replace the shared tensors
+    yolo.model.fuse(verbose=False)
+    logger.info(f"Wrote {save_shared_weights(yolo.model, WATER_MARK_DETECT_YOLO_WEIGHTS)}")
+
+
+def main():
+    convert_all()
+
+
+if __name__ == "__main__":
+    main()
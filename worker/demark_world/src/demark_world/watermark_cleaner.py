@@ -4,17 +4,20 @@ from typing import List
 
 import numpy as np
 
-from demark_world.cleaner.e2fgvi_hq_cleaner import E2FGVIHDCleaner
-from demark_world.cleaner.lama_cleaner import LamaCleaner
 from demark_world.schemas import CleanerType
 
 
 class WaterMarkCleaner:
     def __new__(cls, cleaner_type: CleanerType):
+        # Import the selected cleaner only, each one pulls in its own model stack
         match cleaner_type:
             case CleanerType.LAMA:
+                from demark_world.cleaner.lama_cleaner import LamaCleaner
+
                 return LamaCleaner()
             case CleanerType.E2FGVI_HQ:
+                from demark_world.cleaner.e2fgvi_hq_cleaner import E2FGVIHDCleaner
+
                 return E2FGVIHDCleaner()
             case _:
                 raise ValueError(f"Invalid cleaner type: {cleaner_type}")
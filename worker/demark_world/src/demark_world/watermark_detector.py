@@ -2,36 +2,57 @@ from pathlib import Path
 
 import numpy as np
 from loguru import logger
-from ultralytics import YOLO
-from loguru import logger
 from demark_world.configs import WATER_MARK_DETECT_YOLO_WEIGHTS, WATER_MARK_DETECT_YOLO_WEIGHTS_REMOTE_URL
-from demark_world.utils.devices_utils import get_device
 
 from demark_world.utils.download_utils import ensure_model_downloaded     
+from demark_world.utils.precision_utils import InferencePolicy
 from demark_world.utils.video_utils import VideoLoader
+from demark_world.utils.warmup_utils import DEFAULT_WARMUP_RESOLUTIONS
+from demark_world.utils.weights_utils import attach_shared_weights, shared_weights_path
 
 # based on the sora tempalte to detect the whole, and then got the icon part area.
 
 
 class DeMarkWorldDetector:
-    def __init__(self):
+    def __init__(self, policy: InferencePolicy | None = None):
+        # ultralytics and torch are imported here, not at module import (worker cold start)
+        from ultralytics import YOLO
+
+        from demark_world.utils.devices_utils import get_device
+
         # download_detector_weights()
         ensure_model_downloaded(WATER_MARK_DETECT_YOLO_WEIGHTS, WATER_MARK_DETECT_YOLO_WEIGHTS_REMOTE_URL)
         logger.debug(f"Begin to load yolo water mark detet model.")
+        self.device = get_device()
+        self.policy = (policy or InferencePolicy.from_env("detector")).resolve(self.device)
         self.model = YOLO(WATER_MARK_DETECT_YOLO_WEIGHTS)
-        self.model.to(str(get_device()))
+        self.model.to(str(self.device))
         self.model.eval()
+        if self.device.type == "cpu" and shared_weights_path(WATER_MARK_DETECT_YOLO_WEIGHTS).exists():
+            # The converted weights are stored fused, see weights_utils.convert_all
+            self.model.model.fuse(verbose=False)
+            attach_shared_weights(self.model.model, WATER_MARK_DETECT_YOLO_WEIGHTS, self.device)
+        self.policy.apply(self.model.model)
         logger.debug(f"Yolo water mark detet model loaded from {WATER_MARK_DETECT_YOLO_WEIGHTS}.")
 
         self.model.eval()
 
+    def warmup(self, resolutions=DEFAULT_WARMUP_RESOLUTIONS, iterations: int = 2):
+        """Run dummy detections so ultralytics' lazy predictor setup and cuDNN
+        autotuning happen before the first real frame."""
+        for width, height in resolutions:
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+            for _ in range(iterations):
+                self.detect(frame)
+
     def detect(self, input_image: np.ndarray):
         # import cv2
         # # cv2.imshow("input_image", input_image)
         # cv2.imwrite("input_image.png", input_image)
         # raise RuntimeError()
 
-        results = self.model.predict(source=input_image, conf=0.05, verbose=False, stream=False)
+        with self.policy.autocast(self.device):
+            results = self.model.predict(source=input_image, conf=0.05, verbose=False, stream=False)
         # logger.error(f"input_image.shape:{input_image.shape}\nresults: {results}")
 
         result = results[0]
@@ -40,9 +61,9 @@ class DeMarkWorldDetector:
             return {"detected": False, "bbox": None, "confidence": None, "center": None}
 
         box = result.boxes[0]
-        xyxy = box.xyxy[0].cpu().numpy()
+        xyxy = box.xyxy[0].float().cpu().numpy()
         x1, y1, x2, y2 = float(xyxy[0]), float(xyxy[1]), float(xyxy[2]), float(xyxy[3])
-        confidence = float(box.conf[0].cpu().numpy())
+        confidence = float(box.conf[0].float().cpu().numpy())
         center_x = (x1 + x2) / 2
         center_y = (y1 + y2) / 2
 
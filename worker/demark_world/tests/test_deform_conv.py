@@ -0,0 +1,46 @@
+import pytest
+import torch
+
+from demark_world.models.model.modules.deform_conv import BACKENDS
+
+# SecondOrderDeformableAlignment in BidirectionalPropagation: 3x3, padding 1, 16 deform groups
+C_IN, C_OUT, DEFORM_GROUPS, K = 32, 16, 16, 9
+
+
+def make_inputs(offset_scale, h=16, w=20, seed=0):
+    g = torch.Generator().manual_seed(seed)
+    x = torch.randn(2, C_IN, h, w, generator=g)
+    offset = torch.randn(2, 2 * K * DEFORM_GROUPS, h, w, generator=g) * offset_scale
+    mask = torch.rand(2, K * DEFORM_GROUPS, h, w, generator=g)
+    weight = torch.randn(C_OUT, C_IN, 3, 3, generator=g)
+    bias = torch.randn(C_OUT, generator=g)
+    return x, offset, mask, weight, bias
+
+
+def run(backend, inputs):
+    x, offset, mask, weight, bias = inputs
+    return BACKENDS[backend](x, offset, mask, weight, bias, 1, 1, 1, 1, DEFORM_GROUPS)
+
+
+def interior(out, border=4):
+    # Samples there never leave the image, where the reference zeroes whole taps
+    return out[..., border:-border, border:-border]
+
+
+@pytest.mark.parametrize("backend", ["vectorized", "torchvision"])
+def test_matches_reference(backend):
+    inputs = make_inputs(offset_scale=0.0)
+    torch.testing.assert_close(run(backend, inputs), run("reference", inputs), atol=1e-4, rtol=1e-4)
+
+    # Sub-pixel offsets within [-2, 2]: bilinear taps stay inside away from the border
+    inputs = make_inputs(offset_scale=0.5)
+    inputs[1].clamp_(-2, 2)
+    torch.testing.assert_close(
+        interior(run(backend, inputs)), interior(run("reference", inputs)), atol=1e-4, rtol=1e-4
+    )
+
+
+def test_vectorized_matches_torchvision_at_borders():
+    # Both read zeros for out-of-image bilinear taps, like mmcv
+    inputs = make_inputs(offset_scale=3.0, seed=1)
+    torch.testing.assert_close(run("vectorized", inputs), run("torchvision", inputs), atol=1e-4, rtol=1e-4)
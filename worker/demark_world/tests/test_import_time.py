@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from demark_world.utils.import_profiler import import_snapshot
+
+# Loaded on every worker cold start, so it has to stay cheap
+IMPORT_TIME_BUDGET_S = float(os.getenv("DEMARK_WORLD_IMPORT_BUDGET_S", "1.5"))
+
+# Only needed once a model is constructed or a specific code path runs
+HEAVY_MODULES = ["torch", "ultralytics", "diffusers", "transformers", "ruptures", "sklearn", "pandas"]
+
+
+def test_core_import_is_lightweight():
+    snapshot = import_snapshot("demark_world.core")
+    loaded = set(snapshot["modules"])
+    assert [name for name in HEAVY_MODULES if name in loaded] == []
+    assert snapshot["seconds"] < IMPORT_TIME_BUDGET_S
+
+
+def test_configs_import_has_no_side_effects():
+    # Fail on any mkdir during import, and capture anything printed
+    code = (
+        "import pathlib\n"
+        "def mkdir(self, *args, **kwargs):\n"
+        "    raise AssertionError(f'mkdir {self} at import time')\n"
+        "pathlib.Path.mkdir = mkdir\n"
+        "import demark_world.configs\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ""
+
+
+def test_iopaint_registry_does_not_import_diffusers():
+    snapshot = import_snapshot("demark_world.iopaint.model_manager")
+    assert "diffusers" not in snapshot["modules"]
@@ -0,0 +1,72 @@
+import io
+import json
+
+import pytest
+
+from demark_world.utils.metrics_utils import JsonLogSink, latency_summary
+from demark_world.utils.stage_timer import StageTimer
+
+
+def test_latency_summary():
+    summary = latency_summary([0.004, 0.02, 0.02, 0.3, 20.0])
+    assert summary["count"] == 5
+    assert summary["p50"] == 0.02
+    assert summary["max"] == 20.0
+    assert summary["buckets"]["0.005"] == 1
+    assert summary["buckets"]["0.025"] == 2
+    assert summary["buckets"]["0.5"] == 1
+    assert summary["buckets"]["+Inf"] == 1
+
+
+def test_json_log_sink_writes_one_line_per_job():
+    stream = io.StringIO()
+    sink = JsonLogSink(job_id="job-1", stream=stream)
+    sink.set_queue_depth("jobs_in_flight", 2)
+    sink.observe("queue_wait", 1.5)
+
+    timer = StageTimer(sink)
+    timer.add("detect", 0.2, frames=4)
+    timer.add("clean", 0.9, frames=3)
+    timer.add("ffmpeg_wait", 0.1)
+    sink.run_finished(timer.stages)
+    sink.observe("upload", 0.4)
+    assert stream.getvalue() == ""
+    sink.emit("completed")
+
+    record = json.loads(stream.getvalue())
+    assert record["job_id"] == "job-1"
+    assert record["status"] == "completed" and record["error"] is None
+    assert set(record["stages"]) == {"queue_wait", "detect", "clean", "ffmpeg_wait", "upload"}
+    assert record["stages"]["clean"]["frames"] == 3
+    assert record["frame_latency"]["detect"]["p50"] == pytest.approx(0.05)
+    assert record["frame_latency"]["clean"]["count"] == 1
+    assert "ffmpeg_wait" not in record["frame_latency"]
+    assert record["queue_depth"] == {"jobs_in_flight": 2}
+
+
+def test_json_log_sink_reports_failed_jobs():
+    stream = io.StringIO()
+    sink = JsonLogSink(job_id="job-2", stream=stream)
+    sink.observe("download", 0.3)
+    sink.emit("failed", error="NoSuchKey")
+
+    record = json.loads(stream.getvalue())
+    assert (record["status"], record["error"]) == ("failed", "NoSuchKey")
+    assert set(record["stages"]) == {"download"}
+
+
+def test_prometheus_sink_exports_stages():
+    pytest.importorskip("prometheus_client")
+    from demark_world.utils.metrics_utils import PrometheusSink
+
+    sink = PrometheusSink()
+    timer = StageTimer(sink)
+    timer.add("detect", 0.2, frames=4)
+    sink.set_queue_depth("tasks", 3)
+    sink.run_finished(timer.stages)
+
+    text = sink.render().decode()
+    assert 'demark_world_frame_latency_seconds_count{stage="detect"} 1.0' in text
+    assert 'demark_world_stage_frames_total{stage="detect"} 4.0' in text
+    assert 'demark_world_queue_depth{queue="tasks"} 3.0' in text
+    assert "demark_world_runs_total 1.0" in text
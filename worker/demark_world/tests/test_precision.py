@@ -0,0 +1,48 @@
+import numpy as np
+import torch
+
+from demark_world.schemas import Precision
+from demark_world.utils.precision_utils import InferencePolicy
+from demark_world.utils.quality_utils import box_iou, psnr, ssim
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv("DEMARK_WORLD_LAMA_PRECISION", "BF16")
+    monkeypatch.setenv("DEMARK_WORLD_LAMA_CHANNELS_LAST", "1")
+    assert InferencePolicy.from_env("lama") == InferencePolicy(Precision.BF16, channels_last=True)
+    assert InferencePolicy.from_env("detector") == InferencePolicy()
+
+    monkeypatch.setenv("DEMARK_WORLD_LAMA_PRECISION", "bf61")
+    assert InferencePolicy.from_env("lama") == InferencePolicy(Precision.FP32, channels_last=True)
+
+
+def test_policy_parse_round_trip():
+    for value in ["fp32", "bf16+cl", "fp16"]:
+        assert str(InferencePolicy.parse(value)) == value
+
+
+def test_fp16_falls_back_to_fp32_on_cpu():
+    cpu = torch.device("cpu")
+    assert InferencePolicy(Precision.FP16, True).resolve(cpu) == InferencePolicy(Precision.FP32, True)
+    assert InferencePolicy(Precision.BF16).resolve(cpu).precision == Precision.BF16
+
+
+def test_bf16_autocast_on_cpu():
+    policy = InferencePolicy(Precision.BF16, channels_last=True)
+    conv = policy.apply(torch.nn.Conv2d(3, 8, 3))
+    assert conv.weight.is_contiguous(memory_format=torch.channels_last)
+    with policy.autocast(torch.device("cpu")):
+        assert conv(torch.rand(1, 3, 16, 16)).dtype == torch.bfloat16
+
+
+def test_quality_metrics():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)
+    noisy = np.clip(image.astype(int) + rng.integers(-8, 9, image.shape), 0, 255).astype(np.uint8)
+
+    assert psnr(image, image) == float("inf")
+    assert 30 < psnr(image, noisy) < 40
+    assert ssim(image, image) == 1.0
+    assert ssim(image, noisy) < 1.0
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == 50 / 150
+    assert box_iou(None, None) == 1.0
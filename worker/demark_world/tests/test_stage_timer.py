@@ -0,0 +1,28 @@
+from demark_world.utils.stage_timer import StageTimer
+
+
+def test_stages_accumulate_time_and_frames():
+    timer = StageTimer()
+    timer.add("clean", 2.0, frames=10)
+    with timer.stage("clean", frames=5):
+        pass
+    timer.add("encode", 0.0)
+
+    stages = timer.as_dict()
+    assert stages["clean"]["frames"] == 15
+    assert stages["clean"]["seconds"] >= 2.0
+    assert 0 < stages["clean"]["fps"] <= 7.5
+    assert stages["encode"]["fps"] == 0.0
+
+
+def test_iterate_counts_each_item():
+    timer = StageTimer()
+    assert list(timer.iterate("decode", range(4))) == [0, 1, 2, 3]
+    assert timer.stages["decode"].frames == 4
+
+    try:
+        with timer.stage("detect", frames=1):
+            raise ValueError
+    except ValueError:
+        pass
+    assert timer.stages["detect"].frames == 1
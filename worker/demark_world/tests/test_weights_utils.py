@@ -0,0 +1,42 @@
+import torch
+
+from demark_world.utils import weights_utils
+from demark_world.utils.weights_utils import (
+    attach_shared_weights,
+    save_shared_weights,
+    shared_weights_path,
+)
+
+
+def make_model(seed):
+    torch.manual_seed(seed)
+    return torch.nn.Sequential(torch.nn.Conv2d(3, 8, 3), torch.nn.BatchNorm2d(8)).eval()
+
+
+def test_attach_shares_converted_weights(tmp_path):
+    checkpoint = tmp_path / "model.pth"
+    source = make_model(0)
+    assert save_shared_weights(source, checkpoint) == tmp_path / "model.mmap.pt"
+
+    model = make_model(1)
+    assert attach_shared_weights(model, checkpoint, torch.device("cpu"))
+    for name, tensor in source.state_dict().items():
+        assert torch.equal(model.state_dict()[name], tensor)
+    x = torch.rand(1, 3, 16, 16)
+    torch.testing.assert_close(model(x), source(x))
+
+
+def test_attach_falls_back_to_private_weights(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "model.pth"
+    cpu = torch.device("cpu")
+    assert not attach_shared_weights(make_model(0), checkpoint, cpu)  # not converted
+
+    save_shared_weights(torch.nn.Conv2d(3, 4, 3), checkpoint)
+    assert shared_weights_path(checkpoint).exists()
+    assert not attach_shared_weights(make_model(0), checkpoint, cpu)  # different model
+
+    save_shared_weights(make_model(0), checkpoint)
+    assert not attach_shared_weights(torch.nn.ReLU(), checkpoint, cpu)  # no weights, e.g. frozen
+
+    monkeypatch.setattr(weights_utils, "SHARED_WEIGHTS_ENABLED", False)
+    assert not attach_shared_weights(make_model(0), checkpoint, cpu)
@@ -3,11 +3,23 @@ RunPod Serverless Handler for Video Watermark Removal
 Queue-based architecture for scale-to-zero deployment
 """
 import runpod
+import asyncio
 import os
+import threading
+import time
+import json
+import hmac
+import hashlib
+from contextlib import contextmanager
 import boto3
+import psutil
+import requests
+import torch
 from pathlib import Path
 from demark_world.core import DeMarkWorld
 from demark_world.schemas import CleanerType
+from demark_world.utils.metrics_utils import JsonLogSink
+from demark_world.utils.warmup_utils import parse_resolutions
 
 # S3/R2 Configuration
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
@@ -15,6 +27,10 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 BUCKET_NAME = os.getenv("BUCKET_NAME")
 
+# Backend callback configuration (see backend webhooks.worker_callback)
+WORKER_CALLBACK_SECRET = os.getenv("WORKER_CALLBACK_SECRET", "")
+PROGRESS_REPORT_INTERVAL = float(os.getenv("PROGRESS_REPORT_INTERVAL", "2.0"))
+
 s3_client = boto3.client(
     's3',
     endpoint_url=S3_ENDPOINT_URL,
@@ -22,7 +38,131 @@ s3_client = boto3.client(
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY
 )
 
-def handler(job):
+class ProgressReporter:
+    """Post job status to the backend callback, throttled to one post per interval."""
+
+    def __init__(self, callback_url, job_id):
+        self.callback_url = callback_url
+        self.job_id = job_id
+        self.started_at = time.monotonic()
+        self.last_sent_at = 0.0
+        self.last_progress = -1
+
+    def post(self, status, progress=None, eta_seconds=None, error=None):
+        if not self.callback_url or not WORKER_CALLBACK_SECRET:
+            return
+        body = json.dumps({
+            "job_id": self.job_id,
+            "status": status,
+            "progress": progress,
+            "eta_seconds": eta_seconds,
+            "error": error
+        }).encode()
+        signature = hmac.new(WORKER_CALLBACK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        try:
+            requests.post(
+                self.callback_url,
+                data=body,
+                headers={"Content-Type": "application/json", "x-worker-signature": signature},
+                timeout=5
+            )
+        except requests.RequestException as e:
+            # Progress is best effort; never fail the job because the backend is unreachable
+            print(f"[{self.job_id}] Callback failed: {e}")
+
+    def progress(self, progress):
+        """Progress callback for DeMarkWorld.run, reports 0-100."""
+        now = time.monotonic()
+        if progress <= self.last_progress or now - self.last_sent_at < PROGRESS_REPORT_INTERVAL:
+            return
+        elapsed = now - self.started_at
+        eta_seconds = int(elapsed * (100 - progress) / progress) if progress > 0 else None
+        self.last_sent_at = now
+        self.last_progress = progress
+        self.post("processing", progress=progress, eta_seconds=eta_seconds)
+
+
+# Idle DeMarkWorld instances per cleaner type; models stay loaded between
+# jobs of a batch and across warm invocations
+_demarkers = {}
+_demarkers_lock = threading.Lock()
+
+# Jobs this pod holds at once; their downloads/uploads overlap with inference
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "2"))
+# Inferences running at once; each one uses its own warm model set
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", "1"))
+# Memory (host and GPU) one job needs free before it is admitted
+JOB_MEMORY_MB = int(os.getenv("JOB_MEMORY_MB", "3072"))
+ADMISSION_POLL_INTERVAL = 1.0
+
+# Models loaded and warmed before the pod takes its first job
+WARMUP_QUALITIES = [q for q in os.getenv("WARMUP_QUALITIES", "lama").split(",") if q]
+WARMUP_RESOLUTIONS = parse_resolutions(os.getenv("WARMUP_RESOLUTIONS", "1280x720,720x1280"))
+# E2FGVI warmup clip length; 0 = one neighbor window, the smallest with real shapes
+WARMUP_FRAMES = int(os.getenv("WARMUP_FRAMES", "0")) or None
+
+_inference_slots = asyncio.Semaphore(INFERENCE_CONCURRENCY)
+_jobs_in_flight = 0
+_active_inferences = 0
+
+
+@contextmanager
+def checkout_demarker(cleaner_type):
+    """Borrow an idle DeMarkWorld for one inference; a DeMarkWorld is not thread-safe.
+
+    At most INFERENCE_CONCURRENCY are busy at once, so each cleaner type ends up
+    with at most that many instances.
+    """
+    with _demarkers_lock:
+        idle = _demarkers.setdefault(cleaner_type, [])
+        demarker = idle.pop() if idle else None
+    if demarker is None:
+        demarker = DeMarkWorld(cleaner_type=cleaner_type)
+    try:
+        yield demarker
+    finally:
+        with _demarkers_lock:
+            _demarkers[cleaner_type].append(demarker)
+
+
+def cleaner_type_for(quality):
+    return CleanerType.LAMA if quality == "lama" else CleanerType.E2FGVI_HQ
+
+
+def warmup():
+    """Load and warm the models for WARMUP_QUALITIES so the first job runs at full speed."""
+    for quality in WARMUP_QUALITIES:
+        cleaner_type = cleaner_type_for(quality)
+        for _ in range(INFERENCE_CONCURRENCY):
+            started = time.monotonic()
+            demarker = DeMarkWorld(cleaner_type=cleaner_type)
+            loaded = time.monotonic()
+            demarker.warmup(WARMUP_RESOLUTIONS, WARMUP_FRAMES)
+            _demarkers.setdefault(cleaner_type, []).append(demarker)
+            print(f"Warmup {quality}: load {loaded - started:.1f}s, warmup {time.monotonic() - loaded:.1f}s")
+
+
+def available_memory_mb():
+    """Free memory in MB, the smaller of host RAM and GPU memory."""
+    free_mb = psutil.virtual_memory().available / 1024 / 1024
+    if torch.cuda.is_available():
+        gpu_free, _ = torch.cuda.mem_get_info()
+        free_mb = min(free_mb, gpu_free / 1024 / 1024)
+    return free_mb
+
+
+def concurrency_modifier(current_concurrency):
+    """Tell RunPod how many jobs this pod may hold, backing off when memory is tight."""
+    room = _jobs_in_flight + int(available_memory_mb() // JOB_MEMORY_MB)
+    return max(1, min(MAX_CONCURRENCY, room))
+
+
+def run_inference(cleaner_type, local_input, local_output, progress_callback, metrics_sink=None):
+    with checkout_demarker(cleaner_type) as demarker:
+        demarker.run(local_input, local_output, progress_callback=progress_callback, metrics_sink=metrics_sink)
+
+
+async def handler(job):
     """
     Main entry point for RunPod Serverless worker.
     
@@ -32,43 +172,90 @@ def handler(job):
             "job_id": "uuid",
             "input_key": "uploads/uuid/video.mp4",
             "output_key": "outputs/uuid.mp4",
-            "quality": "lama"  # or "e2fgvi_hq"
+            "quality": "lama",  # or "e2fgvi_hq"
+            "callback_url": "https://backend/api/webhooks/worker"  # optional
+        }
+    }
+    
+    or a batch from the backend dispatcher, whose jobs share the warm models:
+    {
+        "input": {
+            "jobs": [{"job_id": ..., "input_key": ..., ...}, ...]
         }
     }
     """
     job_input = job["input"]
+    if "jobs" not in job_input:
+        return await process_job(job_input)
+
+    results = await asyncio.gather(*(process_job(item) for item in job_input["jobs"]))
+    completed = sum(1 for r in results if r["status"] == "completed")
+    if completed == len(results):
+        status = "completed"
+    elif completed == 0:
+        status = "failed"
+    else:
+        status = "partial"
+    return {"status": status, "results": list(results)}
+
+
+async def process_job(job_input):
+    """Process a single job and report its outcome to the backend."""
+    global _jobs_in_flight, _active_inferences
     job_id = job_input["job_id"]
     input_key = job_input["input_key"]
     output_key = job_input["output_key"]
     quality = job_input.get("quality", "lama")
+    reporter = ProgressReporter(job_input.get("callback_url"), job_id)
+    if not reporter.callback_url:
+        print(f"[{job_id}] Error: no callback_url, the backend will get no progress or result")
+    # Stage timings, frame latencies and queue depths, one JSON log line per job
+    metrics = JsonLogSink(job_id=job_id)
+    status, error = "failed", None
     
     # Local file paths
     local_input = Path(f"/tmp/{job_id}_input.mp4")
     local_output = Path(f"/tmp/{job_id}_output.mp4")
     
+    _jobs_in_flight += 1
     try:
+        await asyncio.to_thread(reporter.post, "processing", progress=0)
+
         # 1. Download video from R2
         print(f"[{job_id}] Downloading {input_key}...")
-        s3_client.download_file(BUCKET_NAME, input_key, str(local_input))
+        download_started = time.perf_counter()
+        await asyncio.to_thread(s3_client.download_file, BUCKET_NAME, input_key, str(local_input))
+        metrics.observe("download", time.perf_counter() - download_started)
         print(f"[{job_id}] Download complete. File size: {local_input.stat().st_size / 1024 / 1024:.2f} MB")
         
         # 2. Process video with DeMark-World
-        print(f"[{job_id}] Processing video with quality: {quality}...")
-        cleaner_type = CleanerType.LAMA if quality == "lama" else CleanerType.E2FGVI_HQ
-        demarker = DeMarkWorld(cleaner_type=cleaner_type)
-        demarker.run(local_input, local_output)
+        cleaner_type = cleaner_type_for(quality)
+        metrics.set_queue_depth("jobs_in_flight", _jobs_in_flight)
+        metrics.set_queue_depth("active_inferences", _active_inferences)
+        queued_at = time.perf_counter()
+        async with _inference_slots:
+            # Another inference may still be ramping up; wait until ours fits in memory
+            while _active_inferences and available_memory_mb() < JOB_MEMORY_MB:
+                await asyncio.sleep(ADMISSION_POLL_INTERVAL)
+            metrics.observe("queue_wait", time.perf_counter() - queued_at)
+            print(f"[{job_id}] Processing video with quality: {quality}...")
+            _active_inferences += 1
+            try:
+                await asyncio.to_thread(
+                    run_inference, cleaner_type, local_input, local_output, reporter.progress, metrics
+                )
+            finally:
+                _active_inferences -= 1
         print(f"[{job_id}] Processing complete. Output size: {local_output.stat().st_size / 1024 / 1024:.2f} MB")
         
         # 3. Upload result to R2
         print(f"[{job_id}] Uploading result to {output_key}...")
-        s3_client.upload_file(str(local_output), BUCKET_NAME, output_key)
+        upload_started = time.perf_counter()
+        await asyncio.to_thread(s3_client.upload_file, str(local_output), BUCKET_NAME, output_key)
+        metrics.observe("upload", time.perf_counter() - upload_started)
         print(f"[{job_id}] Upload complete.")
-        
-        # 4. Cleanup
-        if local_input.exists():
-            local_input.unlink()
-        if local_output.exists():
-            local_output.unlink()
+        await asyncio.to_thread(reporter.post, "completed", progress=100)
+        status = "completed"
         
         # Return success
         return {
@@ -79,12 +266,8 @@ def handler(job):
         
     except Exception as e:
         print(f"[{job_id}] Error: {str(e)}")
-        
-        # Cleanup on error
-        if local_input.exists():
-            local_input.unlink()
-        if local_output.exists():
-            local_output.unlink()
+        error = str(e)
+        await asyncio.to_thread(reporter.post, "failed", error=str(e))
         
         # Return error (RunPod will mark job as FAILED)
         return {
@@ -93,5 +276,19 @@ def handler(job):
             "error": str(e)
         }
 
-# Start the RunPod serverless handler
-runpod.serverless.start({"handler": handler})
+    finally:
+        _jobs_in_flight -= 1
+        metrics.emit(status, error)
+        # Cleanup
+        if local_input.exists():
+            local_input.unlink()
+        if local_output.exists():
+            local_output.unlink()
+
+
+if __name__ == "__main__":
+    if not WORKER_CALLBACK_SECRET:
+        print("Error: WORKER_CALLBACK_SECRET is not set, the backend will get no job callbacks")
+    warmup()
+    # Start the RunPod serverless handler
+    runpod.serverless.start({"handler": handler, "concurrency_modifier": concurrency_modifier})